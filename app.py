@@ -1,108 +1,309 @@
+import time
+
+# measured from the import of the app, as close to the process start as possible
+_STARTED_AT = time.perf_counter()
+
+from obs_connection import OBSConnectionError
 from obs_controller import OBSController
-from teams_controller import *
-import json
-from datetime import timedelta
-from datetime import datetime
-import pygame.mixer
+from disconnect_policy import DisconnectPolicy
+from scheduler import PollScheduler
+from tracing import NULL_TRACER, JsonlTracer, SamplingProfiler, Tracer, traced
+from calibration_cache import CalibrationCache
+from config import load_config, validate_config
+from constants import (
+    CALIBRATION_CACHE_ABS_PATH,
+    TEAMS_DEBUG_IMAGES_DIR_ABS_PATH,
+    TRACES_DIR_ABS_PATH,
+)
+from exceptions import (
+    ElementNotFoundException,
+    ParticipantsNumberNotVisibleException,
+    WindowNotReadyException,
+)
+from meeting_windows import ensure_maximized, find_meeting_windows
+from sound_player import BackgroundSound, SilentSound, mixer_busy
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Optional
+from os import path as p
+import os
 import platform
 
+if TYPE_CHECKING:
+    import pywinctl
+    from stage_limits import StageLimits
+    from template_bank import TemplateBank
+
 
 class App:
-    def __init__(self):
-        with open("config.json", "r") as json_file:
-            config = json.load(json_file)
+    """
+    Starts the recording as soon as a maximized meeting window is found.
+    Modules needed only for the analysis (OpenCV, tesseract, pyautogui) are imported and the sounds are decoded
+    in background threads meanwhile; 'TeamsController' is created after the recording has started.
 
-        min_time_str = config["settings"]["min_time"]
-        hours, minutes, seconds = map(int, min_time_str.split(":"))
-        self._min_time = timedelta(hours=hours, minutes=minutes, seconds=seconds)
+    A supervisor running several apps passes its own 'tracer', the shared 'template_bank', 'calibration_cache'
+    and 'stage_limits', and turns 'suspend' off, so the host isn't put to sleep when one meeting ends,
+    and 'sounds', so no session decodes them.
 
-        max_time_str = config["settings"]["max_time"]
-        hours, minutes, seconds = map(int, max_time_str.split(":"))
-        self._max_time = timedelta(hours=hours, minutes=minutes, seconds=seconds)
+    With a 'window', only that meeting window is analyzed and recorded, e.g. by one of the monitors of
+    overlapping meetings; without 'record', the end of its meeting is only detected.
+    """
 
-        self._min_participants = config["settings"]["min_participants"]
-        self._min_participants_ratio = config["settings"]["min_participants_ratio"]
-        self._moving_avg_len = config["settings"]["moving_avg_len"]
-        self._avg_participants = 0
+    def __init__(
+        self,
+        config: Optional[dict[str, Any]] = None,
+        *,
+        tracer: Optional[Tracer] = None,
+        template_bank: Optional["TemplateBank"] = None,
+        calibration_cache: Optional[CalibrationCache] = None,
+        stage_limits: Optional["StageLimits"] = None,
+        suspend: bool = True,
+        sounds: bool = True,
+        window: Optional["pywinctl.Window"] = None,
+        record: bool = True,
+    ):
+        config = config if config else load_config()
+        self._config = config
+        self._window = window
+        self._template_bank = template_bank
+        self._calibration_cache = calibration_cache
+        self._stage_limits = stage_limits
+        self._suspend = suspend
 
-        self._loading_sound_path = config["settings"]["loading_sound_path"]
-        self._warning_sound_path = config["settings"]["warning_sound_path"]
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="warm_up")
+        self._warm_up = executor.submit(_warm_up, config)
+        executor.shutdown(wait=False)
 
-        self._teams_controller = TeamsController()
-        self._teams_controller.clear_debug_images()
+        self._disconnect_policy = DisconnectPolicy.from_settings(config["settings"])
+        self._scheduler = PollScheduler.from_settings(config["settings"])
+
+        self._tracer = tracer if tracer else NULL_TRACER
+        # a tracer passed in may be shared by other apps, it's closed by its owner
+        self._owns_tracer = False
+        self._profiler = None
+        session = datetime.now().strftime("%Y%m%d%H%M%S")
+        if config["tracing"]["enabled"] and not tracer:
+            self._tracer = JsonlTracer(p.join(TRACES_DIR_ABS_PATH, f"{session}.jsonl"))
+            self._owns_tracer = True
+        if config["tracing"]["profiler_enabled"]:
+            self._profiler = SamplingProfiler(
+                p.join(TRACES_DIR_ABS_PATH, f"{session}.folded"),
+                config["tracing"]["profiler_interval"],
+            )
+            self._profiler.start()
 
-        self._obs_controller = OBSController()
+        self._sounds = sounds
+        sound = BackgroundSound if sounds else SilentSound
+        self._loading_sound = sound(config["settings"]["loading_sound_path"])
+        self._warning_sound = sound(config["settings"]["warning_sound_path"])
 
-        pygame.mixer.init()
-        self._loading_sound = pygame.mixer.Sound(self._loading_sound_path)
-        self._warning_sound = pygame.mixer.Sound(self._warning_sound_path)
+        self._obs_controller = None
+        if record:
+            self._obs_controller = OBSController(
+                tracer=self._tracer,
+                window_title=window.title if window else None,
+                config=config,
+            )
+        self._recording_started = False
 
-    def _calc_avg_participants(self, participants):
-        self._avg_participants = (
-            self._avg_participants * (self._moving_avg_len - 1) + participants
-        ) / self._moving_avg_len
+        self._teams_controller = None
+        self._flight_recorder = None
+        self._pipeline = None
+        self._sample_timeout = config["pipeline"]["sample_timeout"]
 
-    def _check_disconnect(self) -> bool:
-        duration = self._teams_controller.meeting_duration
-        participants = self._teams_controller.participants_number
+    def _create_teams_controller(self):
+        self._warm_up.result()  # raises config validation errors
+        from flight_recorder import FlightRecorder
+        from teams_controller import TeamsController
 
-        self._calc_avg_participants(participants)
+        if self._config["flight_recorder"]["enabled"]:
+            self._flight_recorder = FlightRecorder.from_settings(
+                TEAMS_DEBUG_IMAGES_DIR_ABS_PATH,
+                self._config["flight_recorder"],
+                self._tracer,
+            )
+        self._teams_controller = TeamsController(
+            template_bank=self._template_bank,
+            tracer=self._tracer,
+            calibration_cache=self._calibration_cache
+            or CalibrationCache(CALIBRATION_CACHE_ABS_PATH),
+            config=self._config,
+            flight_recorder=self._flight_recorder,
+            stage_limits=self._stage_limits,
+            window=self._window,
+        )
+        self._teams_controller.clear_debug_images()
+
+        if self._config["pipeline"]["enabled"]:
+            from frame_pipeline import FramePipeline
+
+            self._pipeline = FramePipeline(
+                self._teams_controller,
+                capture_interval=self._config["pipeline"]["capture_interval"],
+                queue_size=self._config["pipeline"]["queue_size"],
+                read_duration=self._scheduler.should_read_clock,
+                tracer=self._tracer,
+            )
+            self._pipeline.start()
 
-        if duration < self._min_time:
-            return False
+    def _ensure_meeting_window_is_ready(self):
+        if self._teams_controller:
+            self._teams_controller.ensure_meeting_window_is_ready()
+            return
+        if self._window is not None:
+            ensure_maximized([self._window])
+            return
+        windows = find_meeting_windows(self._config["teams"]["excluded_names"])
+        if not windows:
+            raise WindowNotReadyException("There are no meeting windows opened")
+        ensure_maximized(windows)
 
-        if duration > self._max_time:
-            return True
+    def _start_recording(self):
+        if self._obs_controller is None:
+            return
+        self._obs_controller.start_recording()
+        if not self._recording_started:
+            self._recording_started = True
+            self._tracer.record("time_to_record", time.perf_counter() - _STARTED_AT)
 
-        if (participants / self._avg_participants < self._min_participants_ratio) or (
-            participants < self._min_participants
-        ):
-            return True
+    def _check_disconnect(self, participants: int) -> bool:
+        duration = self._scheduler.meeting_duration
+        if duration is None:
+            duration = self._teams_controller.meeting_duration
+        return self._disconnect_policy.should_disconnect(duration, participants)
 
-        return False
+    def _analyze(self) -> Optional[int]:
+        """
+        Analyzes the newest frame, syncs the meeting clock if it was read and returns the participants number.
+        Returns None if the pipeline produced no sample in time.
+        """
+        if self._pipeline is None:
+            read_clock = self._scheduler.should_read_clock()
+            self._teams_controller.extract_data(read_duration=read_clock)
+            if read_clock:
+                self._scheduler.sync_clock(self._teams_controller.meeting_duration)
+            return self._teams_controller.participants_number
 
+        sample = self._pipeline.next_sample(self._sample_timeout)
+        if sample is None:
+            return None
+        if sample.error is not None:
+            raise sample.error
+        if sample.meeting_duration is not None:
+            age = timedelta(seconds=sample.age(time.monotonic()))
+            self._scheduler.sync_clock(sample.meeting_duration + age)
+        return sample.participants_number
+
+    @traced("update")
     def update(self):
         try:
-            if self._teams_controller.offsets_loaded:
-                self._teams_controller.ensure_meeting_window_is_ready()
+            if self._teams_controller is None or self._teams_controller.offsets_loaded:
+                self._ensure_meeting_window_is_ready()
                 self._warning_sound.stop()
                 self._loading_sound.play()
-                self._obs_controller.start_recording()
+                self._start_recording()
+            if self._teams_controller is None:
+                self._create_teams_controller()
 
-            self._teams_controller.extract_data()
+            participants = self._analyze()
+            if participants is None:
+                print("No frame analyzed in time")
+                self._scheduler.schedule_retry()
+                return True
             self._loading_sound.stop()
             self._warning_sound.stop()
 
-            if self._check_disconnect():
-                self._obs_controller.stop_recording()
+            disconnect = self._check_disconnect(participants)
+            self._scheduler.schedule(
+                self._scheduler.meeting_duration,
+                self._disconnect_policy.min_time,
+                self._disconnect_policy.max_time,
+                self._disconnect_policy.participants_falling,
+            )
+            if disconnect:
+                if self._pipeline:
+                    self._pipeline.stop()
+                if self._obs_controller:
+                    self._obs_controller.stop_recording()
 
                 try:
                     self._teams_controller.click_leave_button(0.2)
                 except:
                     pass
 
-                system_name = platform.system()
-                if system_name == "Darwin":
-                    os.system("pmset sleepnow")
-                if system_name == "Linux":
-                    os.system("systemctl suspend")
-                if system_name == "Windows":
-                    os.system("rundll32.exe powrprof.dll,SetSuspendState 0,1,0")
+                if self._suspend:
+                    _suspend()
                 return False
 
         except (ElementNotFoundException, WindowNotReadyException) as e:
+            self._tracer.count(f"exception.{type(e).__name__}")
             self._loading_sound.stop()
-            if not pygame.mixer.get_busy():
+            if self._sounds and not mixer_busy():
                 self._warning_sound.play()
             print(e)
-            self._teams_controller.show_debug_image(True)
-        except ParticipantsNumberNotVisibleException as e:
+            if self._teams_controller:
+                self._teams_controller.show_debug_image(True, str(e))
+            self._scheduler.schedule_retry()
+        except (ParticipantsNumberNotVisibleException, OBSConnectionError) as e:
+            self._tracer.count(f"exception.{type(e).__name__}")
             print(e)
+            self._scheduler.schedule_retry()
 
         return True
 
+    def wait(self):
+        self._scheduler.wait()
+
+    def stop_recording(self):
+        """
+        Stops a started recording, e.g. when the app is stopped before the meeting ended.
+        """
+        if not self._recording_started or self._obs_controller is None:
+            return
+        try:
+            self._obs_controller.stop_recording()
+        except OBSConnectionError as e:
+            print(e)
+
+    def close(self):
+        if self._pipeline:
+            self._pipeline.stop()
+        if self._obs_controller:
+            self._obs_controller.close()
+        if self._flight_recorder:
+            self._flight_recorder.close()
+        if self._profiler:
+            self._profiler.stop()
+        if self._owns_tracer:
+            self._tracer.close()
+
+
+def _suspend():
+    system_name = platform.system()
+    if system_name == "Darwin":
+        os.system("pmset sleepnow")
+    if system_name == "Linux":
+        os.system("systemctl suspend")
+    if system_name == "Windows":
+        os.system("rundll32.exe powrprof.dll,SetSuspendState 0,1,0")
+
+
+def _warm_up(config: dict[str, Any]):
+    """
+    Validates the config and imports the modules of the analysis, off the path to the recording start.
+    """
+    validate_config(config)
+    import teams_controller
+
+    if config["pipeline"]["enabled"]:
+        import frame_pipeline
+
 
 if __name__ == "__main__":
     app = App()
-    while app.update():
-        pass
+    try:
+        while app.update():
+            app.wait()
+    finally:
+        app.close()
+
@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+from os import path as p
+from time import perf_counter
+from typing import Any, Optional
+
+import cv2
+import numpy as np
+
+from constants import (
+    PROJECT_DIR_ABS_PATH,
+    TEST_IMAGES_DIR_ABS_PATH,
+    TEST_LABELS_FILE_NAME,
+    BENCHMARK_BASELINE_ABS_PATH,
+)
+from ocr_service import OCRService
+from template_bank import TemplateBank
+from teams_controller import (
+    TeamsController,
+    ElementNotFoundException,
+    ParticipantsNumberNotVisibleException,
+)
+from tracing import Tracer
+
+STAGES = ("capture", "grayscale", "template_match", "red_check", "ocr")
+
+
+class Sample:
+    """
+    Stage durations, memory peak, frame buffers allocated and accuracy of a single 'extract_data' call.
+    """
+
+    def __init__(self, tracer: Tracer, total: float, memory_peak: int) -> None:
+        self.stages = {stage: sum(tracer.spans.get(stage, ())) for stage in STAGES}
+        self.buffer_allocations = tracer.counters["frame_buffer_alloc"]
+        self.total = total
+        self.memory_peak = memory_peak
+        self.failure: Optional[str] = None
+
+
+def load_frame_set(dir_path: str) -> tuple[bool, list[tuple[str, Optional[dict]]]]:
+    """
+    Returns whether the frames of the directory form a recorded sequence and its (file, label) pairs.
+    Frames without a label are replayed, but their results aren't checked.
+    """
+    labels_path = p.join(dir_path, TEST_LABELS_FILE_NAME)
+    labels: dict[str, Any] = {}
+    if p.exists(labels_path):
+        with open(labels_path, "r") as json_file:
+            labels = json.load(json_file)
+    frames = labels.get("frames", {})
+    files = sorted(file for file in os.listdir(dir_path) if file.endswith(".png"))
+    return labels.get("sequence", True), [
+        (p.join(dir_path, file), frames.get(file)) for file in files
+    ]
+
+
+def check_sample(ctrl: TeamsController, label: dict, error: Optional[Exception]):
+    expected_duration = label.get("meeting_duration")
+    expected_participants = label.get("participants_number")
+
+    if isinstance(error, ElementNotFoundException):
+        return str(error)
+    duration_text = ctrl.meeting_duration_text
+    if expected_duration is not None and (
+        not duration_text or duration_text.text != expected_duration
+    ):
+        found = duration_text.text if duration_text else None
+        return f"meeting duration {found} != {expected_duration}"
+    if expected_participants is None:
+        if not isinstance(error, ParticipantsNumberNotVisibleException):
+            return "raised hand not detected"
+    elif error is not None:
+        return str(error)
+    elif ctrl.participants_number != expected_participants:
+        return f"participants number {ctrl.participants_number} != {expected_participants}"
+    return None
+
+
+def run_tick(
+    ctrl: TeamsController, tracer: Tracer, label: Optional[dict]
+) -> Sample:
+    tracer.reset()
+    tracemalloc.reset_peak()
+    error: Optional[Exception] = None
+    start = perf_counter()
+    try:
+        ctrl.extract_data()
+    except (ElementNotFoundException, ParticipantsNumberNotVisibleException) as e:
+        error = e
+    total = perf_counter() - start
+    sample = Sample(tracer, total, tracemalloc.get_traced_memory()[1])
+    if label is not None:
+        sample.failure = check_sample(ctrl, label, error)
+    return sample
+
+
+def run_frame_set(
+    dir_path: str, ticks: int, template_bank: TemplateBank, ocr_service: OCRService
+) -> tuple[list[Sample], list[Sample], list[str]]:
+    """
+    Recorded sequences are replayed in order through a single controller.
+    Other frames are calibrated one by one and then replayed 'ticks' times each.
+    """
+    sequence, frames = load_frame_set(dir_path)
+    calibration: list[Sample] = []
+    steady: list[Sample] = []
+    failures: list[str] = []
+
+    def controller(screenshots: tuple) -> tuple[TeamsController, Tracer]:
+        tracer = Tracer()
+        ctrl = TeamsController(
+            screenshot_overrides=screenshots,
+            template_bank=template_bank,
+            ocr_service=ocr_service,
+            tracer=tracer,
+        )
+        return ctrl, tracer
+
+    if sequence:
+        screenshots = tuple(cv2.imread(file) for file, _ in frames)
+        ctrl, tracer = controller(screenshots)
+        for i, (file, label) in enumerate(frames):
+            sample = run_tick(ctrl, tracer, label)
+            (calibration if i == 0 else steady).append(sample)
+            if sample.failure:
+                failures.append(f"{file}: {sample.failure}")
+        return calibration, steady, failures
+
+    for file, label in frames:
+        ctrl, tracer = controller((cv2.imread(file),))
+        for i in range(ticks + 1):
+            sample = run_tick(ctrl, tracer, label)
+            (calibration if i == 0 else steady).append(sample)
+            if sample.failure:
+                failures.append(f"{file} (tick {i}): {sample.failure}")
+                break
+    return calibration, steady, failures
+
+
+def summarize(samples: list[Sample]) -> dict[str, Any]:
+    def percentiles(values: list[float]) -> dict[str, float]:
+        if not values:
+            return {}
+        ms = np.array(values) * 1000
+        return {
+            "p50": float(np.percentile(ms, 50)),
+            "p90": float(np.percentile(ms, 90)),
+            "p99": float(np.percentile(ms, 99)),
+            "max": float(ms.max()),
+        }
+
+    return {
+        "count": len(samples),
+        "total_ms": percentiles([sample.total for sample in samples]),
+        "stages_ms": {
+            stage: percentiles([sample.stages[stage] for sample in samples])
+            for stage in STAGES
+        },
+        "memory_peak_bytes": max((sample.memory_peak for sample in samples), default=0),
+        "frame_buffer_allocations": sum(sample.buffer_allocations for sample in samples),
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    if result["accuracy"] < baseline["accuracy"]:
+        regressions.append(
+            f"accuracy {result['accuracy']:.3f} < {baseline['accuracy']:.3f}"
+        )
+    for phase in ("calibration", "steady"):
+        for key in ("p50", "p90"):
+            current = result[phase]["total_ms"].get(key)
+            expected = baseline[phase]["total_ms"].get(key)
+            if current is not None and expected and current > expected * (
+                1 + tolerance
+            ):
+                regressions.append(
+                    f"{phase} {key} {current:.1f} ms > {expected:.1f} ms"
+                )
+        current = result[phase]["memory_peak_bytes"]
+        expected = baseline[phase]["memory_peak_bytes"]
+        if expected and current > expected * (1 + tolerance):
+            regressions.append(f"{phase} memory peak {current} B > {expected} B")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Replays recorded frames through TeamsController, "
+        "measuring per-stage latency, memory and accuracy."
+    )
+    parser.add_argument(
+        "dirs",
+        nargs="*",
+        default=[TEST_IMAGES_DIR_ABS_PATH],
+        help="directories with PNG frames and an optional labels.json",
+    )
+    parser.add_argument("--ticks", type=int, default=10)
+    parser.add_argument("--baseline", default=BENCHMARK_BASELINE_ABS_PATH)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="save the results as the baseline, which is required before the first comparison",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed relative slowdown against the baseline",
+    )
+    args = parser.parse_args()
+    dirs = [p.abspath(dir_path) for dir_path in args.dirs]
+    baseline_path = p.abspath(args.baseline)
+    os.chdir(PROJECT_DIR_ABS_PATH)  # config.json is read from the working directory
+
+    tracemalloc.start()
+    template_bank = TemplateBank()
+    ocr_service = OCRService()
+    calibration: list[Sample] = []
+    steady: list[Sample] = []
+    failures: list[str] = []
+    for dir_path in dirs:
+        c, s, f = run_frame_set(dir_path, args.ticks, template_bank, ocr_service)
+        calibration += c
+        steady += s
+        failures += f
+    ocr_service.close()
+    tracemalloc.stop()
+
+    checked = len(calibration) + len(steady)
+    result = {
+        "accuracy": 1 - len(failures) / checked if checked else 0.0,
+        "failures": failures,
+        "calibration": summarize(calibration),
+        "steady": summarize(steady),
+    }
+    print(json.dumps(result, indent=4))
+
+    if args.update_baseline:
+        with open(baseline_path, "w") as json_file:
+            json.dump(result, json_file, indent=4)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+
+    if not p.exists(baseline_path):
+        # timings depend on the machine, the baseline is recorded on the one running the suite
+        print("No baseline to compare with, run with --update-baseline to create it")
+        return 1
+    with open(baseline_path, "r") as json_file:
+        baseline = json.load(json_file)
+    regressions = compare(result, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import sys
+from os import path as p
+from typing import Any, Optional
+
+import cv2
+import numpy as np
+
+from constants import PROJECT_DIR_ABS_PATH, TEST_IMAGES_DIR_ABS_PATH
+from exceptions import ElementNotFoundException, ParticipantsNumberNotVisibleException
+from ocr_service import OCRService
+from teams_controller import TeamsController
+from template_bank import TemplateBank
+from tracing import Tracer
+
+# width, height and pixels per screen point, the usual display scaling of such screens;
+# the test frames were taken at 2880x1800 with 2 pixels per point
+RESOLUTIONS = {
+    "1080p": (1920, 1080, 1.5),
+    "1440p": (2560, 1440, 1.5),
+    "4K": (3840, 2160, 2),
+    "5K": (5120, 2880, 2),
+}
+TEST_FRAMES_PIXEL_RATIO = 2
+
+MODES = {
+    "full": {"coarse_to_fine": False, "top_bar_prior": False},
+    "top_bar": {"coarse_to_fine": False, "top_bar_prior": True},
+    "pyramid": {"coarse_to_fine": True, "top_bar_prior": True},
+}
+CALIBRATED_ELEMENTS = ("leave_button", "shield_icon", "people_icon")
+
+
+def render_frame(
+    frame: cv2.typing.MatLike, width: int, height: int, pixel_ratio: float
+) -> cv2.typing.MatLike:
+    """
+    Renders 'frame' on a screen of the given size, keeping the UI size in screen points.
+    The part of the screen the frame doesn't cover is filled with its mirrored content.
+    """
+    ratio = pixel_ratio / TEST_FRAMES_PIXEL_RATIO
+    if ratio != 1:
+        frame = cv2.resize(frame, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA)
+    frame = frame[:height, :width]
+    return cv2.copyMakeBorder(
+        frame,
+        0,
+        height - frame.shape[0],
+        0,
+        width - frame.shape[1],
+        cv2.BORDER_REFLECT,
+    )
+
+
+def calibrate(
+    frame: cv2.typing.MatLike,
+    mode: dict[str, bool],
+    template_bank: TemplateBank,
+    ocr_service: OCRService,
+) -> tuple[float, dict[str, Optional[dict]]]:
+    """
+    Calibrates a new controller on 'frame'. Returns the time spent finding the elements and the elements found.
+    """
+    tracer = Tracer()
+    ctrl = TeamsController(
+        screenshot_overrides=(frame,),
+        template_bank=template_bank,
+        ocr_service=ocr_service,
+        tracer=tracer,
+        **mode,
+    )
+    try:
+        ctrl.extract_data()
+    except (ElementNotFoundException, ParticipantsNumberNotVisibleException):
+        pass
+    elements = {}
+    for name in CALIBRATED_ELEMENTS:
+        element = getattr(ctrl, f"_{name}")
+        elements[name] = element.as_dict() if element else None
+    return sum(tracer.spans.get("find_elements", ())), elements
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Measures the calibration time of every search mode on test frames "
+        "rendered at several screen resolutions and checks that the modes find the same elements."
+    )
+    parser.add_argument(
+        "dir",
+        nargs="?",
+        default=TEST_IMAGES_DIR_ABS_PATH,
+        help="directory with PNG frames taken at 2880x1800",
+    )
+    parser.add_argument("--resolutions", nargs="*", default=list(RESOLUTIONS))
+    args = parser.parse_args()
+    dir_path = p.abspath(args.dir)
+    os.chdir(PROJECT_DIR_ABS_PATH)  # config.json is read from the working directory
+
+    files = sorted(file for file in os.listdir(dir_path) if file.endswith(".png"))
+    template_bank = TemplateBank()
+    ocr_service = OCRService()
+    result: dict[str, Any] = {}
+    mismatches = []
+    for resolution in args.resolutions:
+        width, height, pixel_ratio = RESOLUTIONS[resolution]
+        times: dict[str, list[float]] = {mode: [] for mode in MODES}
+        calibrated = {mode: 0 for mode in MODES}
+        for file in files:
+            frame = render_frame(
+                cv2.imread(p.join(dir_path, file)), width, height, pixel_ratio
+            )
+            found = {}
+            for mode, options in MODES.items():
+                duration, found[mode] = calibrate(
+                    frame, options, template_bank, ocr_service
+                )
+                times[mode].append(duration)
+                calibrated[mode] += all(found[mode].values())
+            for mode in MODES:
+                if found[mode] != found["full"]:
+                    mismatches.append(f"{resolution} {file}: {mode} != full")
+        result[resolution] = {
+            mode: {
+                "median_ms": float(np.median(durations) * 1000),
+                "max_ms": float(np.max(durations) * 1000),
+                "calibrated": f"{calibrated[mode]}/{len(files)}",
+            }
+            for mode, durations in times.items()
+        }
+    ocr_service.close()
+
+    result["mismatches"] = mismatches
+    print(json.dumps(result, indent=4))
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
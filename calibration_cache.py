@@ -0,0 +1,140 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from multiprocessing import shared_memory
+from os import path as p
+from time import time
+from typing import Any, Optional
+
+
+class CalibrationCache:
+    """
+    Stores calibrated element offsets on disk, so a restarted app can skip the full-screen calibration.
+
+    Entries are keyed by a dict describing everything the offsets depend on (screen resolution, DPI scale,
+    window geometry and template file hashes); a change of any of them is a miss.
+    Only the 'max_entries' most recently saved entries are kept. Apps in several threads may share a cache.
+    """
+
+    def __init__(self, file_path: str, max_entries: int = 16) -> None:
+        self.file_path = file_path
+        self.max_entries = max_entries
+        self._lock: Any = threading.RLock()
+
+    def load(self, key: dict[str, Any]) -> Optional[dict[str, Any]]:
+        entry = self._read().get(_digest(key))
+        if entry is None:
+            return None
+        return entry["calibration"]
+
+    def save(self, key: dict[str, Any], calibration: dict[str, Any]) -> None:
+        # entries saved by other threads or processes meanwhile are kept
+        with self._lock:
+            entries = self._read()
+            entries[_digest(key)] = {
+                "saved_at": time(),
+                "key": key,
+                "calibration": calibration,
+            }
+            newest = sorted(entries.items(), key=lambda item: item[1]["saved_at"])
+            self._write(dict(newest[-self.max_entries :]))
+
+    def _write(self, entries: dict[str, Any]) -> None:
+        os.makedirs(p.dirname(self.file_path), exist_ok=True)
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, "w") as json_file:
+            json.dump(entries, json_file, indent=4)
+        os.replace(tmp_path, self.file_path)
+
+    def _read(self) -> dict[str, Any]:
+        if not p.exists(self.file_path):
+            return {}
+        try:
+            with open(self.file_path, "r") as json_file:
+                return json.load(json_file)
+        except (OSError, ValueError):
+            return {}
+
+
+class SharedCalibrationCache(CalibrationCache):
+    """
+    Calibration cache kept in a shared memory block instead of the file, so processes recording on identical
+    screens, like the sessions of a fleet, restore the calibration one of them found.
+
+    The block holds the length of the JSON entries followed by the JSON; 'lock' serializes the processes.
+    'create' loads the block from the file and 'persist' writes it back. When the entries outgrow the block,
+    the oldest ones are dropped. Instances are passed to other processes when they're started.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        memory: shared_memory.SharedMemory,
+        lock: Any,
+        max_entries: int = 16,
+    ) -> None:
+        super().__init__(file_path, max_entries)
+        self._memory = memory
+        self._lock = lock
+
+    @classmethod
+    def create(
+        cls, file_path: str, size: int, max_entries: int = 16, context: Any = None
+    ) -> "SharedCalibrationCache":
+        context = context or multiprocessing.get_context()
+        memory = shared_memory.SharedMemory(create=True, size=size)
+        memory.buf[:_LENGTH_SIZE] = bytes(_LENGTH_SIZE)
+        cache = cls(file_path, memory, context.RLock(), max_entries)
+        cache._write(CalibrationCache._read(cache))
+        return cache
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = dict(self.__dict__)
+        state["_memory"] = self._memory.name
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        # the block belongs to the creating process, which unlinks it
+        from shared_arrays import attach_shared_memory
+
+        self.__dict__.update(state, _memory=attach_shared_memory(state["_memory"]))
+
+    def persist(self) -> None:
+        CalibrationCache._write(self, self._read())
+
+    def close(self) -> None:
+        self._memory.close()
+
+    def unlink(self) -> None:
+        self._memory.unlink()
+
+    def _read(self) -> dict[str, Any]:
+        with self._lock:
+            length = int.from_bytes(self._memory.buf[:_LENGTH_SIZE], "little")
+            data = bytes(self._memory.buf[_LENGTH_SIZE : _LENGTH_SIZE + length])
+        return json.loads(data) if length else {}
+
+    def _write(self, entries: dict[str, Any]) -> None:
+        newest = sorted(entries.items(), key=lambda item: item[1]["saved_at"])
+        while True:
+            data = json.dumps(dict(newest)).encode()
+            if _LENGTH_SIZE + len(data) <= self._memory.size or not newest:
+                break
+            newest.pop(0)
+        with self._lock:
+            self._memory.buf[:_LENGTH_SIZE] = len(data).to_bytes(_LENGTH_SIZE, "little")
+            self._memory.buf[_LENGTH_SIZE : _LENGTH_SIZE + len(data)] = data
+
+
+_LENGTH_SIZE = 8
+
+
+def file_hash(file_path: str) -> str:
+    with open(file_path, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def _digest(key: dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
@@ -0,0 +1,33 @@
+import json
+from functools import lru_cache
+from typing import Any
+
+
+@lru_cache(maxsize=None)
+def load_config(path: str = "config.json") -> dict[str, Any]:
+    """
+    Parses the config file once per process; all components share the returned dict.
+    """
+    with open(path, "r") as json_file:
+        return json.load(json_file)
+
+
+def validate_config(config: dict[str, Any]) -> None:
+    """
+    Checks the config against 'config_schema.Config', raising pydantic's 'ValidationError' on mismatch.
+    The schema is imported here, because pydantic is slow to import and validation can run off the startup path.
+    """
+    from config_schema import Config
+
+    Config.model_validate(config)
+
+
+def validate_jobs(jobs: list[dict[str, Any]]) -> None:
+    """
+    Checks the job list of a fleet against 'config_schema.FleetJob', like 'validate_config'.
+    """
+    from pydantic import TypeAdapter
+
+    from config_schema import FleetJob
+
+    TypeAdapter(list[FleetJob]).validate_python(jobs)
@@ -0,0 +1,123 @@
+from datetime import datetime
+from typing import Annotated, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+TimeStr = Annotated[str, Field(pattern=r"^\d+:\d{2}:\d{2}$")]
+PositiveFloat = Annotated[float, Field(gt=0)]
+PositiveInt = Annotated[int, Field(gt=0)]
+Port = Annotated[int, Field(gt=0, lt=65536)]
+
+
+class TeamsSection(BaseModel):
+    path: str
+    excluded_names: list[str]
+
+
+class OBSSection(BaseModel):
+    path: str
+    host: str
+    port: Port
+    password: str
+    connect_timeout: PositiveFloat
+
+
+class SettingsSection(BaseModel):
+    min_time: TimeStr
+    max_time: TimeStr
+    min_participants: Annotated[int, Field(ge=0)]
+    min_participants_ratio: Annotated[float, Field(ge=0, le=1)]
+    participants_window: PositiveInt
+    participants_halflife: TimeStr
+    outlier_ratio: Annotated[float, Field(gt=0)]
+    outlier_confirmations: PositiveInt
+    poll_interval: PositiveFloat
+    fast_poll_interval: PositiveFloat
+    boundary_margin: TimeStr
+    clock_verify_interval: PositiveFloat
+    clock_drift_tolerance: Annotated[float, Field(ge=0)]
+    loading_sound_path: str
+    warning_sound_path: str
+
+
+class MonitorsSection(BaseModel):
+    obs_ports: list[Port]
+
+
+class PipelineSection(BaseModel):
+    enabled: bool
+    capture_interval: PositiveFloat
+    queue_size: PositiveInt
+    sample_timeout: PositiveFloat
+
+
+class FlightRecorderSection(BaseModel):
+    enabled: bool
+    frames: PositiveInt
+    max_memory_mb: PositiveInt
+    min_interval: Annotated[float, Field(ge=0)]
+    max_disk_usage_mb: PositiveInt
+
+
+class DetectionSection(BaseModel):
+    match_threshold: Annotated[float, Field(gt=0, le=1)]
+    people_icon_match_threshold: Annotated[float, Field(gt=0, le=1)]
+    scale_min: PositiveFloat
+    scale_max: PositiveFloat
+    scale_steps: PositiveInt
+    binarize_threshold: Annotated[int, Field(ge=0, le=255)]
+    tesseract_psm: Annotated[int, Field(ge=0, le=13)]
+
+    @model_validator(mode="after")
+    def check_scales(self) -> "DetectionSection":
+        if self.scale_min > self.scale_max:
+            raise ValueError("scale_min is greater than scale_max")
+        return self
+
+
+class FleetSection(BaseModel):
+    max_sessions: PositiveInt
+    virtual_displays: bool
+    screen_size: tuple[PositiveInt, PositiveInt]
+    max_calibrations: Annotated[int, Field(ge=0)]
+    max_ocr: Annotated[int, Field(ge=0)]
+    max_restarts: Annotated[int, Field(ge=0)]
+    restart_backoff: Annotated[float, Field(ge=0)]
+    hang_timeout: PositiveFloat
+    report_interval: PositiveFloat
+    calibration_memory_kb: PositiveInt
+
+
+class TracingSection(BaseModel):
+    enabled: bool
+    profiler_enabled: bool
+    profiler_interval: PositiveFloat
+
+
+class Config(BaseModel):
+    """
+    Schema of config.json. The app reads the parsed dict directly; the schema only validates it.
+    """
+
+    teams: TeamsSection
+    obs: OBSSection
+    settings: SettingsSection
+    monitors: MonitorsSection
+    pipeline: PipelineSection
+    flight_recorder: FlightRecorderSection
+    detection: DetectionSection
+    fleet: FleetSection
+    tracing: TracingSection
+
+
+class FleetJob(BaseModel):
+    """
+    Entry of the job list of 'fleet.py'.
+    """
+
+    name: str
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    display: Optional[str] = None
+    obs_port: Optional[Port] = None
+    launch: list[list[str]] = []
@@ -1,9 +1,20 @@
 from os import path as p
 
 PROJECT_DIR_ABS_PATH = p.abspath(p.realpath(p.dirname(__file__)))
+CONFIG_ABS_PATH = p.join(PROJECT_DIR_ABS_PATH, "config.json")
 TEAMS_DEBUG_IMAGES_DIR_ABS_PATH = p.join(PROJECT_DIR_ABS_PATH, "teams_controller_debug")
 RESOURCES_DIR_ABS_PATH = p.join(PROJECT_DIR_ABS_PATH, "resources")
 TEAMS_LEAVE_BUTTON_ABS_PATH = p.join(RESOURCES_DIR_ABS_PATH, "teams_leave_button.png")
 TEAMS_PEOPLE_ICON_ABS_PATH = p.join(RESOURCES_DIR_ABS_PATH, "teams_people_icon.png")
 TEAMS_SHIELD_ICON_ABS_PATH = p.join(RESOURCES_DIR_ABS_PATH, "teams_shield_icon.png")
 TEST_IMAGES_DIR_ABS_PATH = p.join(RESOURCES_DIR_ABS_PATH, "test")
+GLYPHS_DIR_ABS_PATH = p.join(RESOURCES_DIR_ABS_PATH, "glyphs")
+MEETING_DURATION_GLYPHS_ABS_PATH = p.join(GLYPHS_DIR_ABS_PATH, "meeting_duration.npz")
+PARTICIPANTS_NUMBER_GLYPHS_ABS_PATH = p.join(
+    GLYPHS_DIR_ABS_PATH, "participants_number.npz"
+)
+TEST_LABELS_FILE_NAME = "labels.json"
+BENCHMARK_BASELINE_ABS_PATH = p.join(TEST_IMAGES_DIR_ABS_PATH, "benchmark_baseline.json")
+TRACES_DIR_ABS_PATH = p.join(PROJECT_DIR_ABS_PATH, "traces")
+CALIBRATION_CACHE_ABS_PATH = p.join(PROJECT_DIR_ABS_PATH, "calibration_cache.json")
+FLEET_METRICS_ABS_PATH = p.join(PROJECT_DIR_ABS_PATH, "fleet_metrics.json")
@@ -0,0 +1,86 @@
+from typing import Optional
+
+import cv2
+
+from frame_buffers import FrameBufferPool
+from models import ElementArea
+from tracing import NULL_TRACER, Tracer
+
+
+class DerivedFrame:
+    """
+    Screenshot of a single tick with the images derived from it, each computed lazily at most once.
+
+    'origin' is the position of the screenshot in full frame coordinates, the ones areas are expressed in.
+    The grayscale image is converted for the whole screenshot, HSV and binarized images only for the requested areas.
+    The grayscale buffer is taken from 'buffers', if given, and given back by 'release'.
+    """
+
+    def __init__(
+        self,
+        bgr: cv2.typing.MatLike,
+        origin: tuple[int, int] = (0, 0),
+        tracer: Tracer = NULL_TRACER,
+        buffers: Optional[FrameBufferPool] = None,
+    ) -> None:
+        self.bgr = bgr
+        self.origin = origin
+        self._tracer = tracer
+        self._buffers = buffers
+        self._gray: Optional[cv2.typing.MatLike] = None
+        self._hsv: dict[Optional[ElementArea], cv2.typing.MatLike] = {}
+        self._binary: dict[tuple[Optional[ElementArea], int], cv2.typing.MatLike] = {}
+
+    def crop(
+        self, img: cv2.typing.MatLike, area: Optional[ElementArea]
+    ) -> cv2.typing.MatLike:
+        """
+        View of 'img', the screenshot or an image derived from it, under 'area'.
+        """
+        if not area:
+            return img
+        x = area.x - self.origin[0]
+        y = area.y - self.origin[1]
+        return img[max(y, 0) : max(y + area.h, 0), max(x, 0) : max(x + area.w, 0)]
+
+    def gray(self, area: Optional[ElementArea] = None) -> cv2.typing.MatLike:
+        if self._gray is None:
+            with self._tracer.span("grayscale"):
+                if self._buffers is None:
+                    self._gray = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+                else:
+                    self._gray = self._buffers.acquire(self.bgr.shape[:2])
+                    cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        return self.crop(self._gray, area)
+
+    def hsv(self, area: Optional[ElementArea] = None) -> cv2.typing.MatLike:
+        hsv = self._hsv.get(area)
+        if hsv is None:
+            hsv = cv2.cvtColor(self.crop(self.bgr, area), cv2.COLOR_BGR2HSV)
+            self._hsv[area] = hsv
+        return hsv
+
+    def binary(
+        self, area: Optional[ElementArea] = None, threshold: int = 150
+    ) -> cv2.typing.MatLike:
+        """
+        Grayscale image under 'area' binarized to dark text on a white background, as expected by the OCR.
+        """
+        key = (area, threshold)
+        binary = self._binary.get(key)
+        if binary is None:
+            _, binary = cv2.threshold(
+                self.gray(area), threshold, 255, cv2.THRESH_BINARY_INV
+            )
+            self._binary[key] = binary
+        return binary
+
+    def release(self) -> None:
+        """
+        Gives the pooled buffers back. Images derived before must not be used afterwards.
+        """
+        if self._buffers is not None and self._gray is not None:
+            self._buffers.release(self._gray)
+        self._gray = None
+        self._hsv.clear()
+        self._binary.clear()
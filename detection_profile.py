@@ -0,0 +1,38 @@
+from typing import Any, NamedTuple
+
+
+class DetectionProfile(NamedTuple):
+    """
+    Parameters of the element and text detection of 'TeamsController', read from the 'detection' section
+    of config.json. The cheapest ones still reading a host's meetings correctly are found by 'detection_tuner.py'.
+
+    Templates match at a 'match_threshold' score ('people_icon_match_threshold' for the people icon) at
+    'scale_steps' scales from 'scale_min' to 'scale_max'. Texts are binarized at 'binarize_threshold'
+    and read by tesseract in the '--psm' page segmentation mode 'tesseract_psm'.
+    """
+
+    match_threshold: float = 0.8
+    people_icon_match_threshold: float = 0.7
+    scale_min: float = 0.5
+    scale_max: float = 1.5
+    scale_steps: int = 20
+    binarize_threshold: int = 150
+    tesseract_psm: int = 6
+
+    @classmethod
+    def from_settings(cls, settings: dict[str, Any]) -> "DetectionProfile":
+        return cls(**{field: settings[field] for field in cls._fields})
+
+    @property
+    def scales(self) -> tuple[float, float, int]:
+        """
+        Scale grid of the template pyramids, as taken by 'TemplateBank'.
+        """
+        return self.scale_min, self.scale_max, self.scale_steps
+
+    @property
+    def tesseract_config(self) -> str:
+        return (
+            f"--oem 3 --psm {self.tesseract_psm} "
+            "-c tessedit_char_whitelist=0123456789:"
+        )
@@ -0,0 +1,444 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from os import path as p
+from typing import Any, Iterable, NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+from benchmark import load_frame_set, run_tick
+from config import validate_config
+from constants import CONFIG_ABS_PATH, PROJECT_DIR_ABS_PATH, TEST_IMAGES_DIR_ABS_PATH
+from detection_profile import DetectionProfile
+from ocr_service import OCRService
+from screen_capture import StreamCapture
+from teams_controller import TeamsController
+from template_bank import TemplateBank
+from tracing import Tracer
+
+# values tried for every parameter of the profile; the tesseract input is a vertical mosaic of the texts,
+# so only the page segmentation modes reading several lines are searched
+SEARCH_SPACE: dict[str, tuple] = {
+    "match_threshold": (0.7, 0.8, 0.9),
+    "people_icon_match_threshold": (0.6, 0.7, 0.8),
+    "scale_min": (0.5, 0.75),
+    "scale_max": (1.25, 1.5),
+    "scale_steps": (10, 15, 20),
+    "binarize_threshold": (120, 150, 180),
+    "tesseract_psm": (4, 6, 11),
+}
+
+
+class Case(NamedTuple):
+    """
+    Part of the corpus evaluated as a whole: a recorded sequence replayed in order through one controller,
+    or a single frame calibrated on and replayed 'ticks' times.
+    """
+
+    name: str
+    frames: tuple[tuple[str, Optional[dict]], ...]
+    sequence: bool
+
+
+class CaseResult(NamedTuple):
+    calibration: float
+    steady: tuple[float, ...]
+    failure: Optional[str]
+
+
+class Evaluation:
+    """
+    Results of a profile on the cases evaluated so far. A case with a failure counts as misread.
+    """
+
+    def __init__(self, profile: DetectionProfile) -> None:
+        self.profile = profile
+        self.results: dict[str, CaseResult] = {}
+
+    @property
+    def accuracy(self) -> float:
+        if not self.results:
+            return 0.0
+        failed = sum(result.failure is not None for result in self.results.values())
+        return 1 - failed / len(self.results)
+
+    @property
+    def calibration_ms(self) -> float:
+        return _median_ms([result.calibration for result in self.results.values()])
+
+    @property
+    def tick_ms(self) -> float:
+        return _median_ms(
+            [tick for result in self.results.values() for tick in result.steady]
+        )
+
+    @property
+    def latency_ms(self) -> float:
+        """
+        Time to calibrate on a frame and run one more tick, the cost the profile is tuned for.
+        """
+        return self.calibration_ms + self.tick_ms
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "profile": self.profile._asdict(),
+            "cases": len(self.results),
+            "accuracy": self.accuracy,
+            "calibration_ms": self.calibration_ms,
+            "tick_ms": self.tick_ms,
+            "latency_ms": self.latency_ms,
+            "failures": {
+                name: result.failure
+                for name, result in self.results.items()
+                if result.failure is not None
+            },
+        }
+
+
+def load_cases(dirs: list[str]) -> list[Case]:
+    """
+    Cases of the frame directories, as read by 'benchmark.load_frame_set'. Single frames without a label
+    can't be checked and are left out.
+    """
+    cases = []
+    for dir_path in dirs:
+        sequence, frames = load_frame_set(dir_path)
+        if sequence:
+            cases.append(Case(dir_path, tuple(frames), True))
+            continue
+        for file, label in frames:
+            if label is not None:
+                cases.append(Case(file, ((file, label),), False))
+    return cases
+
+
+def candidates(space: dict[str, Iterable]) -> list[DetectionProfile]:
+    """
+    Profiles of all combinations of the values of 'space', parameters missing from it keep their defaults.
+    """
+    names = list(space)
+    profiles = []
+    for values in itertools.product(*(space[name] for name in names)):
+        profile = DetectionProfile()._replace(**dict(zip(names, values)))
+        if profile.scale_min <= profile.scale_max:
+            profiles.append(profile)
+    return profiles
+
+
+class CaseRunner:
+    """
+    Runs cases through new controllers configured with the evaluated profile; one runner per worker process
+    keeps the template pyramids of the profiles it has seen and a tesseract instance.
+    """
+
+    def __init__(self, config: dict[str, Any], ticks: int) -> None:
+        self._config = config
+        self._ticks = ticks
+        self._template_bank = TemplateBank()
+        self._ocr_service = OCRService()
+
+    def run(self, profile: DetectionProfile, case: Case) -> CaseResult:
+        capture = StreamCapture()
+        tracer = Tracer()
+        ctrl = TeamsController(
+            capture=capture,
+            template_bank=self._template_bank,
+            ocr_service=self._ocr_service,
+            tracer=tracer,
+            config={**self._config, "detection": profile._asdict()},
+        )
+        if case.sequence:
+            ticks = [(cv2.imread(file), label) for file, label in case.frames]
+        else:
+            (file, label), = case.frames
+            ticks = [(cv2.imread(file), label)] * (self._ticks + 1)
+
+        durations = []
+        for img, label in ticks:
+            capture.feed(img)
+            sample = run_tick(ctrl, tracer, label)
+            durations.append(sample.total)
+            if sample.failure:
+                return CaseResult(durations[0], tuple(durations[1:]), sample.failure)
+        return CaseResult(durations[0], tuple(durations[1:]), None)
+
+    def close(self) -> None:
+        self._ocr_service.close()
+
+
+_runner: Optional[CaseRunner] = None
+
+
+def _init_worker(config: dict[str, Any], ticks: int) -> None:
+    global _runner
+    _runner = CaseRunner(config, ticks)
+
+
+def _run_case(task: tuple[DetectionProfile, Case]) -> CaseResult:
+    return _runner.run(*task)
+
+
+class Tuner:
+    """
+    Searches detection profiles on a labelled corpus, evaluating every profile on a case in one task of
+    a pool of 'workers' processes. The latency is measured while the workers share the host, so the pool
+    should leave a core to every worker for the results to hold for a single app.
+    """
+
+    def __init__(
+        self, cases: list[Case], config: dict[str, Any], ticks: int, workers: int
+    ) -> None:
+        self._cases = cases
+        self._config = config
+        self._ticks = ticks
+        self._workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._runner: Optional[CaseRunner] = None
+
+    def __enter__(self) -> "Tuner":
+        if self._workers <= 1:
+            self._runner = CaseRunner(self._config, self._ticks)
+        else:
+            self._executor = ProcessPoolExecutor(
+                self._workers,
+                initializer=_init_worker,
+                initargs=(self._config, self._ticks),
+            )
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._runner:
+            self._runner.close()
+        if self._executor:
+            self._executor.shutdown(cancel_futures=True)
+
+    def evaluate(self, evaluations: list[Evaluation], cases: list[Case]) -> None:
+        """
+        Runs the evaluations on the cases they haven't been run on yet.
+        """
+        tasks = [
+            (evaluation, case)
+            for evaluation in evaluations
+            for case in cases
+            if case.name not in evaluation.results
+        ]
+        args = [(evaluation.profile, case) for evaluation, case in tasks]
+        if self._executor:
+            results = self._executor.map(_run_case, args, chunksize=4)
+        else:
+            results = (self._runner.run(*task) for task in args)
+        for (evaluation, case), result in zip(tasks, results):
+            evaluation.results[case.name] = result
+
+    def grid(self, profiles: list[DetectionProfile]) -> list[Evaluation]:
+        evaluations = [Evaluation(profile) for profile in profiles]
+        self.evaluate(evaluations, self._cases)
+        return evaluations
+
+    def halving(
+        self, profiles: list[DetectionProfile], eta: int = 3, min_cases: int = 1
+    ) -> list[Evaluation]:
+        """
+        Successive halving: all profiles are evaluated on the first 'min_cases' cases, the best 1/'eta' of them
+        on 'eta' times more cases and so on, until the survivors are evaluated on the whole corpus.
+        Profiles are ranked by accuracy first and latency second. Returns the survivors.
+        """
+        evaluations = [Evaluation(profile) for profile in profiles]
+        budget = max(min_cases, 1)
+        while budget < len(self._cases):
+            self.evaluate(evaluations, self._cases[:budget])
+            evaluations.sort(key=_rank)
+            evaluations = evaluations[: math.ceil(len(evaluations) / eta)]
+            print(
+                f"{len(evaluations)} profiles kept after {budget} cases", file=sys.stderr
+            )
+            budget *= eta
+        self.evaluate(evaluations, self._cases)
+        return evaluations
+
+
+def pareto_front(evaluations: list[Evaluation]) -> list[Evaluation]:
+    """
+    Evaluations no other one beats in both accuracy and latency, from the fastest to the most accurate.
+    """
+    front: list[Evaluation] = []
+    for evaluation in sorted(evaluations, key=lambda e: (e.latency_ms, -e.accuracy)):
+        if not front or evaluation.accuracy > front[-1].accuracy:
+            front.append(evaluation)
+    return front
+
+
+def choose(
+    front: list[Evaluation], min_accuracy: Optional[float] = None
+) -> Optional[Evaluation]:
+    """
+    Fastest evaluation of the front reaching 'min_accuracy', by default the best accuracy of the front.
+    """
+    if not front:
+        return None
+    if min_accuracy is None:
+        min_accuracy = front[-1].accuracy
+    for evaluation in front:
+        if evaluation.accuracy >= min_accuracy:
+            return evaluation
+    return None
+
+
+def write_profile(config_path: str, profile: DetectionProfile) -> None:
+    """
+    Replaces the 'detection' section of the config file with 'profile'.
+    """
+    with open(config_path, "r") as json_file:
+        config = json.load(json_file)
+    config["detection"] = profile._asdict()
+    validate_config(config)
+    tmp_path = config_path + ".tmp"
+    with open(tmp_path, "w") as json_file:
+        json.dump(config, json_file, indent=4)
+    os.replace(tmp_path, config_path)
+
+
+def table(evaluations: list[Evaluation], marks: dict[int, str]) -> str:
+    lines = [
+        f"{'acc':>5} {'calib ms':>9} {'tick ms':>8}  "
+        "threshold people scales        binarize psm"
+    ]
+    for evaluation in evaluations:
+        profile = evaluation.profile
+        scales = f"{profile.scale_min:g}-{profile.scale_max:g}/{profile.scale_steps}"
+        lines.append(
+            f"{evaluation.accuracy:>5.2f} {evaluation.calibration_ms:>9.1f} "
+            f"{evaluation.tick_ms:>8.1f}  {profile.match_threshold:>9g} "
+            f"{profile.people_icon_match_threshold:>6g} {scales:<13} "
+            f"{profile.binarize_threshold:>8} {profile.tesseract_psm:>3} "
+            f"{marks.get(id(evaluation), '')}"
+        )
+    return "\n".join(lines)
+
+
+def _rank(evaluation: Evaluation) -> tuple[float, float]:
+    return -evaluation.accuracy, evaluation.latency_ms
+
+
+def _median_ms(values: list[float]) -> float:
+    return float(np.median(values)) * 1000 if values else 0.0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Searches the detection parameters of TeamsController on labelled frames, "
+        "prints the Pareto front of latency versus accuracy and writes the chosen profile to config.json."
+    )
+    parser.add_argument(
+        "dirs",
+        nargs="*",
+        default=[TEST_IMAGES_DIR_ABS_PATH],
+        help="directories with PNG frames and a labels.json",
+    )
+    parser.add_argument("--search", choices=("halving", "grid"), default="halving")
+    parser.add_argument(
+        "--eta", type=int, default=3, help="reduction factor of successive halving"
+    )
+    parser.add_argument(
+        "--min-cases",
+        type=int,
+        default=1,
+        help="cases every profile is evaluated on by successive halving",
+    )
+    parser.add_argument(
+        "--space", help="JSON file mapping parameters to the values to search"
+    )
+    parser.add_argument(
+        "--ticks", type=int, default=3, help="ticks after the calibration of a frame"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--min-accuracy",
+        type=float,
+        help="accuracy the chosen profile must reach, the best one found by default",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the case order")
+    parser.add_argument("--config", default=CONFIG_ABS_PATH)
+    parser.add_argument(
+        "--write", action="store_true", help="write the chosen profile to the config"
+    )
+    parser.add_argument("-o", "--output", help="JSON file for all evaluations")
+    args = parser.parse_args()
+    dirs = [p.abspath(dir_path) for dir_path in args.dirs]
+    config_path = p.abspath(args.config)
+    output_path = p.abspath(args.output) if args.output else None
+    os.chdir(PROJECT_DIR_ABS_PATH)
+
+    with open(config_path, "r") as json_file:
+        config = json.load(json_file)
+    current = DetectionProfile.from_settings(config["detection"])
+    space = dict(SEARCH_SPACE)
+    if args.space:
+        with open(args.space, "r") as json_file:
+            space.update(json.load(json_file))
+    profiles = candidates(space)
+    if current not in profiles:
+        profiles.append(current)
+
+    cases = load_cases(dirs)
+    if not cases:
+        print("No labelled frames to tune on")
+        return 1
+    # successive halving starts with the first cases, which shouldn't all come from one directory
+    np.random.default_rng(args.seed).shuffle(cases)
+    print(
+        f"{len(profiles)} profiles, {len(cases)} cases, {args.search} search",
+        file=sys.stderr,
+    )
+
+    with Tuner(cases, config, args.ticks, args.workers) as tuner:
+        if args.search == "grid":
+            evaluations = tuner.grid(profiles)
+        else:
+            evaluations = tuner.halving(profiles, args.eta, args.min_cases)
+        baseline = next(
+            (e for e in evaluations if e.profile == current), Evaluation(current)
+        )
+        if baseline not in evaluations:
+            tuner.evaluate([baseline], cases)
+            evaluations.append(baseline)
+
+    front = pareto_front(evaluations)
+    chosen = choose(front, args.min_accuracy)
+    marks = {id(baseline): "current"}
+    if chosen:
+        marks[id(chosen)] = "chosen" if chosen is not baseline else "current, chosen"
+    rows = front + ([baseline] if baseline not in front else [])
+    print(table(rows, marks))
+
+    if output_path:
+        with open(output_path, "w") as json_file:
+            json.dump(
+                {
+                    "search": args.search,
+                    "cases": [case.name for case in cases],
+                    "front": [evaluation.summary() for evaluation in front],
+                    "chosen": chosen.summary() if chosen else None,
+                    "current": baseline.summary(),
+                    "evaluations": [evaluation.summary() for evaluation in evaluations],
+                },
+                json_file,
+                indent=4,
+            )
+
+    if chosen is None:
+        print(f"No profile reaches the accuracy of {args.min_accuracy}")
+        return 1
+    if args.write:
+        write_profile(config_path, chosen.profile)
+        print(f"Profile written to {config_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+import os
+import re
+from typing import NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+
+class GlyphMatch(NamedTuple):
+    """
+    Text decoded by 'GlyphRecognizer' with the bounding box of its glyphs, relative to the decoded image.
+    'confidence' is the lowest glyph score of the text.
+    """
+
+    text: str
+    confidence: float
+    x: int
+    y: int
+    w: int
+    h: int
+
+
+class GlyphRecognizer:
+    """
+    Recognizes short strings of digits and colons rendered in a fixed font, without calling tesseract.
+
+    Up to 'max_samples' distinct samples of every glyph are learned from images whose text is already known,
+    e.g. the labels of the test frames ('seed_glyphs') or tesseract reads, and glyphs are read as the character
+    of their closest sample. Texts not fully matching 'pattern' are neither learned nor returned.
+    Expects binarized images with dark text on a white background, as prepared by 'TeamsController._find_texts'.
+    """
+
+    ALPHABET = "0123456789:"
+
+    def __init__(
+        self,
+        glyph_size: int = 16,
+        min_confidence: float = 0.9,
+        min_margin: float = 0.05,
+        max_samples: int = 5,
+        pattern: Optional[str] = None,
+    ) -> None:
+        self.glyph_size = glyph_size
+        self.pattern = re.compile(pattern) if pattern else None
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+        self.max_samples = max_samples
+        dim = glyph_size * glyph_size
+        self._samples = np.zeros((len(self.ALPHABET), max_samples, dim), np.float32)
+        self._counts = np.zeros(len(self.ALPHABET), np.int32)
+
+    @property
+    def known_chars(self) -> str:
+        return "".join(c for c, n in zip(self.ALPHABET, self._counts) if n)
+
+    def learn(self, img: cv2.typing.MatLike, text: str) -> bool:
+        """
+        Adds the glyphs of 'img' as samples of the characters of 'text'.
+        Returns False if the text contains unsupported characters or doesn't segment into as many glyphs.
+        """
+        if not text or any(c not in self.ALPHABET for c in text):
+            return False
+        if self.pattern and not self.pattern.fullmatch(text):
+            return False
+        glyphs, _ = self._segment(img)
+        if len(glyphs) != len(text):
+            return False
+        for glyph, char in zip(glyphs, text):
+            i = self.ALPHABET.index(char)
+            count = self._counts[i]
+            if count >= self.max_samples:
+                continue
+            # the same rendering again would only take a place of another one
+            similarity = self._samples[i, :count] @ glyph
+            if count and similarity.max() >= DUPLICATE_SIMILARITY:
+                continue
+            self._samples[i, count] = glyph
+            self._counts[i] += 1
+        return True
+
+    def recognize(self, img: cv2.typing.MatLike) -> Optional[GlyphMatch]:
+        """
+        Returns the decoded text, or None if any glyph isn't recognized with enough confidence.
+        """
+        if not self._counts.any():
+            return None
+        glyphs, box = self._segment(img)
+        if not len(glyphs):
+            return None
+
+        # cosine similarity with the closest sample, glyphs x alphabet
+        scores = glyphs @ self._samples.reshape(-1, glyphs.shape[1]).T
+        scores = scores.reshape(len(glyphs), len(self.ALPHABET), self.max_samples)
+        learned = np.arange(self.max_samples) < self._counts[:, None]
+        scores = np.where(learned, scores, -1.0).max(axis=2)
+        order = np.argsort(scores, axis=1)
+        rows = np.arange(len(glyphs))
+        best = scores[rows, order[:, -1]]
+        second = scores[rows, order[:, -2]]
+        if best.min() < self.min_confidence:
+            return None
+        if (best - second).min() < self.min_margin:
+            return None
+
+        text = "".join(self.ALPHABET[i] for i in order[:, -1])
+        if self.pattern and not self.pattern.fullmatch(text):
+            return None
+        return GlyphMatch(text, float(best.min()), *box)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(
+            path,
+            glyph_size=self.glyph_size,
+            samples=self._samples,
+            counts=self._counts,
+        )
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "GlyphRecognizer":
+        data = np.load(path)
+        samples = data["samples"].astype(np.float32)
+        recognizer = cls(
+            glyph_size=int(data["glyph_size"]), max_samples=samples.shape[1], **kwargs
+        )
+        recognizer._samples = samples
+        recognizer._counts = data["counts"].astype(np.int32)
+        return recognizer
+
+    def _segment(
+        self, img: cv2.typing.MatLike
+    ) -> tuple[np.ndarray, tuple[int, int, int, int]]:
+        """
+        Splits the image into glyphs on ink-free columns.
+        Returns normalized glyph vectors and the bounding box of all of them.
+        """
+        no_glyphs = np.empty((0, self.glyph_size * self.glyph_size), np.float32)
+        ink = img < 128
+        columns = ink.sum(axis=0)
+        rows = np.flatnonzero(ink.sum(axis=1))
+        if not rows.size:
+            return no_glyphs, (0, 0, 0, 0)
+        top, bottom = rows[0], rows[-1] + 1
+        line_h = bottom - top
+
+        # start and end column of every run of columns containing ink
+        padded = np.concatenate(([0], (columns > 0).astype(np.int8), [0]))
+        edges = np.flatnonzero(np.diff(padded))
+        runs = [
+            (start, end)
+            for start, end in zip(edges[::2], edges[1::2])
+            if columns[start:end].sum() >= 4  # drop binarization specks
+        ]
+        if not runs:
+            return no_glyphs, (0, 0, 0, 0)
+
+        glyphs = np.empty((len(runs), self.glyph_size * self.glyph_size), np.float32)
+        for i, (start, end) in enumerate(runs):
+            glyph = ink[top:bottom, start:end].astype(np.float32)
+            # pad to a square so narrow glyphs keep their aspect ratio
+            side = max(line_h, end - start)
+            pad_x = side - (end - start)
+            pad_y = side - line_h
+            glyph = np.pad(
+                glyph,
+                ((pad_y // 2, pad_y - pad_y // 2), (pad_x // 2, pad_x - pad_x // 2)),
+            )
+            glyph = cv2.resize(
+                glyph, (self.glyph_size, self.glyph_size), interpolation=cv2.INTER_AREA
+            )
+            glyphs[i] = glyph.ravel()
+
+        x = int(runs[0][0])
+        w = int(runs[-1][1]) - x
+        return _normalize(glyphs), (x, int(top), w, int(line_h))
+
+
+# samples at least this similar to a learned one are considered the same rendering
+DUPLICATE_SIMILARITY = 0.99
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = vectors - vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-6)
+
+
+def seed_glyphs(
+    dir_path: str,
+    duration_pattern: Optional[str] = None,
+    participants_pattern: Optional[str] = None,
+) -> tuple[GlyphRecognizer, GlyphRecognizer]:
+    """
+    Meeting duration and participants number glyphs learned from the labelled frames of 'dir_path'.
+    The texts are located by 'TeamsController' and learned with the texts of the labels, whatever tesseract read.
+    """
+    from benchmark import load_frame_set
+    from config import load_config
+    from derived_frame import DerivedFrame
+    from detection_profile import DetectionProfile
+    from teams_controller import (
+        TeamsController,
+        ElementNotFoundException,
+        ParticipantsNumberNotVisibleException,
+    )
+
+    config = load_config()
+    threshold = DetectionProfile.from_settings(config["detection"]).binarize_threshold
+    duration_glyphs = GlyphRecognizer(pattern=duration_pattern)
+    participants_glyphs = GlyphRecognizer(pattern=participants_pattern)
+    _, frames = load_frame_set(dir_path)
+    for file, label in frames:
+        if label is None:
+            continue
+        frame = cv2.imread(file)
+        ctrl = TeamsController(screenshot_overrides=(frame,), config=config)
+        try:
+            ctrl.extract_data()
+        except (ElementNotFoundException, ParticipantsNumberNotVisibleException):
+            pass
+        derived = DerivedFrame(frame)
+        fields = (
+            (ctrl.meeting_duration_text, "meeting_duration", duration_glyphs),
+            (ctrl.participants_number_text, "participants_number", participants_glyphs),
+        )
+        for text, key, glyphs in fields:
+            expected = label.get(key)
+            if text is None or expected is None:
+                continue
+            img = derived.binary(text, threshold)
+            if not (img < 128).any():
+                continue  # shown without a number, e.g. a single participant
+            if not glyphs.learn(img, str(expected)):
+                print(f"{os.path.basename(file)}: '{expected}' not learned")
+    return duration_glyphs, participants_glyphs
+
+
+if __name__ == "__main__":
+    from constants import (
+        PROJECT_DIR_ABS_PATH,
+        TEST_IMAGES_DIR_ABS_PATH,
+        MEETING_DURATION_GLYPHS_ABS_PATH,
+        PARTICIPANTS_NUMBER_GLYPHS_ABS_PATH,
+    )
+    from teams_controller import MEETING_DURATION_PATTERN, PARTICIPANTS_NUMBER_PATTERN
+
+    os.chdir(PROJECT_DIR_ABS_PATH)  # config.json is read from the working directory
+    duration_glyphs, participants_glyphs = seed_glyphs(
+        TEST_IMAGES_DIR_ABS_PATH, MEETING_DURATION_PATTERN, PARTICIPANTS_NUMBER_PATTERN
+    )
+    print(f"Meeting duration glyphs: {duration_glyphs.known_chars}")
+    print(f"Participants number glyphs: {participants_glyphs.known_chars}")
+    duration_glyphs.save(MEETING_DURATION_GLYPHS_ABS_PATH)
+    participants_glyphs.save(PARTICIPANTS_NUMBER_GLYPHS_ABS_PATH)
@@ -0,0 +1,90 @@
+from datetime import timedelta
+from typing import Any
+
+from participant_stats import ParticipantStats
+
+
+class DisconnectPolicy:
+    """
+    Decides whether a meeting has ended, based on its duration and the number of its participants.
+    Participant numbers are filtered by 'ParticipantStats', so a single misread sample doesn't end the meeting.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_time: timedelta,
+        max_time: timedelta,
+        min_participants: int,
+        min_participants_ratio: float,
+        participants_window: int,
+        participants_halflife: timedelta,
+        outlier_ratio: float,
+        outlier_confirmations: int,
+    ) -> None:
+        self._min_time = min_time
+        self._max_time = max_time
+        self._min_participants = min_participants
+        self._min_participants_ratio = min_participants_ratio
+        self._participants = ParticipantStats(
+            participants_window,
+            halflife=participants_halflife.total_seconds(),
+            outlier_ratio=outlier_ratio,
+            confirmations=outlier_confirmations,
+        )
+        self.participants_falling = False
+
+    @classmethod
+    def from_settings(cls, settings: dict[str, Any]) -> "DisconnectPolicy":
+        return cls(
+            min_time=parse_time(settings["min_time"]),
+            max_time=parse_time(settings["max_time"]),
+            min_participants=settings["min_participants"],
+            min_participants_ratio=settings["min_participants_ratio"],
+            participants_window=settings["participants_window"],
+            participants_halflife=parse_time(settings["participants_halflife"]),
+            outlier_ratio=settings["outlier_ratio"],
+            outlier_confirmations=settings["outlier_confirmations"],
+        )
+
+    @property
+    def min_time(self) -> timedelta:
+        return self._min_time
+
+    @property
+    def max_time(self) -> timedelta:
+        return self._max_time
+
+    @property
+    def participants(self) -> ParticipantStats:
+        return self._participants
+
+    def should_disconnect(self, duration: timedelta, participants: int) -> bool:
+        # a held back drop is polled faster, so it's confirmed or dismissed sooner
+        latest = self._participants.latest
+        self.participants_falling = latest is not None and participants < latest
+        accepted = self._participants.add(duration.total_seconds(), participants)
+
+        if duration < self._min_time:
+            return False
+
+        if duration > self._max_time:
+            return True
+
+        if not accepted:
+            return False
+
+        participants = self._participants.latest
+        avg_participants = self._participants.ewma
+        if (
+            avg_participants
+            and participants / avg_participants < self._min_participants_ratio
+        ) or (participants < self._min_participants):
+            return True
+
+        return False
+
+
+def parse_time(time_str: str) -> timedelta:
+    hours, minutes, seconds = map(int, time_str.split(":"))
+    return timedelta(hours=hours, minutes=minutes, seconds=seconds)
@@ -0,0 +1,10 @@
+class ElementNotFoundException(Exception):
+    pass
+
+
+class WindowNotReadyException(Exception):
+    pass
+
+
+class ParticipantsNumberNotVisibleException(Exception):
+    pass
@@ -0,0 +1,441 @@
+import argparse
+import base64
+import hashlib
+import json
+import os
+import re
+import secrets
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Optional
+
+from constants import PROJECT_DIR_ABS_PATH
+
+_WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+class RequestFailed(Exception):
+    def __init__(self, code: int, comment: str) -> None:
+        super().__init__(comment)
+        self.code = code
+        self.comment = comment
+
+
+class FakeOBSServer:
+    """
+    Local stand-in for obs-websocket 5, implementing the requests used by 'OBSController',
+    so the recording flow can be tested and benchmarked without OBS.
+
+    OBS startup is simulated by refusing connections for 'startup_delay' seconds
+    and by answering the first 'not_ready_requests' requests with the NotReady status.
+    'windows' are the (name, id) pairs listed by the window property of screen capture inputs.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 0,
+        password: str = "",
+        *,
+        startup_delay: float = 0.0,
+        not_ready_requests: int = 0,
+        windows: tuple[tuple[str, str], ...] = (
+            ("[Microsoft Teams] Meeting | Microsoft Teams", "1"),
+        ),
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.password = password
+        self.startup_delay = startup_delay
+        self.not_ready_requests = not_ready_requests
+        self.windows = windows
+
+        self.requests: Counter[str] = Counter()
+        self.scenes: list[str] = ["Scene"]
+        self.current_scene = "Scene"
+        self.inputs: dict[str, dict[str, Any]] = {}
+        self.recording = False
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._listening = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._connections: set[socket.socket] = set()
+        self._handlers: dict[str, Callable[[dict], Optional[dict]]] = {
+            "GetVersion": self._get_version,
+            "GetStats": self._get_stats,
+            "GetSceneList": self._get_scene_list,
+            "CreateScene": self._create_scene,
+            "RemoveScene": self._remove_scene,
+            "SetCurrentProgramScene": self._set_current_program_scene,
+            "GetInputList": self._get_input_list,
+            "CreateInput": self._create_input,
+            "RemoveInput": self._remove_input,
+            "SetInputSettings": self._set_input_settings,
+            "GetInputPropertiesListPropertyItems": self._get_property_items,
+            "GetRecordStatus": self._get_record_status,
+            "StartRecord": self._start_record,
+            "StopRecord": self._stop_record,
+        }
+
+    def start(self) -> int:
+        """
+        Starts serving in a background thread and returns the port, which is chosen by the OS if 'port' is 0.
+        With a 'startup_delay' the port is reserved up front, but connections are accepted only after the delay.
+        """
+        if self.port == 0:
+            with socket.socket() as probe:
+                probe.bind((self.host, 0))
+                self.port = probe.getsockname()[1]
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._serve, name="fake_obs_server", daemon=True
+        )
+        self._thread.start()
+        if not self.startup_delay:
+            self._listening.wait()
+        return self.port
+
+    def stop(self) -> None:
+        """
+        Stops serving and drops the open connections, as OBS quitting does.
+        """
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self._listening.clear()
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self._connections.clear()
+
+    def _serve(self) -> None:
+        if self._stop_event.wait(self.startup_delay):
+            return
+        with socket.create_server((self.host, self.port), reuse_port=False) as server:
+            server.settimeout(0.05)
+            self._listening.set()
+            while not self._stop_event.is_set():
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                threading.Thread(
+                    target=self._handle_connection, args=(conn,), daemon=True
+                ).start()
+
+    def _handle_connection(self, conn: socket.socket) -> None:
+        with self._lock:
+            self._connections.add(conn)
+        with conn:
+            conn.settimeout(0.05)
+            try:
+                _accept_handshake(conn, self._stop_event)
+                challenge = base64.b64encode(secrets.token_bytes(32)).decode()
+                salt = base64.b64encode(secrets.token_bytes(32)).decode()
+                hello: dict[str, Any] = {"obsWebSocketVersion": "5.4.2", "rpcVersion": 1}
+                if self.password:
+                    hello["authentication"] = {"challenge": challenge, "salt": salt}
+                _send_message(conn, {"op": 0, "d": hello})
+
+                while not self._stop_event.is_set():
+                    message = _receive_message(conn, self._stop_event)
+                    if message is None:
+                        return
+                    if message["op"] == 1:
+                        if self.password and message["d"].get(
+                            "authentication"
+                        ) != _auth_response(self.password, salt, challenge):
+                            _send_close(conn, 4009, "Authentication failed")
+                            return
+                        _send_message(conn, {"op": 2, "d": {"negotiatedRpcVersion": 1}})
+                    elif message["op"] == 6:
+                        _send_message(conn, {"op": 7, "d": self._respond(message["d"])})
+            except (OSError, ConnectionError):
+                return
+            finally:
+                with self._lock:
+                    self._connections.discard(conn)
+
+    def _respond(self, request: dict) -> dict:
+        request_type = request["requestType"]
+        response = {"requestType": request_type, "requestId": request["requestId"]}
+        with self._lock:
+            self.requests[request_type] += 1
+            if self.not_ready_requests > 0:
+                self.not_ready_requests -= 1
+                response["requestStatus"] = {
+                    "result": False,
+                    "code": 207,
+                    "comment": "OBS is not ready to perform the request.",
+                }
+                return response
+            handler = self._handlers.get(request_type)
+            try:
+                if handler is None:
+                    raise RequestFailed(204, f"Unknown request type {request_type}")
+                data = handler(request.get("requestData") or {})
+            except RequestFailed as e:
+                response["requestStatus"] = {
+                    "result": False,
+                    "code": e.code,
+                    "comment": e.comment,
+                }
+                return response
+        response["requestStatus"] = {"result": True, "code": 100}
+        if data is not None:
+            response["responseData"] = data
+        return response
+
+    def _get_version(self, data: dict) -> dict:
+        return {"obsVersion": "30.1.2", "obsWebSocketVersion": "5.4.2", "rpcVersion": 1}
+
+    def _get_stats(self, data: dict) -> dict:
+        return {"cpuUsage": 0.0, "memoryUsage": 0.0, "activeFps": 30.0}
+
+    def _get_scene_list(self, data: dict) -> dict:
+        return {
+            "currentProgramSceneName": self.current_scene,
+            "scenes": [
+                {"sceneName": name, "sceneIndex": i}
+                for i, name in enumerate(reversed(self.scenes))
+            ],
+        }
+
+    def _create_scene(self, data: dict) -> dict:
+        if data["sceneName"] in self.scenes:
+            raise RequestFailed(601, "A source already exists by that scene name.")
+        self.scenes.append(data["sceneName"])
+        return {"sceneUuid": secrets.token_hex(8)}
+
+    def _remove_scene(self, data: dict) -> None:
+        name = data["sceneName"]
+        if name not in self.scenes:
+            raise RequestFailed(600, "No source was found by the name of sceneName.")
+        self.scenes.remove(name)
+        self.inputs = {k: v for k, v in self.inputs.items() if v["scene"] != name}
+        if self.current_scene == name:
+            self.current_scene = self.scenes[0] if self.scenes else ""
+
+    def _set_current_program_scene(self, data: dict) -> None:
+        if data["sceneName"] not in self.scenes:
+            raise RequestFailed(600, "No source was found by the name of sceneName.")
+        self.current_scene = data["sceneName"]
+
+    def _get_input_list(self, data: dict) -> dict:
+        kind = data.get("inputKind")
+        return {
+            "inputs": [
+                {"inputName": name, "inputKind": item["kind"]}
+                for name, item in self.inputs.items()
+                if kind is None or item["kind"] == kind
+            ]
+        }
+
+    def _create_input(self, data: dict) -> dict:
+        if data["sceneName"] not in self.scenes:
+            raise RequestFailed(600, "No source was found by the name of sceneName.")
+        if data["inputName"] in self.inputs:
+            raise RequestFailed(601, "A source already exists by that input name.")
+        self.inputs[data["inputName"]] = {
+            "kind": data["inputKind"],
+            "scene": data["sceneName"],
+            "settings": dict(data.get("inputSettings") or {}),
+        }
+        return {"inputUuid": secrets.token_hex(8), "sceneItemId": len(self.inputs)}
+
+    def _remove_input(self, data: dict) -> None:
+        self._input(data["inputName"])
+        del self.inputs[data["inputName"]]
+
+    def _set_input_settings(self, data: dict) -> None:
+        item = self._input(data["inputName"])
+        if not data.get("overlay", True):
+            item["settings"] = {}
+        item["settings"].update(data["inputSettings"])
+
+    def _get_property_items(self, data: dict) -> dict:
+        self._input(data["inputName"])
+        if data["propertyName"] != "window":
+            raise RequestFailed(600, "Unable to find a property by that name.")
+        return {
+            "propertyItems": [
+                {"itemName": name, "itemValue": value, "itemEnabled": True}
+                for name, value in self.windows
+            ]
+        }
+
+    def _get_record_status(self, data: dict) -> dict:
+        return {
+            "outputActive": self.recording,
+            "outputPaused": False,
+            "outputTimecode": "00:00:00.000",
+            "outputDuration": 0,
+            "outputBytes": 0,
+        }
+
+    def _start_record(self, data: dict) -> None:
+        if self.recording:
+            raise RequestFailed(500, "The record output is already running.")
+        self.recording = True
+
+    def _stop_record(self, data: dict) -> dict:
+        if not self.recording:
+            raise RequestFailed(501, "The record output is not running.")
+        self.recording = False
+        return {"outputPath": "/tmp/clinophilia.mkv"}
+
+    def _input(self, name: str) -> dict:
+        item = self.inputs.get(name)
+        if item is None:
+            raise RequestFailed(600, "No source was found by the name of inputName.")
+        return item
+
+
+def _auth_response(password: str, salt: str, challenge: str) -> str:
+    secret = base64.b64encode(hashlib.sha256((password + salt).encode()).digest())
+    return base64.b64encode(
+        hashlib.sha256(secret + challenge.encode()).digest()
+    ).decode()
+
+
+def _receive_exactly(conn: socket.socket, n: int, stop_event: threading.Event) -> bytes:
+    data = b""
+    while len(data) < n:
+        try:
+            chunk = conn.recv(n - len(data))
+        except socket.timeout:
+            if stop_event.is_set():
+                raise ConnectionError("Server stopped")
+            continue
+        if not chunk:
+            raise ConnectionError("Connection closed by the client")
+        data += chunk
+    return data
+
+
+def _accept_handshake(conn: socket.socket, stop_event: threading.Event) -> None:
+    request = b""
+    while b"\r\n\r\n" not in request:
+        request += _receive_exactly(conn, 1, stop_event)
+    key = re.search(rb"Sec-WebSocket-Key:\s*(\S+)", request, re.IGNORECASE).group(1)
+    accept = base64.b64encode(hashlib.sha1(key + _WEBSOCKET_GUID).digest())
+    conn.sendall(
+        b"HTTP/1.1 101 Switching Protocols\r\n"
+        b"Upgrade: websocket\r\n"
+        b"Connection: Upgrade\r\n"
+        b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+    )
+
+
+def _receive_message(conn: socket.socket, stop_event: threading.Event) -> Optional[dict]:
+    """
+    Returns the next JSON message of the client, or None once the connection is closed.
+    """
+    while True:
+        first, second = _receive_exactly(conn, 2, stop_event)
+        opcode = first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            (length,) = struct.unpack("!H", _receive_exactly(conn, 2, stop_event))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", _receive_exactly(conn, 8, stop_event))
+        mask = _receive_exactly(conn, 4, stop_event) if second & 0x80 else b"\0" * 4
+        payload = bytes(
+            byte ^ mask[i % 4]
+            for i, byte in enumerate(_receive_exactly(conn, length, stop_event))
+        )
+        if opcode == 0x8:
+            _send_frame(conn, 0x8, payload[:2])
+            return None
+        if opcode == 0x9:
+            _send_frame(conn, 0xA, payload)
+        elif opcode == 0x1:
+            return json.loads(payload)
+
+
+def _send_message(conn: socket.socket, message: dict) -> None:
+    _send_frame(conn, 0x1, json.dumps(message).encode())
+
+
+def _send_close(conn: socket.socket, code: int, reason: str) -> None:
+    _send_frame(conn, 0x8, struct.pack("!H", code) + reason.encode())
+
+
+def _send_frame(conn: socket.socket, opcode: int, payload: bytes) -> None:
+    header = bytes([0x80 | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < 1 << 16:
+        header += bytes([126]) + struct.pack("!H", len(payload))
+    else:
+        header += bytes([127]) + struct.pack("!Q", len(payload))
+    conn.sendall(header + payload)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Runs the OBS recording flow against a fake obs-websocket server "
+        "and measures how long starting and stopping a recording takes."
+    )
+    parser.add_argument("--sessions", type=int, default=3)
+    parser.add_argument(
+        "--startup-delay",
+        type=float,
+        default=1.0,
+        help="seconds the fake OBS refuses connections",
+    )
+    parser.add_argument(
+        "--not-ready-requests",
+        type=int,
+        default=5,
+        help="requests answered with NotReady after the connection",
+    )
+    args = parser.parse_args()
+    os.chdir(PROJECT_DIR_ABS_PATH)  # config.json is read from the working directory
+
+    from config import load_config
+    from obs_controller import OBSController
+    from tracing import Tracer
+
+    password = load_config()["obs"]["password"]
+    server = FakeOBSServer(
+        password=password,
+        startup_delay=args.startup_delay,
+        not_ready_requests=args.not_ready_requests,
+    )
+    port = server.start()
+    tracer = Tracer()
+    obs_controller = OBSController(tracer, port=port, launch=False)
+    try:
+        for session in range(args.sessions):
+            start = time.perf_counter()
+            obs_controller.start_recording()
+            started = time.perf_counter()
+            if not server.recording:
+                print("Recording didn't start")
+                return 1
+            obs_controller.stop_recording()
+            stopped = time.perf_counter()
+            print(
+                f"session {session}: start {(started - start) * 1000:.1f} ms, "
+                f"stop {(stopped - started) * 1000:.1f} ms"
+            )
+    finally:
+        obs_controller.close()
+        server.stop()
+    print(f"counters: {dict(tracer.counters)}")
+    print(f"requests: {dict(server.requests)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,700 @@
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from collections import Counter, deque
+from datetime import datetime
+from multiprocessing.connection import Connection, wait
+from os import path as p
+from typing import Any, Callable, NamedTuple, Optional
+
+import numpy as np
+
+from calibration_cache import SharedCalibrationCache
+from config import load_config, validate_config, validate_jobs
+from constants import (
+    CALIBRATION_CACHE_ABS_PATH,
+    FLEET_METRICS_ABS_PATH,
+    PROJECT_DIR_ABS_PATH,
+    TEAMS_LEAVE_BUTTON_ABS_PATH,
+    TEAMS_PEOPLE_ICON_ABS_PATH,
+    TEAMS_SHIELD_ICON_ABS_PATH,
+)
+from detection_profile import DetectionProfile
+from shared_arrays import SharedArrays, SharedArraysManifest
+from stage_limits import STAGES, StageLimits
+from template_bank import TemplateBank
+from tracing import Tracer
+
+# share of the cores the capacity estimate fills, the rest is left for OBS and the meeting clients
+TARGET_UTILIZATION = 0.8
+# seconds of reports the rates are computed over
+RATE_WINDOW = 300.0
+
+
+class Job(NamedTuple):
+    """
+    Meeting recorded by one session of the fleet. The 'launch' commands, e.g. OBS and a browser joining
+    the meeting, are started on the display of the session before the app; the session is stopped at 'end'
+    even if the meeting goes on. Jobs without 'display' get a virtual one.
+    """
+
+    name: str
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    display: Optional[str] = None
+    obs_port: Optional[int] = None
+    launch: tuple[tuple[str, ...], ...] = ()
+
+    @classmethod
+    def from_dict(cls, job: dict[str, Any]) -> "Job":
+        return cls(
+            name=job["name"],
+            start=_parse_datetime(job.get("start")),
+            end=_parse_datetime(job.get("end")),
+            display=job.get("display"),
+            obs_port=job.get("obs_port"),
+            launch=tuple(tuple(command) for command in job.get("launch", ())),
+        )
+
+
+def load_jobs(path: str) -> list[Job]:
+    with open(path, "r") as json_file:
+        jobs = json.load(json_file)
+    validate_jobs(jobs)
+    names = [job["name"] for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("Job names must be unique")
+    return sorted(
+        (Job.from_dict(job) for job in jobs), key=lambda job: job.start or datetime.min
+    )
+
+
+class SessionReport(NamedTuple):
+    """
+    What a session did since its previous report: durations of the app updates in seconds,
+    seconds waited for every capped stage, and the tracer counters.
+    'startup' is the time from the process start to the recording start, if it started meanwhile.
+    """
+
+    name: str
+    ticks: tuple[float, ...]
+    waits: dict[str, float]
+    counters: dict[str, int]
+    startup: Optional[float] = None
+
+
+class SessionReporter:
+    """
+    Sends the spans and counters collected by 'tracer' to the supervisor every 'interval' seconds and resets it.
+    Reports double as heartbeats, a session that stops sending them is restarted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        tracer: Tracer,
+        reports: Connection,
+        interval: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._name = name
+        self._tracer = tracer
+        self._reports = reports
+        self._interval = interval
+        self._clock = clock
+        self._last = clock()
+
+    def report(self, force: bool = False) -> None:
+        now = self._clock()
+        if not force and now - self._last < self._interval:
+            return
+        self._last = now
+        spans = self._tracer.spans
+        startup = spans.get("time_to_record")
+        report = SessionReport(
+            self._name,
+            tuple(spans.get("update", ())),
+            {stage: sum(spans.get(f"{stage}_wait", ())) for stage in STAGES},
+            dict(self._tracer.counters),
+            startup[0] if startup else None,
+        )
+        self._tracer.reset()
+        self._reports.send(report)
+
+
+def run_session(
+    job: Job,
+    display: Optional[str],
+    config: dict[str, Any],
+    templates: SharedArraysManifest,
+    calibration_cache: SharedCalibrationCache,
+    stage_limits: StageLimits,
+    reports: Connection,
+    report_interval: float,
+) -> None:
+    """
+    Runs 'App' for 'job' until the meeting ends, in its own process started by 'FleetSupervisor'.
+    A session stopped by the supervisor, e.g. at the end of the job, stops the recording first.
+    """
+    signal.signal(signal.SIGTERM, _interrupt)
+    if display:
+        # read by the X11 backends of pyautogui and pywinctl once they're imported
+        os.environ["DISPLAY"] = display
+    os.chdir(PROJECT_DIR_ABS_PATH)
+    from app import App
+
+    tracer = Tracer()
+    reporter = SessionReporter(job.name, tracer, reports, report_interval)
+    # the pyramids stay in the shared memory, nothing is copied; it stays attached as long as the app lives
+    shared_templates = SharedArrays.attach(templates)
+    app = App(
+        config,
+        tracer=tracer,
+        template_bank=TemplateBank.from_arrays(shared_templates.arrays),
+        calibration_cache=calibration_cache,
+        stage_limits=stage_limits,
+        suspend=False,
+        sounds=False,
+    )
+    try:
+        while app.update():
+            reporter.report()
+            app.wait()
+    except KeyboardInterrupt:
+        app.stop_recording()
+    finally:
+        reporter.report(force=True)
+        app.close()
+        del app
+        shared_templates.close()
+        calibration_cache.close()
+
+
+class VirtualDisplay:
+    """
+    Xvfb server the windows of one session are drawn on, on the first free display number from 'first'.
+    """
+
+    def __init__(self, size: tuple[int, int], first: int = 99) -> None:
+        self.size = size
+        self._first = first
+        self.name: Optional[str] = None
+        self._process: Optional[subprocess.Popen] = None
+
+    def start(self, timeout: float = 10.0) -> str:
+        if shutil.which("Xvfb") is None:
+            raise RuntimeError("Xvfb isn't installed, virtual displays can't be started")
+        width, height = self.size
+        number = self._first
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if _display_taken(number):
+                number += 1
+                continue
+            process = subprocess.Popen(
+                ["Xvfb", f":{number}", "-screen", "0", f"{width}x{height}x24", "-nolisten", "tcp"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            while process.poll() is None and time.monotonic() < deadline:
+                if p.exists(_display_socket(number)):
+                    self._process = process
+                    self.name = f":{number}"
+                    return self.name
+                time.sleep(0.05)
+            # taken by another server meanwhile, or too slow to start
+            _stop_process(process)
+            number += 1
+        raise RuntimeError(f"Virtual display didn't start in {timeout} s")
+
+    def stop(self) -> None:
+        if self._process is not None:
+            _stop_process(self._process)
+            self._process = None
+            self.name = None
+
+
+class Session:
+    """
+    Supervisor side of a job: its display, the launched programs and the process running the app.
+    """
+
+    def __init__(self, job: Job) -> None:
+        self.job = job
+        # pending, running, restarting, done, failed, missed or stopped
+        self.state = "pending"
+        self.display: Optional[VirtualDisplay] = None
+        self.display_name: Optional[str] = job.display
+        self.launched: list[subprocess.Popen] = []
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        # every process gets its own pipe, terminating it can't break the reports of the others
+        self.reports: Optional[Connection] = None
+        self.restarts = 0
+        self.restart_at = 0.0
+        self.last_report = 0.0
+        self.error: Optional[str] = None
+
+    @property
+    def active(self) -> bool:
+        return self.state in ("running", "restarting")
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed", "missed", "stopped")
+
+
+class SessionMetrics:
+    """
+    Throughput of one session: totals since the supervisor started and rates over the last 'RATE_WINDOW' seconds.
+    """
+
+    def __init__(self) -> None:
+        self.started_at: Optional[float] = None
+        self.ticks = 0
+        self.busy = 0.0
+        self.waits: Counter[str] = Counter()
+        self.counters: Counter[str] = Counter()
+        self.startups: list[float] = []
+        self.durations: deque[float] = deque(maxlen=1024)
+        # receive time, ticks, seconds busy and seconds waited of the recent reports
+        self._recent: deque[tuple[float, int, float, float]] = deque()
+
+    def add(self, report: SessionReport, now: float) -> None:
+        busy = sum(report.ticks)
+        waited = sum(report.waits.values())
+        self.ticks += len(report.ticks)
+        self.busy += busy
+        self.waits.update(report.waits)
+        self.counters.update(report.counters)
+        self.durations.extend(report.ticks)
+        if report.startup is not None:
+            self.startups.append(report.startup)
+        self._recent.append((now, len(report.ticks), busy, waited))
+        while self._recent and self._recent[0][0] < now - RATE_WINDOW:
+            self._recent.popleft()
+
+    def rates(self, now: float) -> tuple[float, float]:
+        """
+        Ticks per second and CPU seconds per second spent in the ticks, without the waits for capped stages.
+        """
+        recent = [report for report in self._recent if report[0] >= now - RATE_WINDOW]
+        since = self.started_at if self.started_at is not None else now
+        window = max(min(RATE_WINDOW, now - since), 1e-9)
+        ticks = sum(report[1] for report in recent)
+        work = sum(report[2] - report[3] for report in recent)
+        return ticks / window, max(work, 0.0) / window
+
+    def snapshot(self, now: float) -> dict[str, Any]:
+        tick_rate, load = self.rates(now)
+        ms = np.array(self.durations) * 1000
+        return {
+            "ticks": self.ticks,
+            "ticks_per_s": tick_rate,
+            "cpu_load": load,
+            "tick_ms": (
+                {
+                    "p50": float(np.percentile(ms, 50)),
+                    "p95": float(np.percentile(ms, 95)),
+                    "max": float(ms.max()),
+                }
+                if len(ms)
+                else {}
+            ),
+            "wait_s": dict(self.waits),
+            "startup_s": self.startups,
+            "calibration_sweeps": self.counters["calibration_sweep"],
+            "ocr_calls": self.counters["ocr_call"],
+            "errors": {
+                name.removeprefix("exception."): count
+                for name, count in self.counters.items()
+                if name.startswith("exception.")
+            },
+        }
+
+
+class FleetSupervisor:
+    """
+    Records the meetings of 'jobs', each in a session of its own: an 'App' process on its own virtual display,
+    at most 'max_sessions' at once. Jobs are started at their 'start' time, or once a session slot frees up.
+
+    The template pyramids are built once and shared with the sessions through shared memory, as is the
+    calibration cache, so a session on a screen another one has calibrated skips the full sweep. The full
+    sweeps and tesseract calls of all sessions are capped by 'max_calibrations' and 'max_ocr' shared semaphores.
+    A session exiting with an error, or not reporting for 'hang_timeout' seconds, is restarted at most
+    'max_restarts' times, after a backoff doubling from 'restart_backoff' seconds.
+
+    Every 'report_interval' seconds the per-session and host throughput is printed and written to 'metrics_path',
+    with an estimate of how many sessions the host can run.
+    """
+
+    def __init__(
+        self,
+        jobs: list[Job],
+        settings: dict[str, Any],
+        config: Optional[dict[str, Any]] = None,
+        *,
+        metrics_path: str = FLEET_METRICS_ABS_PATH,
+        session_main: Callable[..., None] = run_session,
+        poll_interval: float = 1.0,
+    ) -> None:
+        self._config = config if config else load_config()
+        self._settings = settings
+        self._metrics_path = metrics_path
+        self._session_main = session_main
+        self._poll_interval = poll_interval
+        self.sessions = [Session(job) for job in jobs]
+        self.metrics = {job.name: SessionMetrics() for job in jobs}
+        # sessions are started from scratch, not forked with the threads and connections of the supervisor
+        self._context = multiprocessing.get_context("spawn")
+        self._templates: Optional[SharedArrays] = None
+        self._calibration_cache: Optional[SharedCalibrationCache] = None
+        self._stage_limits: Optional[StageLimits] = None
+        self._last_report = time.monotonic()
+        # the last estimate is kept once the sessions are finished
+        self._capacity: Optional[int] = None
+
+    def run(self) -> int:
+        """
+        Supervises the sessions until every job is finished. Returns the number of failed jobs.
+        """
+        self._share_state()
+        try:
+            while not all(session.finished for session in self.sessions):
+                self._step()
+                self._receive_reports(self._poll_interval)
+                if time.monotonic() - self._last_report >= self._settings["report_interval"]:
+                    self._report()
+        finally:
+            self._shutdown()
+        return sum(session.state == "failed" for session in self.sessions)
+
+    def _share_state(self) -> None:
+        template_bank = TemplateBank()
+        template_bank.preload(
+            (
+                TEAMS_LEAVE_BUTTON_ABS_PATH,
+                TEAMS_SHIELD_ICON_ABS_PATH,
+                TEAMS_PEOPLE_ICON_ABS_PATH,
+            ),
+            *DetectionProfile.from_settings(self._config["detection"]).scales,
+        )
+        self._templates = SharedArrays.create(template_bank.arrays())
+        self._calibration_cache = SharedCalibrationCache.create(
+            CALIBRATION_CACHE_ABS_PATH,
+            self._settings["calibration_memory_kb"] * 1024,
+            context=self._context,
+        )
+        self._stage_limits = StageLimits.create(
+            {
+                "calibration": self._settings["max_calibrations"],
+                "ocr": self._settings["max_ocr"],
+            },
+            self._context,
+        )
+
+    def _step(self) -> None:
+        now = time.monotonic()
+        today = datetime.now()
+        for session in self.sessions:
+            if session.state == "running":
+                if session.job.end and today >= session.job.end:
+                    print(f"[{session.job.name}] Stopped at the end of the job")
+                    _stop_process(session.process)
+                    self._finish(session, "done")
+                elif not session.process.is_alive():
+                    self._on_exit(session, now)
+                elif now - session.last_report > self._settings["hang_timeout"]:
+                    print(f"[{session.job.name}] Not responding, terminating")
+                    _stop_process(session.process)
+                    self._on_exit(session, now, "not responding")
+            elif session.state == "restarting" and now >= session.restart_at:
+                self._start_process(session)
+
+        for session in self.sessions:
+            if session.state != "pending":
+                continue
+            job = session.job
+            if job.end and today >= job.end:
+                print(f"[{job.name}] Missed, the job ended before a session was free")
+                session.state = "missed"
+            elif (job.start is None or today >= job.start) and self._free_slots():
+                self._start(session)
+
+    def _free_slots(self) -> int:
+        active = sum(session.active for session in self.sessions)
+        return self._settings["max_sessions"] - active
+
+    def _start(self, session: Session) -> None:
+        job = session.job
+        if job.display is None and self._settings["virtual_displays"]:
+            session.display = VirtualDisplay(tuple(self._settings["screen_size"]))
+            try:
+                session.display_name = session.display.start()
+            except RuntimeError as e:
+                print(f"[{job.name}] {e}")
+                session.error = str(e)
+                self._finish(session, "failed")
+                return
+        self._launch(session)
+        self._start_process(session)
+
+    def _launch(self, session: Session) -> None:
+        """
+        Starts the launch commands of the job that aren't running, on the display of the session.
+        """
+        env = dict(os.environ)
+        if session.display_name:
+            env["DISPLAY"] = session.display_name
+        if not session.launched:
+            session.launched = [None] * len(session.job.launch)
+        for i, command in enumerate(session.job.launch):
+            process = session.launched[i]
+            if process is not None and process.poll() is None:
+                continue
+            try:
+                session.launched[i] = subprocess.Popen(command, env=env)
+            except OSError as e:
+                print(f"[{session.job.name}] '{command[0]}' can't be launched: {e}")
+                session.launched[i] = None
+
+    def _start_process(self, session: Session) -> None:
+        job = session.job
+        config = self._config
+        if job.obs_port is not None:
+            config = {**config, "obs": {**config["obs"], "port": job.obs_port}}
+        self._close_reports(session)
+        session.reports, reports = self._context.Pipe(duplex=False)
+        metrics = self.metrics[job.name]
+        if metrics.started_at is None:
+            metrics.started_at = time.monotonic()
+        session.process = self._context.Process(
+            target=self._session_main,
+            args=(
+                job,
+                session.display_name,
+                config,
+                self._templates.manifest,
+                self._calibration_cache,
+                self._stage_limits,
+                reports,
+                self._settings["report_interval"],
+            ),
+            name=f"session_{job.name}",
+        )
+        session.process.start()
+        # only the session writes, the pipe is closed once it exits
+        reports.close()
+        session.state = "running"
+        session.last_report = time.monotonic()
+        where = f" on {session.display_name}" if session.display_name else ""
+        print(f"[{job.name}] Session started{where}")
+
+    def _on_exit(self, session: Session, now: float, error: Optional[str] = None) -> None:
+        exit_code = session.process.exitcode
+        if error is None and exit_code == 0:
+            print(f"[{session.job.name}] Meeting ended")
+            self._finish(session, "done")
+            return
+        session.error = error or f"exit code {exit_code}"
+        if session.restarts >= self._settings["max_restarts"]:
+            print(f"[{session.job.name}] Failed ({session.error}), giving up")
+            self._finish(session, "failed")
+            return
+        backoff = self._settings["restart_backoff"] * 2**session.restarts
+        session.restarts += 1
+        session.restart_at = now + backoff
+        session.state = "restarting"
+        print(
+            f"[{session.job.name}] Failed ({session.error}), "
+            f"restart {session.restarts} in {backoff:g} s"
+        )
+        # the programs of the meeting are relaunched only if they exited too
+        self._launch(session)
+
+    def _finish(self, session: Session, state: str) -> None:
+        session.state = state
+        self._close_reports(session)
+        for process in session.launched:
+            if process is not None:
+                _stop_process(process)
+        session.launched = []
+        if session.display is not None:
+            session.display.stop()
+            session.display = None
+
+    def _receive_reports(self, timeout: float) -> None:
+        """
+        Waits up to 'timeout' seconds for reports and adds all that came to the metrics.
+        """
+        sessions = {
+            session.reports: session
+            for session in self.sessions
+            if session.reports is not None
+        }
+        if not sessions:
+            time.sleep(timeout)
+            return
+        for reports in wait(list(sessions), timeout):
+            self._read_reports(sessions[reports])
+
+    def _read_reports(self, session: Session) -> None:
+        if session.reports is None:
+            return
+        try:
+            while session.reports.poll():
+                report = session.reports.recv()
+                session.last_report = time.monotonic()
+                self.metrics[session.job.name].add(report, session.last_report)
+        except (EOFError, OSError):
+            # the process exited, its exit is handled by '_step'
+            session.reports.close()
+            session.reports = None
+
+    def _close_reports(self, session: Session) -> None:
+        self._read_reports(session)
+        if session.reports is not None:
+            session.reports.close()
+            session.reports = None
+
+    def snapshot(self) -> dict[str, Any]:
+        now = time.monotonic()
+        sessions = {}
+        tick_rate = cpu_load = 0.0
+        reporting = 0
+        for session in self.sessions:
+            metrics = self.metrics[session.job.name].snapshot(now)
+            metrics.update(
+                state=session.state,
+                display=session.display_name,
+                restarts=session.restarts,
+                error=session.error,
+            )
+            sessions[session.job.name] = metrics
+            if session.active and metrics["ticks"]:
+                tick_rate += metrics["ticks_per_s"]
+                cpu_load += metrics["cpu_load"]
+                reporting += 1
+
+        cpus = os.cpu_count() or 1
+        if reporting and cpu_load > 0:
+            self._capacity = int(cpus * TARGET_UTILIZATION / (cpu_load / reporting))
+        host = {
+            "active_sessions": sum(session.active for session in self.sessions),
+            "ticks_per_s": tick_rate,
+            "cpu_load": cpu_load,
+            "cpus": cpus,
+            "load_average": list(os.getloadavg()) if hasattr(os, "getloadavg") else None,
+            "estimated_capacity": self._capacity,
+        }
+        return {"time": datetime.now().isoformat(), "host": host, "sessions": sessions}
+
+    def _report(self) -> None:
+        self._last_report = time.monotonic()
+        snapshot = self.snapshot()
+        host = snapshot["host"]
+        print(
+            f"{host['active_sessions']} sessions, {host['ticks_per_s']:.2f} ticks/s, "
+            f"{host['cpu_load']:.2f} of {host['cpus']} CPUs busy, "
+            f"capacity ~{host['estimated_capacity'] if host['estimated_capacity'] is not None else '?'} sessions"
+        )
+        for name, metrics in snapshot["sessions"].items():
+            if metrics["state"] in ("running", "restarting"):
+                print(
+                    f"  [{name}] {metrics['ticks_per_s']:.2f} ticks/s, "
+                    f"p95 {metrics['tick_ms'].get('p95', 0.0):.0f} ms, "
+                    f"waited {sum(metrics['wait_s'].values()):.1f} s, "
+                    f"{metrics['restarts']} restarts"
+                )
+        with open(self._metrics_path, "w") as json_file:
+            json.dump(snapshot, json_file, indent=4)
+        # sessions started later, or the next supervisor, find the calibrations in the file too
+        self._calibration_cache.persist()
+
+    def _shutdown(self) -> None:
+        for session in self.sessions:
+            if session.active:
+                if session.process is not None:
+                    _stop_process(session.process)
+                self._finish(session, "stopped")
+        if self._calibration_cache is not None:
+            self._report()
+            self._calibration_cache.close()
+            self._calibration_cache.unlink()
+        if self._templates is not None:
+            self._templates.close()
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _display_socket(number: int) -> str:
+    return f"/tmp/.X11-unix/X{number}"
+
+
+def _display_taken(number: int) -> bool:
+    return p.exists(f"/tmp/.X{number}-lock") or p.exists(_display_socket(number))
+
+
+def _stop_process(process: Any, timeout: float = 5.0) -> None:
+    """
+    Terminates a 'subprocess' or 'multiprocessing' process, killing it if it doesn't exit in 'timeout' seconds.
+    """
+    if isinstance(process, subprocess.Popen):
+        if process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        return
+    if process.is_alive():
+        process.terminate()
+        process.join(timeout)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Records the meetings of a job list, each in a session of its own on a virtual display."
+    )
+    parser.add_argument("jobs", help="JSON file with the list of jobs")
+    parser.add_argument(
+        "--max-sessions", type=int, help="overrides 'fleet.max_sessions' of config.json"
+    )
+    args = parser.parse_args()
+    jobs_path = p.abspath(args.jobs)
+    os.chdir(PROJECT_DIR_ABS_PATH)  # config.json is read from the working directory
+
+    config = load_config()
+    validate_config(config)
+    settings = dict(config["fleet"])
+    if args.max_sessions:
+        settings["max_sessions"] = args.max_sessions
+    supervisor = FleetSupervisor(load_jobs(jobs_path), settings, config)
+    # stopped like by Ctrl+C, so the sessions and displays are cleaned up
+    signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        failed = supervisor.run()
+    except KeyboardInterrupt:
+        return 130
+    print(f"All jobs finished, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import json
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+from os import path as p
+from time import monotonic
+from typing import Any, NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+from frame_buffers import FrameBufferPool
+from tracing import NULL_TRACER, Tracer
+
+
+class Annotation(NamedTuple):
+    """
+    Rectangle drawn on a debug frame, in the coordinates of the frame, with a BGR color.
+    """
+
+    x: int
+    y: int
+    w: int
+    h: int
+    color: tuple[int, int, int]
+
+
+class RecordedFrame(NamedTuple):
+    time: datetime
+    image: cv2.typing.MatLike
+    origin: tuple[int, int]
+    annotations: tuple[Annotation, ...]
+
+
+class Incident(NamedTuple):
+    time: datetime
+    reason: str
+    frames: list[RecordedFrame]
+
+
+def draw_annotations(
+    image: cv2.typing.MatLike, annotations: tuple[Annotation, ...]
+) -> None:
+    for annotation in annotations:
+        cv2.rectangle(
+            image,
+            (annotation.x, annotation.y),
+            (annotation.x + annotation.w, annotation.y + annotation.h),
+            annotation.color,
+        )
+
+
+class FlightRecorder:
+    """
+    Keeps the last 'frames' analyzed frames with their annotations in memory and writes them to 'dir_path'
+    in a background thread when an incident happens, so the detection loop never waits for the disk.
+
+    The frames are kept as they are captured, no copy is made on every tick; buffers from 'buffers' are given
+    back to the pool once they leave the ring. The ring also holds at most 'max_memory' bytes, at least the
+    newest frame. Incidents closer than 'min_interval' seconds to the last written one are skipped, and the
+    oldest files are deleted whenever the directory grows over 'max_disk_usage' bytes.
+    """
+
+    def __init__(
+        self,
+        dir_path: str,
+        *,
+        frames: int = 8,
+        max_memory: int = 128 * 2**20,
+        min_interval: float = 30.0,
+        max_disk_usage: int = 256 * 2**20,
+        tracer: Tracer = NULL_TRACER,
+    ) -> None:
+        self._dir_path = dir_path
+        self._max_memory = max_memory
+        self._min_interval = min_interval
+        self._max_disk_usage = max_disk_usage
+        self.tracer = tracer
+        self.buffers: Optional[FrameBufferPool] = None
+        self._lock = threading.Lock()
+        self._ring: deque[RecordedFrame] = deque()
+        self._ring_size = frames
+        self._ring_bytes = 0
+        self._last_incident: Optional[float] = None
+        # at most one incident waits while another is written
+        self._incidents: queue.Queue[Optional[Incident]] = queue.Queue(1)
+        self._writer = threading.Thread(
+            target=self._write_incidents, name="flight_recorder", daemon=True
+        )
+        self._writer.start()
+
+    @classmethod
+    def from_settings(
+        cls, dir_path: str, settings: dict[str, Any], tracer: Tracer = NULL_TRACER
+    ) -> "FlightRecorder":
+        return cls(
+            dir_path,
+            frames=settings["frames"],
+            max_memory=settings["max_memory_mb"] * 2**20,
+            min_interval=settings["min_interval"],
+            max_disk_usage=settings["max_disk_usage_mb"] * 2**20,
+            tracer=tracer,
+        )
+
+    def record(
+        self,
+        image: cv2.typing.MatLike,
+        origin: tuple[int, int],
+        annotations: tuple[Annotation, ...],
+        time: Optional[datetime] = None,
+    ) -> None:
+        """
+        Adds an analyzed frame to the ring. The recorder owns 'image' afterwards, it must not be modified.
+        """
+        frame = RecordedFrame(time or datetime.now(), image, origin, annotations)
+        with self._lock:
+            self._ring.append(frame)
+            self._ring_bytes += image.nbytes
+            evicted = []
+            while len(self._ring) > 1 and (
+                len(self._ring) > self._ring_size or self._ring_bytes > self._max_memory
+            ):
+                old = self._ring.popleft()
+                self._ring_bytes -= old.image.nbytes
+                evicted.append(old)
+        for old in evicted:
+            self._release(old.image)
+
+    def incident(
+        self,
+        image: cv2.typing.MatLike,
+        origin: tuple[int, int],
+        annotations: tuple[Annotation, ...],
+        reason: str = "",
+    ) -> bool:
+        """
+        Writes the ring and a copy of the current frame 'image' in the background, unless an incident
+        was written less than 'min_interval' seconds ago. Returns whether the incident is written.
+        """
+        now = monotonic()
+        with self._lock:
+            if (
+                self._last_incident is not None
+                and now - self._last_incident < self._min_interval
+            ):
+                self.tracer.count("flight_recorder_skipped")
+                return False
+            frames = list(self._ring)
+            self._ring.clear()
+            self._ring_bytes = 0
+            self._last_incident = now
+
+        if self.buffers is not None:
+            copy = self.buffers.acquire(image.shape, image.dtype)
+            copy[...] = image
+        else:
+            copy = image.copy()
+        frames.append(RecordedFrame(datetime.now(), copy, origin, annotations))
+        try:
+            self._incidents.put_nowait(Incident(frames[-1].time, reason, frames))
+        except queue.Full:
+            self.tracer.count("flight_recorder_dropped")
+            for frame in frames:
+                self._release(frame.image)
+            return False
+        self.tracer.count("flight_recorder_incident")
+        return True
+
+    def enforce_quota(self) -> int:
+        """
+        Deletes the oldest files of the directory until it holds at most 'max_disk_usage' bytes.
+        Returns the number of deleted files.
+        """
+        try:
+            entries = [entry for entry in os.scandir(self._dir_path) if entry.is_file()]
+        except FileNotFoundError:
+            return 0
+        files = sorted(
+            (stat.st_mtime, entry.name, stat.st_size)
+            for entry, stat in ((entry, entry.stat()) for entry in entries)
+        )
+        usage = sum(size for _, _, size in files)
+        deleted = 0
+        for _, name, size in files:
+            if usage <= self._max_disk_usage:
+                break
+            try:
+                os.remove(p.join(self._dir_path, name))
+            except FileNotFoundError:
+                pass
+            usage -= size
+            deleted += 1
+        self.tracer.count("flight_recorder_deleted", deleted)
+        return deleted
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """
+        Waits up to 'timeout' seconds for the pending incidents to be written.
+        """
+        try:
+            self._incidents.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._writer.join(timeout)
+
+    def _release(self, image: cv2.typing.MatLike) -> None:
+        if self.buffers is not None:
+            self.buffers.release(image)
+
+    def _write_incidents(self) -> None:
+        while True:
+            incident = self._incidents.get()
+            if incident is None:
+                return
+            try:
+                with self.tracer.span("flight_recorder_write"):
+                    self._write(incident)
+                    self.enforce_quota()
+            except Exception as e:
+                print(f"Debug frames can't be saved: {e}")
+            finally:
+                for frame in incident.frames:
+                    self._release(frame.image)
+
+    def _write(self, incident: Incident) -> None:
+        os.makedirs(self._dir_path, exist_ok=True)
+        name = incident.time.strftime("%Y%m%d%H%M%S_%f")
+        frames = []
+        canvas: Optional[np.ndarray] = None
+        for index, frame in enumerate(incident.frames):
+            # the recorded frames may be views of frames owned by the capture, so they are drawn on a copy
+            if canvas is None or canvas.shape != frame.image.shape:
+                canvas = np.empty_like(frame.image)
+            canvas[...] = frame.image
+            draw_annotations(canvas, frame.annotations)
+            file = f"{name}_{index:02d}.jpg"
+            cv2.imwrite(p.join(self._dir_path, file), canvas)
+            frames.append(
+                {
+                    "file": file,
+                    "time": frame.time.isoformat(),
+                    "origin": frame.origin,
+                    "annotations": [annotation[:4] for annotation in frame.annotations],
+                }
+            )
+        with open(p.join(self._dir_path, f"{name}.json"), "w") as file:
+            json.dump({"reason": incident.reason, "frames": frames}, file, indent=4)
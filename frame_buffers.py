@@ -0,0 +1,109 @@
+import threading
+import weakref
+from collections import defaultdict
+
+import numpy as np
+
+from tracing import NULL_TRACER, Tracer
+
+
+class FrameBufferPool:
+    """
+    Reuses NumPy buffers of the same shape and type between frames, instead of allocating them on every tick.
+
+    'acquire' hands out a free buffer, allocating one only if there is none. The caller owns it until it's
+    passed to 'release'; buffers never released are simply freed by the garbage collector.
+    At most 'max_free' buffers of every shape are kept for reuse, and only while the shape is still used:
+    free buffers of a shape not acquired in the last 'max_idle' acquisitions are dropped, e.g. the full frame
+    ones once the controller is calibrated and captures only small regions.
+
+    'allocations', 'reuses' and 'allocated_bytes' count since the pool was created, so a steady state
+    without new allocations is easy to confirm. The same events are counted by the tracer.
+    """
+
+    def __init__(
+        self, max_free: int = 4, max_idle: int = 32, tracer: Tracer = NULL_TRACER
+    ) -> None:
+        self._max_free = max_free
+        self._max_idle = max_idle
+        self.tracer = tracer
+        self._lock = threading.Lock()
+        self._free: defaultdict[tuple, list[np.ndarray]] = defaultdict(list)
+        self._last_acquired: dict[tuple, int] = {}
+        self._acquisitions = 0
+        # buffers handed out, so foreign arrays passed to 'release' are ignored
+        self._in_use: weakref.WeakValueDictionary[int, np.ndarray] = (
+            weakref.WeakValueDictionary()
+        )
+        self.allocations = 0
+        self.reuses = 0
+        self.allocated_bytes = 0
+
+    @property
+    def in_use(self) -> int:
+        return len(self._in_use)
+
+    @property
+    def free_bytes(self) -> int:
+        with self._lock:
+            return sum(
+                buffer.nbytes for buffers in self._free.values() for buffer in buffers
+            )
+
+    def acquire(self, shape: tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        Returns a buffer of 'shape' and 'dtype' with undefined contents.
+        """
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            self._acquisitions += 1
+            self._last_acquired[key] = self._acquisitions
+            self._drop_idle()
+            free = self._free[key]
+            if free:
+                buffer = free.pop()
+                self.reuses += 1
+                reused = True
+            else:
+                buffer = np.empty(shape, dtype)
+                self.allocations += 1
+                self.allocated_bytes += buffer.nbytes
+                reused = False
+            self._in_use[id(buffer)] = buffer
+        self.tracer.count("frame_buffer_reuse" if reused else "frame_buffer_alloc")
+        return buffer
+
+    def release(self, buffer: np.ndarray) -> None:
+        """
+        Returns 'buffer' to the pool. The caller must not use it, or any view of it, afterwards.
+        """
+        with self._lock:
+            if self._in_use.get(id(buffer)) is not buffer:
+                return
+            del self._in_use[id(buffer)]
+            key = (buffer.shape, buffer.dtype.str)
+            if key not in self._last_acquired:
+                return
+            free = self._free[key]
+            if len(free) < self._max_free:
+                free.append(buffer)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._free.clear()
+
+    def _drop_idle(self) -> None:
+        oldest = self._acquisitions - self._max_idle
+        for key, acquired in list(self._last_acquired.items()):
+            if acquired < oldest:
+                del self._last_acquired[key]
+                self._free.pop(key, None)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "allocations": self.allocations,
+            "reuses": self.reuses,
+            "allocated_bytes": self.allocated_bytes,
+            "in_use": self.in_use,
+            "free_bytes": self.free_bytes,
+        }
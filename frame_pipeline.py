@@ -0,0 +1,215 @@
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Callable, Generic, NamedTuple, Optional, TypeVar
+
+import cv2
+
+from teams_controller import TeamsController
+from tracing import NULL_TRACER, Tracer
+
+T = TypeVar("T")
+
+
+class Frame(NamedTuple):
+    seq: int
+    captured_at: float
+    image: cv2.typing.MatLike
+    origin: tuple[int, int]
+
+
+class Sample(NamedTuple):
+    """
+    Result of analyzing a single frame. 'error' holds the exception raised by the analysis, if any.
+    'meeting_duration' is None unless the meeting clock was read from this frame.
+    """
+
+    seq: int
+    captured_at: float
+    analyzed_at: float
+    meeting_duration: Optional[timedelta] = None
+    participants_number: Optional[int] = None
+    error: Optional[Exception] = None
+
+    @property
+    def latency(self) -> float:
+        """
+        Seconds between capturing the frame and finishing its analysis.
+        """
+        return self.analyzed_at - self.captured_at
+
+    def age(self, now: float) -> float:
+        return now - self.captured_at
+
+
+class LatestQueue(Generic[T]):
+    """
+    Bounded queue that never blocks the producer: when full, the oldest item is dropped to make room.
+    'on_drop' is called with every item dropped or skipped, outside of the queue's lock.
+    """
+
+    def __init__(
+        self, maxsize: int = 1, on_drop: Optional[Callable[[T], None]] = None
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("'maxsize' must be at least 1")
+        self._items: deque[T] = deque()
+        self._maxsize = maxsize
+        self._cond = threading.Condition()
+        self._on_drop = on_drop
+        self.dropped = 0
+
+    def put(self, item: T) -> int:
+        """
+        Returns the number of items dropped to make room for 'item'.
+        """
+        with self._cond:
+            dropped = []
+            while len(self._items) >= self._maxsize:
+                dropped.append(self._items.popleft())
+            self._items.append(item)
+            self.dropped += len(dropped)
+            self._cond.notify()
+        self._drop(dropped)
+        return len(dropped)
+
+    def get_latest(self, timeout: Optional[float] = None) -> tuple[Optional[T], int]:
+        """
+        Waits for an item and returns the newest one with the number of older items skipped.
+        Returns (None, 0) on timeout.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                return None, 0
+            item = self._items.pop()
+            skipped = list(self._items)
+            self._items.clear()
+            self.dropped += len(skipped)
+        self._drop(skipped)
+        return item, len(skipped)
+
+    def clear(self) -> None:
+        with self._cond:
+            items = list(self._items)
+            self._items.clear()
+        self._drop(items)
+
+    def _drop(self, items: list[T]) -> None:
+        if self._on_drop:
+            for item in items:
+                self._on_drop(item)
+
+
+class FramePipeline:
+    """
+    Runs screen capture and frame analysis of a 'TeamsController' in background threads.
+
+    The capture thread grabs a frame every 'capture_interval' seconds into a bounded queue.
+    The analysis thread always takes the newest frame, dropping stale ones, and publishes a timestamped 'Sample'.
+    The decision loop consumes samples with 'next_sample', so a slow OCR call delays neither capture nor decisions.
+
+    There is a single analysis thread, because the calibration state of 'TeamsController' is shared by all frames.
+    'read_duration' is asked before every analysis whether the meeting clock should be read by OCR.
+    """
+
+    def __init__(
+        self,
+        teams_controller: TeamsController,
+        *,
+        capture_interval: float,
+        queue_size: int = 2,
+        read_duration: Callable[[], bool] = lambda: True,
+        tracer: Tracer = NULL_TRACER,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._teams_controller = teams_controller
+        self._capture_interval = capture_interval
+        self._read_duration = read_duration
+        self._tracer = tracer
+        self._clock = clock
+        # frames never analyzed give their buffers back right away
+        self._frames: LatestQueue[Frame] = LatestQueue(
+            queue_size, lambda frame: teams_controller.release_frame(frame.image)
+        )
+        self._samples: LatestQueue[Sample] = LatestQueue(queue_size)
+        self._stop_event = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._seq = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop_event.clear()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._analysis_loop, name="analysis", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._frames.clear()
+        self._samples.clear()
+
+    def next_sample(self, timeout: Optional[float] = None) -> Optional[Sample]:
+        """
+        Returns the newest sample not consumed yet, or None if none arrived within 'timeout' seconds.
+        """
+        sample, skipped = self._samples.get_latest(timeout)
+        if sample is None:
+            return None
+        self._tracer.count("samples_dropped", skipped)
+        self._tracer.record("sample_age", sample.age(self._clock()))
+        return sample
+
+    def _capture_loop(self) -> None:
+        deadline = self._clock()
+        while not self._stop_event.is_set():
+            seq = self._seq
+            self._seq += 1
+            captured_at = self._clock()
+            try:
+                image, origin = self._teams_controller.capture_frame()
+            except Exception as e:
+                self._samples.put(Sample(seq, captured_at, self._clock(), error=e))
+            else:
+                dropped = self._frames.put(Frame(seq, captured_at, image, origin))
+                self._tracer.count("frames_dropped", dropped)
+
+            deadline = max(deadline + self._capture_interval, self._clock())
+            self._stop_event.wait(deadline - self._clock())
+
+    def _analysis_loop(self) -> None:
+        while not self._stop_event.is_set():
+            frame, skipped = self._frames.get_latest(timeout=0.1)
+            if frame is None:
+                continue
+            self._tracer.count("frames_dropped", skipped)
+            sample = self._analyze(frame)
+            self._tracer.record("sample_latency", sample.latency)
+            self._samples.put(sample)
+
+    def _analyze(self, frame: Frame) -> Sample:
+        read_duration = self._read_duration()
+        try:
+            self._teams_controller.extract_data(
+                read_duration=read_duration, frame=(frame.image, frame.origin)
+            )
+        except Exception as e:
+            return Sample(frame.seq, frame.captured_at, self._clock(), error=e)
+        return Sample(
+            frame.seq,
+            frame.captured_at,
+            self._clock(),
+            self._teams_controller.meeting_duration if read_duration else None,
+            self._teams_controller.participants_number,
+        )
@@ -0,0 +1,33 @@
+from typing import TYPE_CHECKING
+
+from exceptions import WindowNotReadyException
+
+if TYPE_CHECKING:
+    import pywinctl
+
+
+def find_meeting_windows(excluded_names: list[str]) -> list["pywinctl.Window"]:
+    # imported only when windows are looked for, replayed frames are analyzed without a display
+    import pywinctl
+
+    return [
+        window
+        for window in pywinctl.getAllWindows()
+        if _is_meeting_window(window.title, excluded_names)
+    ]
+
+
+def ensure_maximized(windows: list["pywinctl.Window"]) -> None:
+    for window in windows:
+        if window.isMaximized:
+            return
+    raise WindowNotReadyException("Teams window is not on full screen")
+
+
+def _is_meeting_window(title: str, excluded_names: list[str]) -> bool:
+    if not title.endswith(" | Microsoft Teams"):
+        return False
+    for name in excluded_names:
+        if title.startswith(name + " | "):
+            return False
+    return True
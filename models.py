@@ -1,23 +1,43 @@
-from pydantic import BaseModel, Field, model_validator
+from typing import Any, Callable, Iterable, Optional, Union, overload
 
-from typing import Annotated, Callable, Optional, Union, Any, overload
+import numpy as np
 
 
-class ElementArea(BaseModel):
+class ElementArea:
     """
     Represents an area in a 2D space with a top-left corner at (x, y) and a width and height of 'w' and 'h' respectively.
     The class is immutable.
 
     constructor can take floats, converting them to integers using the 'to_int_func' function.
+    'to_int_func' can be None when all coordinates are already integers.
     """
 
-    x: Annotated[int, Field(ge=0)]
-    y: Annotated[int, Field(ge=0)]
+    __slots__ = ("x", "y", "w", "h")
+    _fields: tuple[str, ...] = ("x", "y", "w", "h")
+
+    x: int
+    y: int
     w: int
     h: int
-    to_int_func: Annotated[
-        Optional[Callable[[int | float], int]], Field(repr=False, exclude=True)
-    ] = int
+
+    def __init__(
+        self,
+        *,
+        x: Union[int, float],
+        y: Union[int, float],
+        w: Union[int, float],
+        h: Union[int, float],
+        to_int_func: Optional[Callable[[Union[int, float]], int]] = int,
+    ) -> None:
+        if to_int_func is not None:
+            x, y, w, h = to_int_func(x), to_int_func(y), to_int_func(w), to_int_func(h)
+        if x < 0 or y < 0:
+            raise ValueError(f"Area corner ({x}, {y}) can't be negative")
+        _set = object.__setattr__
+        _set(self, "x", x)
+        _set(self, "y", y)
+        _set(self, "w", w)
+        _set(self, "h", h)
 
     @overload
     def multiplied_by(
@@ -51,21 +71,49 @@ class ElementArea(BaseModel):
 
         return ElementArea(x=x, y=y, w=w, h=h)
 
-    # model_config: ConfigDict = {'frozen': True}
-    class Config:
-        frozen: True
+    def union(self, other: "ElementArea") -> "ElementArea":
+        x = min(self.x, other.x)
+        y = min(self.y, other.y)
+        w = max(self.x + self.w, other.x + other.w) - x
+        h = max(self.y + self.h, other.y + other.h) - y
+        return ElementArea(x=x, y=y, w=w, h=h, to_int_func=None)
 
-    @model_validator(mode="before")
-    @classmethod
-    def to_int(cls, data: Any) -> Any:
-        if isinstance(data, dict):
-            def_to_int_func = cls.model_fields["to_int_func"].default
-            to_int_func = data.get("to_int_func", def_to_int_func)
-            data["x"] = to_int_func(data["x"])
-            data["y"] = to_int_func(data["y"])
-            data["w"] = to_int_func(data["w"])
-            data["h"] = to_int_func(data["h"])
-        return data
+    def clipped_to(self, width: int, height: int) -> "ElementArea":
+        x = min(self.x, width)
+        y = min(self.y, height)
+        w = max(min(self.x + self.w, width) - x, 0)
+        h = max(min(self.y + self.h, height) - y, 0)
+        return ElementArea(x=x, y=y, w=w, h=h, to_int_func=None)
+
+    def replaced(self, **changes: Any) -> "ElementArea":
+        """
+        Returns a copy with the given fields changed, e.g. 'match.replaced(text="1")'.
+        """
+        return type(self)(**{**self.as_dict(), **changes})
+
+    def as_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self._fields}
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"'{type(self).__name__}' is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"'{type(self).__name__}' is immutable")
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    def __hash__(self) -> int:
+        return hash(tuple(getattr(self, name) for name in self._fields))
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({fields})"
+
+    def __reduce__(self):
+        return _from_dict, (type(self), self.as_dict())
 
 
 class MatchedElementArea(ElementArea):
@@ -73,12 +121,76 @@ class MatchedElementArea(ElementArea):
     Inherits from 'ElementArea' and adds a 'scale' field representing the scale at which the element's template was matched.
     """
 
+    __slots__ = ("scale",)
+    _fields = ElementArea._fields + ("scale",)
+
     scale: float
 
+    def __init__(
+        self,
+        *,
+        x: Union[int, float],
+        y: Union[int, float],
+        w: Union[int, float],
+        h: Union[int, float],
+        scale: float,
+        to_int_func: Optional[Callable[[Union[int, float]], int]] = int,
+    ) -> None:
+        ElementArea.__init__(self, x=x, y=y, w=w, h=h, to_int_func=to_int_func)
+        object.__setattr__(self, "scale", float(scale))
+
 
 class MatchedTextElementArea(ElementArea):
     """
     Inherits from 'ElementArea' and adds a 'text' field representing the found text.
     """
 
+    __slots__ = ("text",)
+    _fields = ElementArea._fields + ("text",)
+
     text: str
+
+    def __init__(
+        self,
+        *,
+        x: Union[int, float],
+        y: Union[int, float],
+        w: Union[int, float],
+        h: Union[int, float],
+        text: str,
+        to_int_func: Optional[Callable[[Union[int, float]], int]] = int,
+    ) -> None:
+        ElementArea.__init__(self, x=x, y=y, w=w, h=h, to_int_func=to_int_func)
+        object.__setattr__(self, "text", str(text))
+
+
+class ElementAreas:
+    """
+    Batch of areas stored as an (n, 4) array of x, y, w and h, for operating on many areas at once.
+    """
+
+    __slots__ = ("boxes",)
+
+    def __init__(self, boxes: np.ndarray) -> None:
+        self.boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+
+    @classmethod
+    def of(cls, areas: Iterable[ElementArea]) -> "ElementAreas":
+        return cls(np.array([(a.x, a.y, a.w, a.h) for a in areas], dtype=np.int64))
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def union(self) -> Optional[ElementArea]:
+        """
+        Smallest area containing all areas of the batch, or None if the batch is empty.
+        """
+        if not len(self.boxes):
+            return None
+        x1, y1 = self.boxes[:, :2].min(axis=0).tolist()
+        x2, y2 = (self.boxes[:, :2] + self.boxes[:, 2:]).max(axis=0).tolist()
+        return ElementArea(x=x1, y=y1, w=x2 - x1, h=y2 - y1, to_int_func=None)
+
+
+def _from_dict(cls: type, data: dict[str, Any]) -> ElementArea:
+    return cls(to_int_func=None, **data)
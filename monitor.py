@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app import App
+from calibration_cache import CalibrationCache
+from config import load_config
+from constants import (
+    CALIBRATION_CACHE_ABS_PATH,
+    TEAMS_LEAVE_BUTTON_ABS_PATH,
+    TEAMS_PEOPLE_ICON_ABS_PATH,
+    TEAMS_SHIELD_ICON_ABS_PATH,
+)
+from detection_profile import DetectionProfile
+from exceptions import WindowNotReadyException
+from meeting_windows import find_meeting_windows
+from template_bank import TemplateBank
+from tracing import NULL_TRACER, Tracer
+
+
+class MeetingMonitor:
+    """
+    Runs an 'App' bound to a single meeting window, with its own disconnect policy and OBS recording.
+    """
+
+    def __init__(self, name: str, app: App) -> None:
+        self.name = name
+        self.app = app
+
+    def run(self):
+        while self.app.update():
+            self.app.wait()
+        print(f"[{self.name}] Meeting ended")
+
+    def close(self):
+        self.app.close()
+
+
+class MonitorManager:
+    """
+    Monitors every open meeting window concurrently, one thread per window.
+
+    The template bank is built once and shared read-only by all monitors, as is the calibration cache.
+    Monitor 'i' records with the OBS instance listening on the i-th port of 'monitors.obs_ports' in config.json;
+    monitors without a port only detect the end of their meeting.
+
+    Windows are captured by their area on the screen, so each one must be on a display of its own:
+    a monitor whose window is covered by another one analyzes the window on top.
+    """
+
+    def __init__(self, tracer: Optional[Tracer] = None) -> None:
+        config = load_config()
+        self._tracer = tracer if tracer else NULL_TRACER
+
+        template_bank = TemplateBank()
+        template_bank.preload(
+            (
+                TEAMS_LEAVE_BUTTON_ABS_PATH,
+                TEAMS_SHIELD_ICON_ABS_PATH,
+                TEAMS_PEOPLE_ICON_ABS_PATH,
+            ),
+            *DetectionProfile.from_settings(config["detection"]).scales,
+        )
+
+        windows = find_meeting_windows(config["teams"]["excluded_names"])
+        if not windows:
+            raise WindowNotReadyException("There are no meeting windows opened")
+
+        obs_ports = config["monitors"]["obs_ports"]
+        calibration_cache = CalibrationCache(CALIBRATION_CACHE_ABS_PATH)
+        self.monitors: list[MeetingMonitor] = []
+        for i, window in enumerate(windows):
+            monitor_config = config
+            if i < len(obs_ports):
+                monitor_config = {**config, "obs": {**config["obs"], "port": obs_ports[i]}}
+            else:
+                print(f"No OBS port for '{window.title}', it won't be recorded")
+            app = App(
+                monitor_config,
+                tracer=self._tracer,
+                template_bank=template_bank,
+                calibration_cache=calibration_cache,
+                suspend=False,
+                sounds=False,
+                window=window,
+                record=i < len(obs_ports),
+            )
+            self.monitors.append(MeetingMonitor(window.title, app))
+
+    def run(self):
+        try:
+            with ThreadPoolExecutor(
+                max_workers=len(self.monitors), thread_name_prefix="monitor"
+            ) as pool:
+                futures = [pool.submit(monitor.run) for monitor in self.monitors]
+                for future in futures:
+                    future.result()
+        finally:
+            for monitor in self.monitors:
+                monitor.close()
+
+
+if __name__ == "__main__":
+    manager = MonitorManager()
+    print(f"Monitoring {len(manager.monitors)} meetings")
+    manager.run()
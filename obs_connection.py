@@ -0,0 +1,181 @@
+import logging
+import time
+from typing import Callable, Optional, TypeVar
+
+import obsws_python as obs
+from websocket import WebSocketException
+
+from tracing import NULL_TRACER, Tracer
+
+T = TypeVar("T")
+
+# raised by 'obsws_python' when the websocket can't be opened or was closed by OBS
+CONNECTION_ERRORS = (OSError, WebSocketException, obs.error.OBSSDKTimeoutError)
+
+# 'obsws_python' logs a traceback for every failed attempt, which are expected while OBS is starting
+logging.getLogger("obsws_python").addHandler(logging.NullHandler())
+
+
+class OBSConnectionError(Exception):
+    pass
+
+
+class Backoff:
+    """
+    Exponentially growing delays between retries, bounded by 'max_delay', until 'timeout' seconds pass.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout: float,
+        initial_delay: float = 0.05,
+        max_delay: float = 2.0,
+        factor: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._deadline = clock() + timeout
+        self._delay = initial_delay
+        self._max_delay = max_delay
+        self._factor = factor
+        self._clock = clock
+        self._sleep = sleep
+
+    def wait(self) -> bool:
+        """
+        Sleeps before the next retry. Returns False without sleeping if the deadline has passed.
+        """
+        remaining = self._deadline - self._clock()
+        if remaining <= 0:
+            return False
+        self._sleep(min(self._delay, remaining))
+        self._delay = min(self._delay * self._factor, self._max_delay)
+        return True
+
+
+class OBSConnection:
+    """
+    Keeps a single 'obsws_python' client for the whole session instead of connecting for every recording.
+
+    The first connection launches OBS with 'launch' if it isn't listening yet, then waits with an exponential
+    backoff until the websocket accepts connections and OBS accepts requests, for at most 'connect_timeout' seconds.
+    'on_connect' is called with every new client, e.g. to invalidate state cached for the previous OBS process.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        password: str,
+        *,
+        launch: Optional[Callable[[], None]] = None,
+        on_connect: Optional[Callable[[obs.ReqClient], None]] = None,
+        connect_timeout: float = 60.0,
+        request_timeout: float = 5.0,
+        tracer: Tracer = NULL_TRACER,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._host = host
+        self._port = port
+        self._password = password
+        self._launch = launch
+        self._on_connect = on_connect
+        self._connect_timeout = connect_timeout
+        self._request_timeout = request_timeout
+        self._tracer = tracer
+        self._clock = clock
+        self._sleep = sleep
+        self._client: Optional[obs.ReqClient] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
+
+    @property
+    def client(self) -> obs.ReqClient:
+        if self._client is None:
+            self._connect()
+        return self._client
+
+    def call(self, request: Callable[[obs.ReqClient], T]) -> T:
+        """
+        Runs 'request' with the client. If the connection was lost, e.g. because OBS was restarted,
+        it reconnects and runs 'request' once more.
+        """
+        try:
+            return request(self.client)
+        except CONNECTION_ERRORS:
+            self._tracer.count("obs_reconnect")
+            self.close()
+        try:
+            return request(self.client)
+        except CONNECTION_ERRORS as e:
+            self.close()
+            raise OBSConnectionError(
+                f"Connection to OBS on {self._host}:{self._port} was lost"
+            ) from e
+
+    def close(self) -> None:
+        if self._client is None:
+            return
+        _disconnect(self._client)
+        self._client = None
+
+    def _connect(self) -> None:
+        deadline = self._clock() + self._connect_timeout
+        backoff = self._backoff(deadline)
+        launched = False
+        while True:
+            try:
+                client = obs.ReqClient(
+                    host=self._host,
+                    port=self._port,
+                    password=self._password,
+                    timeout=self._request_timeout,
+                )
+                break
+            except CONNECTION_ERRORS as e:
+                if self._launch and not launched:
+                    self._launch()
+                    launched = True
+                self._tracer.count("obs_connect_retry")
+                if not backoff.wait():
+                    raise OBSConnectionError(
+                        f"OBS isn't listening on {self._host}:{self._port}"
+                    ) from e
+
+        # obs-websocket accepts connections before OBS has loaded, requests fail until then
+        backoff = self._backoff(deadline)
+        while True:
+            try:
+                client.get_stats()
+                break
+            except obs.error.OBSSDKRequestError as e:
+                self._tracer.count("obs_ready_retry")
+                if not backoff.wait():
+                    _disconnect(client)
+                    raise OBSConnectionError("OBS didn't become ready in time") from e
+            except CONNECTION_ERRORS as e:
+                # e.g. OBS quit while loading
+                _disconnect(client)
+                raise OBSConnectionError(
+                    f"OBS on {self._host}:{self._port} closed the connection while loading"
+                ) from e
+
+        self._client = client
+        if self._on_connect:
+            self._on_connect(client)
+
+    def _backoff(self, deadline: float) -> Backoff:
+        return Backoff(
+            timeout=deadline - self._clock(), clock=self._clock, sleep=self._sleep
+        )
+
+
+def _disconnect(client: obs.ReqClient) -> None:
+    try:
+        client.disconnect()
+    except CONNECTION_ERRORS:
+        pass
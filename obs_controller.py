@@ -1,86 +1,155 @@
-import os
+import platform
+import subprocess
 import obsws_python as obs
-import json
+from typing import Optional
+from config import load_config
+from obs_connection import OBSConnection
+from tracing import NULL_TRACER, Tracer, traced
 
 
 class OBSController:
-    def __init__(self):
-        with open("config.json", "r") as json_file:
-            config = json.load(json_file)
+    """
+    Records the meeting window with OBS through a single, reused websocket connection.
+    The scene and its window source are set up on the first recording and reused by later ones.
+
+    On macOS the Teams window is captured. On Linux, e.g. in a fleet session, OBS is started on the display
+    the app runs on and the whole X screen is captured, the meeting is the only thing on it.
+    OBS is launched as a new instance listening on 'port', so several controllers record at the same time.
+    """
+
+    def __init__(
+        self,
+        tracer: Optional[Tracer] = None,
+        *,
+        port: Optional[int] = None,
+        scene_name: str = "clinophilia_scene",
+        window_title: Optional[str] = None,
+        launch: bool = True,
+        config: Optional[dict] = None,
+    ):
+        self._tracer = tracer if tracer else NULL_TRACER
+        config = config if config else load_config()
         self._obs_path = config["obs"]["path"]
-        self._host = config["obs"]["host"]
-        self._port = config["obs"]["port"]
+        self._port = port if port is not None else config["obs"]["port"]
         self._password = config["obs"]["password"]
+        self._system = platform.system()
+        self.scene_name = scene_name
+        self.source_name = scene_name + "_source"
+        # title of the meeting window to record, any meeting window if None
+        self._window_title = window_title
+        self._connection = OBSConnection(
+            config["obs"]["host"],
+            self._port,
+            self._password,
+            launch=self._launch_obs if launch else None,
+            on_connect=self._forget_setup,
+            connect_timeout=config["obs"]["connect_timeout"],
+            tracer=self._tracer,
+        )
+        self._scene_ready = False
+        self._source_ready = False
+        self._window_id: Optional[str] = None
 
+    @traced("start_recording")
     def start_recording(self):
-        os.system("open " + self._obs_path + " --args --minimize-to-tray")
+        self._connection.call(self._start_recording)
 
-        # Wait until the obs client is connected to the server
-        while True:
-            try:
-                self._obs_client = obs.ReqClient(
-                    host=self._host, port=self._port, password=self._password, timeout=5
-                )
-                break
-            except ConnectionRefusedError as e:
-                pass
-
-        # Wait until the obs server is ready to receive requests
-        while True:
-            try:
-                self._obs_client.get_stats()
-                break
-            except obs.error.OBSSDKRequestError as e:
-                pass
-
-        self.scene_name = "clinophilia_scene"
-
-        try:
-            self._obs_client.create_scene(self.scene_name)
-        except obs.error.OBSSDKRequestError as e:
-            self._obs_client.remove_scene(self.scene_name)
-            while True:
-                try:
-                    self._obs_client.create_scene(self.scene_name)
-                    break
-                except obs.error.OBSSDKRequestError as e:
-                    pass
-
-        self._obs_client.set_current_program_scene(self.scene_name)
-
-        self._obs_client.create_input(
-            self.scene_name,
-            self.scene_name + "_dummy_source",
-            "screen_capture",
-            {},
-            False,
-        )
-        windows = self._obs_client.get_input_properties_list_property_items(
-            self.scene_name + "_dummy_source", "window"
+    def stop_recording(self):
+        self._connection.call(self._stop_recording)
+
+    def close(self):
+        self._connection.close()
+
+    def _launch_obs(self):
+        # a separate instance for every recording, listening on the port of the recording
+        args = [
+            "--minimize-to-tray",
+            "--multi",
+            "--websocket_port",
+            str(self._port),
+            "--websocket_password",
+            self._password,
+        ]
+        if self._system == "Darwin":
+            # 'open' would only activate an OBS already running, '-n' starts another one
+            command = ["open", "-n", self._obs_path, "--args", *args]
+        else:
+            command = [self._obs_path, *args]
+        subprocess.Popen(
+            command,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
         )
-        self._obs_client.remove_input(self.scene_name + "_dummy_source")
 
-        teams_window_id = None
-        for window in windows.property_items:
-            if window["itemName"].endswith(" | Microsoft Team"):
-                teams_window_id = window["itemValue"]
-                break
-
-        self._obs_client.create_input(
-            self.scene_name,
-            self.scene_name + "_source",
-            "screen_capture",
-            {
+    def _forget_setup(self, obs_client: obs.ReqClient):
+        # a new connection may belong to a restarted OBS
+        self._scene_ready = False
+        self._source_ready = False
+        self._window_id = None
+
+    def _start_recording(self, obs_client: obs.ReqClient):
+        if obs_client.get_record_status().output_active:
+            return
+
+        if not self._scene_ready:
+            scenes = obs_client.get_scene_list().scenes
+            if not any(scene["sceneName"] == self.scene_name for scene in scenes):
+                obs_client.create_scene(self.scene_name)
+            obs_client.set_current_program_scene(self.scene_name)
+            self._scene_ready = True
+
+        if not self._source_ready:
+            inputs = obs_client.get_input_list().inputs
+            if not any(item["inputName"] == self.source_name for item in inputs):
+                obs_client.create_input(
+                    self.scene_name, self.source_name, *self._capture_input(), True
+                )
+            self._source_ready = True
+
+        if self._system == "Darwin":
+            # the source lists the windows itself, so no dummy input is needed
+            window_id = self._find_window_id(obs_client)
+            if window_id != self._window_id:
+                obs_client.set_input_settings(
+                    self.source_name, {"window": window_id}, True
+                )
+                self._window_id = window_id
+
+        obs_client.start_record()
+
+    def _capture_input(self) -> tuple[str, dict]:
+        """
+        Kind and settings of the input capturing the meeting.
+        """
+        if self._system == "Darwin":
+            return "screen_capture", {
                 "application": "com.microsoft.teams2",
                 "show_cursor": False,
                 "type": 2,
-                "window": teams_window_id,
-            },
-            True,
+            }
+        return "xshm_input", {"screen": 0, "show_cursor": False}
+
+    def _stop_recording(self, obs_client: obs.ReqClient):
+        if obs_client.get_record_status().output_active:
+            obs_client.stop_record()
+
+    def _find_window_id(self, obs_client: obs.ReqClient):
+        windows = obs_client.get_input_properties_list_property_items(
+            self.source_name, "window"
         )
+        for window in windows.property_items:
+            name = window["itemName"]
+            # window titles end with " | Microsoft Teams", OBS may cut off the last letter
+            suffix = next((s for s in _TITLE_SUFFIXES if name.endswith(s)), None)
+            if suffix is None:
+                continue
+            # item names may be prefixed with the application name in brackets
+            meeting_name = name[: -len(suffix)].split("] ", 1)[-1]
+            if self._window_title and not self._window_title.startswith(meeting_name):
+                continue
+            return window["itemValue"]
+        return None
 
-        self._obs_client.start_record()
 
-    def stop_recording(self):
-        self._obs_client.stop_record()
-        self._obs_client.remove_scene(self.scene_name)
+_TITLE_SUFFIXES = (" | Microsoft Teams", " | Microsoft Team")
@@ -0,0 +1,251 @@
+import shlex
+from os import path as p
+from tempfile import TemporaryDirectory
+from typing import Optional, Sequence
+
+import cv2
+import numpy as np
+import pytesseract as tes
+
+from models import ElementArea, MatchedTextElementArea
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+OCRRequest = tuple[cv2.typing.MatLike, Optional[ElementArea]]
+"""
+Binarized image of a region and the area it was cropped from, used to make the resulting boxes absolute.
+"""
+
+
+class OCREngine:
+    def recognize(
+        self, requests: Sequence[OCRRequest]
+    ) -> list[list[MatchedTextElementArea]]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class TesseractCLIEngine(OCREngine):
+    """
+    Runs the tesseract executable through 'pytesseract'.
+    A batch of several images is passed to a single tesseract process as a list file, so the process and
+    the model are loaded once per batch instead of once per image.
+    """
+
+    def __init__(self, config: str) -> None:
+        self._config = config
+
+    def recognize(
+        self, requests: Sequence[OCRRequest]
+    ) -> list[list[MatchedTextElementArea]]:
+        if len(requests) == 1:
+            img, area = requests[0]
+            data = tes.image_to_data(
+                img, output_type=tes.Output.DICT, config=self._config
+            )
+            return [_data_to_matches(data, area)]
+
+        with TemporaryDirectory(prefix="clinophilia_ocr_") as tmp_dir:
+            images_paths = []
+            for i, (img, _) in enumerate(requests):
+                image_path = p.join(tmp_dir, f"{i}.png")
+                cv2.imwrite(image_path, img)
+                images_paths.append(image_path)
+            list_path = p.join(tmp_dir, "images.txt")
+            with open(list_path, "w") as list_file:
+                list_file.write("\n".join(images_paths) + "\n")
+            data = tes.image_to_data(
+                list_path, output_type=tes.Output.DICT, config=self._config
+            )
+
+        # tesseract numbers the pages of a list file starting from 1
+        pages: list[dict[str, list]] = [
+            {key: [] for key in data} for _ in range(len(requests))
+        ]
+        for i, page_num in enumerate(data.get("page_num", [])):
+            page = pages[page_num - 1]
+            for key, values in data.items():
+                page[key].append(values[i])
+        return [
+            _data_to_matches(page, area) for page, (_, area) in zip(pages, requests)
+        ]
+
+
+class TesserocrEngine(OCREngine):
+    """
+    Keeps a tesseract instance loaded in-process through the C API binding of 'tesserocr'.
+    Accepts the same config strings as the tesseract executable: '--oem', '--psm', '-c' variables and config files.
+    """
+
+    def __init__(self, config: str) -> None:
+        from PIL import Image
+
+        self._image_cls = Image
+        oem, psm = tesserocr.OEM.DEFAULT, tesserocr.PSM.AUTO
+        variables: dict[str, str] = {}
+        configs: list[str] = []
+        args = shlex.split(config)
+        i = 0
+        while i < len(args):
+            if args[i] == "--oem":
+                oem = int(args[i + 1])
+                i += 1
+            elif args[i] == "--psm":
+                psm = int(args[i + 1])
+                i += 1
+            elif args[i] == "-c":
+                key, value = args[i + 1].split("=", 1)
+                variables[key] = value
+                i += 1
+            else:
+                configs.append(args[i])
+            i += 1
+        self._api = tesserocr.PyTessBaseAPI(
+            psm=psm, oem=oem, configs=configs, variables=variables
+        )
+
+    def recognize(
+        self, requests: Sequence[OCRRequest]
+    ) -> list[list[MatchedTextElementArea]]:
+        results = []
+        level = tesserocr.RIL.WORD
+        for img, area in requests:
+            area_x, area_y = (area.x, area.y) if area else (0, 0)
+            self._api.SetImage(self._image_cls.fromarray(img))
+            self._api.Recognize()
+            # page level entry, as in the tsv output of the executable
+            matches = [
+                MatchedTextElementArea(
+                    x=area_x, y=area_y, w=img.shape[1], h=img.shape[0], text=""
+                )
+            ]
+            for word in tesserocr.iterate_level(self._api.GetIterator(), level):
+                box = word.BoundingBox(level)
+                if box is None:
+                    continue
+                x1, y1, x2, y2 = box
+                matches.append(
+                    MatchedTextElementArea(
+                        x=x1 + area_x,
+                        y=y1 + area_y,
+                        w=x2 - x1,
+                        h=y2 - y1,
+                        text=word.GetUTF8Text(level).strip(),
+                    )
+                )
+            results.append(matches)
+        return results
+
+    def close(self) -> None:
+        self._api.End()
+
+
+class OCRService:
+    """
+    Keeps one long-lived OCR engine per tesseract config string.
+    The in-process 'tesserocr' engine is used when the package is installed, the tesseract executable otherwise.
+    """
+
+    def __init__(self, use_tesserocr: Optional[bool] = None) -> None:
+        if use_tesserocr is None:
+            use_tesserocr = tesserocr is not None
+        self._use_tesserocr = use_tesserocr
+        self._engines: dict[str, OCREngine] = {}
+
+    def engine(self, config: str) -> OCREngine:
+        engine = self._engines.get(config)
+        if engine is None:
+            if self._use_tesserocr:
+                engine = TesserocrEngine(config)
+            else:
+                engine = TesseractCLIEngine(config)
+            self._engines[config] = engine
+        return engine
+
+    def recognize(
+        self, requests: Sequence[OCRRequest], config: str
+    ) -> list[list[MatchedTextElementArea]]:
+        if not len(requests):
+            return []
+        return self.engine(config).recognize(requests)
+
+    def recognize_mosaic(
+        self, requests: Sequence[OCRRequest], config: str, gap: int = 16
+    ) -> list[list[MatchedTextElementArea]]:
+        """
+        Recognizes all images in a single pass by stacking them into one mosaic image.
+        Word boxes are mapped back to the image they lie in; boxes spanning several images are dropped.
+        Every result starts with an empty, image-sized entry, like the page level entry of tesseract.
+        """
+        if len(requests) <= 1:
+            return self.recognize(requests, config)
+
+        width = max(img.shape[1] for img, _ in requests) + 2 * gap
+        height = sum(img.shape[0] for img, _ in requests) + gap * (len(requests) + 1)
+        mosaic = np.full((height, width), 255, np.uint8)
+        tops = []
+        y = gap
+        for img, _ in requests:
+            mosaic[y : y + img.shape[0], gap : gap + img.shape[1]] = img
+            tops.append(y)
+            y += img.shape[0] + gap
+
+        results = [
+            [
+                MatchedTextElementArea(
+                    x=area.x if area else 0,
+                    y=area.y if area else 0,
+                    w=img.shape[1],
+                    h=img.shape[0],
+                    text="",
+                )
+            ]
+            for img, area in requests
+        ]
+        for match in self.recognize([(mosaic, None)], config)[0]:
+            for (img, area), top, result in zip(requests, tops, results):
+                if (
+                    match.y < top - gap // 2
+                    or match.y + match.h > top + img.shape[0] + gap // 2
+                ):
+                    continue
+                x = max(match.x - gap, 0)
+                y = max(match.y - top, 0)
+                result.append(
+                    MatchedTextElementArea(
+                        x=x + (area.x if area else 0),
+                        y=y + (area.y if area else 0),
+                        w=match.w,
+                        h=match.h,
+                        text=match.text,
+                    )
+                )
+                break
+        return results
+
+    def close(self) -> None:
+        for engine in self._engines.values():
+            engine.close()
+        self._engines.clear()
+
+
+def _data_to_matches(
+    data: dict[str, list], area: Optional[ElementArea]
+) -> list[MatchedTextElementArea]:
+    matches: list[MatchedTextElementArea] = []
+    for i in range(len(data.get("text", []))):
+        matches.append(
+            MatchedTextElementArea(
+                x=data["left"][i] + (area.x if area else 0),
+                y=data["top"][i] + (area.y if area else 0),
+                w=data["width"][i],
+                h=data["height"][i],
+                text=str(data["text"][i]),
+            )
+        )
+    return matches
@@ -0,0 +1,374 @@
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from os import path as p
+from time import perf_counter
+from typing import Iterator, NamedTuple, Optional, TextIO
+
+import cv2
+
+from constants import PROJECT_DIR_ABS_PATH
+from exceptions import ElementNotFoundException, ParticipantsNumberNotVisibleException
+from ocr_service import OCRService
+from screen_capture import StreamCapture
+from teams_controller import TeamsController
+from template_bank import TemplateBank
+
+FRAME_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+TIMELINE_HEADER = ("timestamp", "meeting_duration", "participants", "hand_raised")
+
+
+class TimelineSample(NamedTuple):
+    """
+    Data read from a single frame. 'timestamp' and 'meeting_duration' are in seconds,
+    'meeting_duration' and 'participants' are None if they couldn't be read from the frame.
+    """
+
+    timestamp: float
+    meeting_duration: Optional[int] = None
+    participants: Optional[int] = None
+    hand_raised: bool = False
+
+    def row(self) -> tuple:
+        return (
+            f"{self.timestamp:.3f}",
+            "" if self.meeting_duration is None else self.meeting_duration,
+            "" if self.participants is None else self.participants,
+            int(self.hand_raised),
+        )
+
+
+class FrameSource:
+    """
+    Base class of the recorded frame sources. Frames are decoded one at a time, never the whole source at once.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    @property
+    def frame_count(self) -> int:
+        raise NotImplementedError
+
+    @property
+    def frame_interval(self) -> float:
+        """
+        Seconds between two consecutive frames.
+        """
+        raise NotImplementedError
+
+    def frames(
+        self, start: int, stop: Optional[int], step: int
+    ) -> Iterator[tuple[int, cv2.typing.MatLike]]:
+        """
+        Yields every 'step'-th frame with its index, from 'start' up to 'stop' or the end of the source.
+        """
+        raise NotImplementedError
+
+
+class VideoSource(FrameSource):
+    """
+    Video file decoded with OpenCV. Skipped frames are only grabbed, not converted to BGR images.
+    Seeking to the start of a chunk is only trusted if the decoder reports landing on the requested frame,
+    otherwise the frames before it are grabbed from the beginning of the video.
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise ValueError(f"Video {path} can't be opened")
+        self._frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        capture.release()
+        if fps <= 0:
+            raise ValueError(f"Video {path} has no frame rate")
+        self._frame_interval = 1 / fps
+
+    @property
+    def frame_count(self) -> int:
+        return self._frame_count
+
+    @property
+    def frame_interval(self) -> float:
+        return self._frame_interval
+
+    def frames(
+        self, start: int, stop: Optional[int], step: int
+    ) -> Iterator[tuple[int, cv2.typing.MatLike]]:
+        capture = cv2.VideoCapture(self.path)
+        try:
+            if start and not _seek(capture, start):
+                capture.release()
+                capture = cv2.VideoCapture(self.path)
+                for _ in range(start):
+                    if not capture.grab():
+                        return
+            index = start
+            while stop is None or index < stop:
+                ok, frame = capture.read()
+                if not ok:
+                    return
+                yield index, frame
+                for _ in range(step - 1):
+                    if not capture.grab():
+                        return
+                index += step
+        finally:
+            capture.release()
+
+
+def _seek(capture: cv2.VideoCapture, index: int) -> bool:
+    """
+    Returns whether 'capture' is positioned exactly on frame 'index'; seeking to a key frame may land elsewhere.
+    """
+    return (
+        capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+        and int(capture.get(cv2.CAP_PROP_POS_FRAMES)) == index
+    )
+
+
+class FrameDirectorySource(FrameSource):
+    """
+    Directory of frame dumps, ordered by file name and taken every 'frame_interval' seconds.
+    """
+
+    def __init__(self, path: str, frame_interval: float) -> None:
+        super().__init__(path)
+        self._files = sorted(
+            file
+            for file in os.listdir(path)
+            if file.lower().endswith(FRAME_EXTENSIONS)
+        )
+        self._frame_interval = frame_interval
+
+    @property
+    def frame_count(self) -> int:
+        return len(self._files)
+
+    @property
+    def frame_interval(self) -> float:
+        return self._frame_interval
+
+    def frames(
+        self, start: int, stop: Optional[int], step: int
+    ) -> Iterator[tuple[int, cv2.typing.MatLike]]:
+        for index in range(start, len(self._files) if stop is None else stop, step):
+            frame = cv2.imread(p.join(self.path, self._files[index]))
+            if frame is None:
+                print(f"Frame {self._files[index]} can't be read, skipping")
+                continue
+            yield index, frame
+
+
+def open_source(path: str, frame_interval: float = 1.0) -> FrameSource:
+    if p.isdir(path):
+        return FrameDirectorySource(path, frame_interval)
+    return VideoSource(path)
+
+
+class Chunk(NamedTuple):
+    path: str
+    frame_interval: float
+    start: int
+    stop: Optional[int]
+    step: int
+
+
+def split_into_chunks(
+    source: FrameSource, sample_interval: float, chunk_duration: float
+) -> list[Chunk]:
+    """
+    Splits the source into chunks of about 'chunk_duration' seconds, analyzed independently by the workers.
+    Chunk bounds are multiples of the step, so the samples are the same no matter how the source is split.
+    """
+    step = max(round(sample_interval / source.frame_interval), 1)
+    chunk_frames = max(round(chunk_duration / source.frame_interval / step), 1) * step
+    chunks = []
+    for start in range(0, max(source.frame_count, 1), chunk_frames):
+        stop = start + chunk_frames
+        chunks.append(
+            Chunk(source.path, source.frame_interval, start, stop, step)
+        )
+    # the frame count of a video is only an estimate, the last chunk reads until the end
+    chunks[-1] = chunks[-1]._replace(stop=None)
+    return chunks
+
+
+class ChunkAnalyzer:
+    """
+    Runs the frames of chunks through 'TeamsController'. Controllers are kept per source, so the calibration
+    found in one chunk is reused by the next chunks of the same source analyzed by this process.
+    After 'recalibrate_after' frames in a row without a meeting, the offsets are found again from scratch,
+    as they are right away when the frame size changes, e.g. when the recording resolution was changed.
+    Frames that can't be read, such as a misread meeting duration, give an empty sample.
+    """
+
+    def __init__(self, recalibrate_after: int = 5) -> None:
+        self._template_bank = TemplateBank()
+        self._ocr_service = OCRService()
+        self._recalibrate_after = recalibrate_after
+        self._controllers: dict[str, tuple[TeamsController, StreamCapture]] = {}
+
+    def analyze(self, chunk: Chunk) -> list[TimelineSample]:
+        if chunk.path not in self._controllers:
+            capture = StreamCapture()
+            ctrl = TeamsController(
+                template_bank=self._template_bank,
+                capture=capture,
+                ocr_service=self._ocr_service,
+            )
+            self._controllers[chunk.path] = ctrl, capture
+        ctrl, capture = self._controllers[chunk.path]
+
+        source = open_source(chunk.path, chunk.frame_interval)
+        samples = []
+        failures = 0
+        for index, frame in source.frames(chunk.start, chunk.stop, chunk.step):
+            timestamp = index * source.frame_interval
+            size = (frame.shape[1], frame.shape[0])
+            if capture.size is not None and capture.size != size:
+                # offsets found at another frame size don't fit
+                ctrl.clear_offsets()
+            capture.feed(frame)
+            try:
+                ctrl.extract_data()
+                sample = TimelineSample(
+                    timestamp,
+                    int(ctrl.meeting_duration.total_seconds()),
+                    ctrl.participants_number,
+                )
+                failures = 0
+            except ParticipantsNumberNotVisibleException:
+                sample = TimelineSample(
+                    timestamp, int(ctrl.meeting_duration.total_seconds()), None, True
+                )
+                failures = 0
+            except ValueError:
+                # e.g. a misread meeting duration, the elements were found
+                sample = TimelineSample(timestamp)
+            except ElementNotFoundException:
+                sample = TimelineSample(timestamp)
+                failures += 1
+                if failures % self._recalibrate_after == 0:
+                    ctrl.clear_offsets()
+            samples.append(sample)
+        return samples
+
+    def close(self) -> None:
+        self._ocr_service.close()
+
+
+_analyzer: Optional[ChunkAnalyzer] = None
+
+
+def _init_worker(recalibrate_after: int) -> None:
+    global _analyzer
+    _analyzer = ChunkAnalyzer(recalibrate_after)
+
+
+def _analyze_chunk(chunk: Chunk) -> list[TimelineSample]:
+    return _analyzer.analyze(chunk)
+
+
+def analyze(
+    path: str,
+    output: TextIO,
+    *,
+    sample_interval: float = 1.0,
+    frame_interval: float = 1.0,
+    chunk_duration: float = 600.0,
+    workers: int = 1,
+    recalibrate_after: int = 5,
+) -> int:
+    """
+    Writes a CSV timeline of the recorded meeting at 'path', a video or a directory of frames, to 'output'.
+    Frames are sampled every 'sample_interval' seconds; 'frame_interval' is the time between the frames of
+    a directory. Chunks of 'chunk_duration' seconds are analyzed by 'workers' processes and written in order
+    as they are done. Returns the number of samples.
+    """
+    source = open_source(path, frame_interval)
+    chunks = split_into_chunks(source, sample_interval, chunk_duration)
+    writer = csv.writer(output)
+    writer.writerow(TIMELINE_HEADER)
+    count = 0
+
+    if workers <= 1:
+        analyzer = ChunkAnalyzer(recalibrate_after)
+        try:
+            for chunk in chunks:
+                for sample in analyzer.analyze(chunk):
+                    writer.writerow(sample.row())
+                    count += 1
+        finally:
+            analyzer.close()
+        return count
+
+    with ProcessPoolExecutor(
+        workers, initializer=_init_worker, initargs=(recalibrate_after,)
+    ) as executor:
+        for samples in executor.map(_analyze_chunk, chunks):
+            writer.writerows(sample.row() for sample in samples)
+            count += len(samples)
+    return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Extracts the meeting duration and participants number timeline "
+        "from a recorded meeting video or a directory of frame dumps."
+    )
+    parser.add_argument("source", help="video file or directory with frames")
+    parser.add_argument(
+        "-o", "--output", help="CSV file for the timeline, standard output if omitted"
+    )
+    parser.add_argument(
+        "--sample-interval",
+        type=float,
+        default=1.0,
+        help="seconds of the recording between analyzed frames",
+    )
+    parser.add_argument(
+        "--frame-interval",
+        type=float,
+        default=1.0,
+        help="seconds between the frames of a directory",
+    )
+    parser.add_argument(
+        "--chunk-duration",
+        type=float,
+        default=600.0,
+        help="seconds of the recording analyzed by a worker at once",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--recalibrate-after", type=int, default=5)
+    args = parser.parse_args()
+    source = p.abspath(args.source)
+    output_path = p.abspath(args.output) if args.output else None
+    os.chdir(PROJECT_DIR_ABS_PATH)  # config.json is read from the working directory
+
+    start = perf_counter()
+    output = open(output_path, "w", newline="") if output_path else sys.stdout
+    try:
+        count = analyze(
+            source,
+            output,
+            sample_interval=args.sample_interval,
+            frame_interval=args.frame_interval,
+            chunk_duration=args.chunk_duration,
+            workers=args.workers,
+            recalibrate_after=args.recalibrate_after,
+        )
+    finally:
+        if output_path:
+            output.close()
+    print(
+        f"{count} samples analyzed in {perf_counter() - start:.1f} s", file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from models import ElementArea
+
+
+class OffsetTracker:
+    """
+    Estimates how far the top bar elements moved since they were found, by phase correlation of a grayscale
+    band around their offsets, kept from the frame they were found on, with the same band of a new frame.
+
+    Every group of elements, e.g. the shield icon with the meeting clock, is correlated on its own part of the band,
+    widened by 'margin' times its width on both sides, as the parts of a resized window move differently.
+    A group can be followed for at most half of its part of the band; shifts with a correlation response
+    under 'min_response' aren't trusted.
+    """
+
+    def __init__(self, min_response: float = 0.1, margin: float = 4.0) -> None:
+        self._min_response = min_response
+        self._margin = margin
+        self._reference: Optional[np.ndarray] = None
+        self._windows: dict[tuple[int, int], np.ndarray] = {}
+        # full frame area of the reference band and the window box it was taken with
+        self.area: Optional[ElementArea] = None
+        self.window_box: Optional[tuple[int, int, int, int]] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._reference is not None
+
+    def update(
+        self,
+        gray: cv2.typing.MatLike,
+        area: ElementArea,
+        window_box: Optional[tuple[int, int, int, int]] = None,
+    ) -> None:
+        """
+        Keeps 'gray', the band under 'area' of a frame the elements were found on, as the reference.
+        """
+        if self._reference is None or self._reference.shape != gray.shape:
+            self._reference = np.empty(gray.shape, dtype=np.float32)
+        self._reference[...] = gray
+        self.area = area
+        self.window_box = window_box
+
+    def clear(self) -> None:
+        self._reference = None
+        self.area = None
+        self.window_box = None
+
+    def track(
+        self,
+        gray: cv2.typing.MatLike,
+        groups: dict[str, ElementArea],
+        priors: Optional[dict[str, int]] = None,
+    ) -> Optional[dict[str, tuple[int, int]]]:
+        """
+        Shifts of the groups, given by the full frame areas of their elements in the reference band,
+        between the reference and 'gray', a band of the same size taken from a new frame.
+        'priors' are the horizontal shifts the groups are expected to have, their parts of 'gray' are taken
+        that far away and only the rest is estimated. Returns None if any of them can't be tracked.
+        """
+        if self._reference is None or gray.shape != self._reference.shape:
+            return None
+        priors = priors or {}
+        current = gray.astype(np.float32)
+        height, width = current.shape
+        shifts = {}
+        for name, area in groups.items():
+            prior = priors.get(name, 0)
+            margin = int(area.w * self._margin)
+            left = max(area.x - self.area.x - margin, 0, -prior)
+            right = min(area.x - self.area.x + area.w + margin, width, width - prior)
+            if right - left < 2 or height < 2:
+                return None
+            (dx, dy), response = cv2.phaseCorrelate(
+                self._reference[:, left:right],
+                current[:, left + prior : right + prior],
+                self._window(right - left, height),
+            )
+            if response < self._min_response:
+                return None
+            # subpixel estimates of still elements wobble around zero
+            shifts[name] = (prior + _whole_pixels(dx), _whole_pixels(dy))
+        return shifts
+
+    def _window(self, width: int, height: int) -> np.ndarray:
+        window = self._windows.get((width, height))
+        if window is None:
+            window = cv2.createHanningWindow((width, height), cv2.CV_32F)
+            self._windows[(width, height)] = window
+        return window
+
+
+def _whole_pixels(shift: float) -> int:
+    return round(shift) if abs(shift) >= 1 else 0
@@ -0,0 +1,166 @@
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+
+class ParticipantStats:
+    """
+    Fixed-memory time series of participant numbers kept in NumPy ring buffers of 'capacity' samples.
+
+    Every update is O(1): the rolling median is tracked with a histogram of the window and a pointer to the
+    median value, the window peak with a monotonic deque. The EWMA is weighted by the time between samples,
+    with the weight of old samples halved every 'halflife' seconds, so it doesn't depend on the poll rate.
+
+    A sample that differs from both the rolling median and the latest sample by more than 'outlier_ratio'
+    of them (and by at least 'min_deviation') is an outlier, e.g. an OCR glitch, and is held back.
+    Held back samples are accepted once 'confirmations' of them in a row agree with each other,
+    so a real change is only delayed, not ignored.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        *,
+        halflife: float,
+        outlier_ratio: float = 0.5,
+        confirmations: int = 3,
+        min_deviation: int = 2,
+    ) -> None:
+        if capacity < 1:
+            raise ValueError("'capacity' must be at least 1")
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._values = np.zeros(capacity, dtype=np.int64)
+        self._capacity = capacity
+        self._count = 0  # samples accepted since the start, the newest is at (_count - 1) % capacity
+        self._halflife = halflife
+        self._outlier_ratio = outlier_ratio
+        self._confirmations = confirmations
+        self._min_deviation = min_deviation
+
+        self._histogram = np.zeros(64, dtype=np.int64)
+        self._median = 0
+        self._below_median = 0  # samples of the window smaller than '_median'
+        self._peaks: deque[tuple[int, int]] = deque()  # (sample number, value), decreasing values
+        self._ewma: Optional[float] = None
+        self._pending: list[tuple[float, int]] = []
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return min(self._count, self._capacity)
+
+    @property
+    def latest(self) -> Optional[int]:
+        if not self._count:
+            return None
+        return int(self._values[(self._count - 1) % self._capacity])
+
+    @property
+    def median(self) -> Optional[int]:
+        """
+        Lower median of the window.
+        """
+        return self._median if self._count else None
+
+    @property
+    def ewma(self) -> Optional[float]:
+        return self._ewma
+
+    @property
+    def peak(self) -> Optional[int]:
+        return self._peaks[0][1] if self._peaks else None
+
+    def samples(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Timestamps and values of the window, oldest first.
+        """
+        if self._count <= self._capacity:
+            return self._times[: self._count].copy(), self._values[: self._count].copy()
+        start = self._count % self._capacity
+        return np.roll(self._times, -start), np.roll(self._values, -start)
+
+    def add(self, timestamp: float, value: int) -> bool:
+        """
+        Adds a sample taken at 'timestamp' seconds. Returns False if it's held back as an outlier.
+        """
+        if self._is_outlier(value):
+            if self._pending and self._is_far(value, self._pending[-1][1]):
+                self._pending.clear()
+            self._pending.append((timestamp, value))
+            if len(self._pending) < self._confirmations:
+                self.rejected += 1
+                return False
+            # the change is confirmed, so the held back samples were right
+            for pending_timestamp, pending_value in self._pending:
+                self._push(pending_timestamp, pending_value)
+            self._pending.clear()
+            return True
+
+        self._pending.clear()
+        self._push(timestamp, value)
+        return True
+
+    def _is_outlier(self, value: int) -> bool:
+        # after a confirmed change the median lags behind, but the latest sample doesn't
+        return (
+            self._count > 0
+            and self._is_far(value, self._median)
+            and self._is_far(value, self.latest)
+        )
+
+    def _is_far(self, value: int, reference: int) -> bool:
+        deviation = abs(value - reference)
+        return deviation >= self._min_deviation and deviation > self._outlier_ratio * reference
+
+    def _push(self, timestamp: float, value: int) -> None:
+        value = max(value, 0)
+        index = self._count % self._capacity
+        if self._count >= self._capacity:
+            self._remove_from_window(int(self._values[index]))
+        self._times[index] = timestamp
+        self._values[index] = value
+        self._count += 1
+        self._add_to_window(value)
+
+        while self._peaks and self._peaks[-1][1] <= value:
+            self._peaks.pop()
+        self._peaks.append((self._count, value))
+        while self._peaks[0][0] <= self._count - self._capacity:
+            self._peaks.popleft()
+
+        if self._ewma is None:
+            self._ewma = float(value)
+        else:
+            previous = self._times[(self._count - 2) % self._capacity]
+            elapsed = max(timestamp - previous, 0.0)
+            weight = 0.5 ** (elapsed / self._halflife)
+            self._ewma = weight * self._ewma + (1 - weight) * value
+
+    def _add_to_window(self, value: int) -> None:
+        if value >= len(self._histogram):
+            grown = np.zeros(max(value + 1, 2 * len(self._histogram)), dtype=np.int64)
+            grown[: len(self._histogram)] = self._histogram
+            self._histogram = grown
+        self._histogram[value] += 1
+        if self._count == 1:
+            self._median = value
+            self._below_median = 0
+            return
+        if value < self._median:
+            self._below_median += 1
+        self._move_median()
+
+    def _remove_from_window(self, value: int) -> None:
+        self._histogram[value] -= 1
+        if value < self._median:
+            self._below_median -= 1
+
+    def _move_median(self) -> None:
+        # the pointer moves by a single sample per update, skipping only values absent from the window
+        rank = (len(self) - 1) // 2
+        while rank < self._below_median:
+            self._median -= 1
+            self._below_median -= self._histogram[self._median]
+        while rank >= self._below_median + self._histogram[self._median]:
+            self._below_median += self._histogram[self._median]
+            self._median += 1
@@ -0,0 +1,51 @@
+import hashlib
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+import cv2
+
+T = TypeVar("T")
+
+
+def fingerprint(img: cv2.typing.MatLike) -> bytes:
+    """
+    Returns a short digest of the pixels of 'img', which is cheap to compute for the small text regions.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(img.shape).encode())
+    digest.update(img.tobytes())
+    return digest.digest()
+
+
+class RoiCache(Generic[T]):
+    """
+    Bounded LRU cache of results computed from image regions, keyed by the fingerprint of the region's pixels.
+    'hits' and 'misses' count lookups since the cache was created.
+    """
+
+    def __init__(self, max_size: int = 64) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, T] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[T]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: T) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
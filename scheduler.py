@@ -0,0 +1,115 @@
+import time
+from datetime import timedelta
+from typing import Any, Callable, Optional
+
+from disconnect_policy import parse_time
+
+
+class PollScheduler:
+    """
+    Decides when 'App' polls the screen next and whether the meeting clock has to be read by OCR.
+
+    After a clock read the meeting duration is extrapolated from the wall clock, and the clock is read again
+    only every 'clock_verify_interval' seconds to correct the drift.
+    Polling is faster near the 'min_time' and 'max_time' boundaries and while the participants number is falling.
+
+    'clock' and 'sleep' can be replaced, e.g. with a fake clock in tests.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float,
+        fast_interval: float,
+        boundary_margin: timedelta,
+        clock_verify_interval: float,
+        clock_drift_tolerance: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self._interval = interval
+        self._fast_interval = fast_interval
+        self._boundary_margin = boundary_margin
+        self._clock_verify_interval = clock_verify_interval
+        self._clock_drift_tolerance = clock_drift_tolerance
+        self._clock = clock
+        self._sleep = sleep
+        self._deadline = clock()
+        self._synced_duration: Optional[timedelta] = None
+        self._synced_at = 0.0
+
+    @classmethod
+    def from_settings(cls, settings: dict[str, Any], **kwargs) -> "PollScheduler":
+        return cls(
+            interval=settings["poll_interval"],
+            fast_interval=settings["fast_poll_interval"],
+            boundary_margin=parse_time(settings["boundary_margin"]),
+            clock_verify_interval=settings["clock_verify_interval"],
+            clock_drift_tolerance=settings["clock_drift_tolerance"],
+            **kwargs,
+        )
+
+    @property
+    def clock_synced(self) -> bool:
+        return self._synced_duration is not None
+
+    @property
+    def meeting_duration(self) -> Optional[timedelta]:
+        """
+        Meeting duration extrapolated from the last clock read, or None before the first one.
+        """
+        if self._synced_duration is None:
+            return None
+        return self._synced_duration + timedelta(
+            seconds=self._clock() - self._synced_at
+        )
+
+    def should_read_clock(self) -> bool:
+        if self._synced_duration is None:
+            return True
+        return self._clock() - self._synced_at >= self._clock_verify_interval
+
+    def sync_clock(self, duration: timedelta) -> bool:
+        """
+        Corrects the extrapolated duration with a clock read. Returns True if the drift exceeded the tolerance.
+        """
+        predicted = self.meeting_duration
+        self._synced_duration = duration
+        self._synced_at = self._clock()
+        if predicted is None:
+            return False
+        drift = abs((duration - predicted).total_seconds())
+        return drift > self._clock_drift_tolerance
+
+    def reset_clock(self) -> None:
+        self._synced_duration = None
+
+    def schedule(
+        self,
+        duration: Optional[timedelta],
+        min_time: timedelta,
+        max_time: timedelta,
+        participants_falling: bool = False,
+    ) -> float:
+        """
+        Sets the deadline of the next poll and returns the chosen interval.
+        """
+        interval = self._interval
+        if participants_falling:
+            interval = self._fast_interval
+        elif duration is not None and (
+            abs(duration - min_time) <= self._boundary_margin
+            or abs(max_time - duration) <= self._boundary_margin
+        ):
+            interval = self._fast_interval
+        self._deadline = self._clock() + interval
+        return interval
+
+    def schedule_retry(self) -> float:
+        self._deadline = self._clock() + self._fast_interval
+        return self._fast_interval
+
+    def wait(self) -> None:
+        remaining = self._deadline - self._clock()
+        if remaining > 0:
+            self._sleep(remaining)
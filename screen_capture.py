@@ -0,0 +1,251 @@
+import os
+from os import path as p
+from typing import Optional, Sequence
+
+import cv2
+import numpy as np
+
+from frame_buffers import FrameBufferPool
+from models import ElementArea
+
+
+class ScreenCapture:
+    """
+    Base class of the screen capture backends used by 'TeamsController'.
+
+    'grab' returns a BGR image of the whole screen when 'region' is None, otherwise only the pixels inside 'region'.
+    Regions are expressed in screenshot pixel coordinates, the same ones used by the element offsets.
+    Backends that don't capture the screen set 'live' to False, so no meeting window is required.
+
+    Grabbed frames may be taken from 'buffers'; a frame that is no longer used can be given back with 'release'.
+    """
+
+    live = True
+
+    def __init__(self, buffers: Optional[FrameBufferPool] = None) -> None:
+        self._size: Optional[tuple[int, int]] = None
+        self.buffers = buffers if buffers else FrameBufferPool()
+
+    @property
+    def size(self) -> Optional[tuple[int, int]]:
+        """
+        Width and height of the full frame, known after the first full-frame grab.
+        """
+        return self._size
+
+    def grab(self, region: Optional[ElementArea] = None) -> cv2.typing.MatLike:
+        if region is None or self._size is None:
+            frame = self._grab_full()
+            self._size = (frame.shape[1], frame.shape[0])
+            return frame
+        region = region.clipped_to(*self._size)
+        return self._grab_region(region)
+
+    def grab_again(self, region: Optional[ElementArea] = None) -> cv2.typing.MatLike:
+        """
+        Grabs 'region' of the frame grabbed last, for another look at it during the same analysis.
+        The screen can't be grabbed in the past, so it's grabbed anew unless the frames are served.
+        """
+        return self.grab(region)
+
+    def release(self, frame: cv2.typing.MatLike) -> None:
+        """
+        Reuses the buffer of 'frame' for later frames. Frames not taken from the pool are ignored.
+        """
+        self.buffers.release(frame)
+
+    def screen_point(self, x: float, y: float) -> tuple[float, float]:
+        """
+        Converts frame pixel coordinates to the screen points used by 'pyautogui'.
+        """
+        import pyautogui
+
+        ratio = pyautogui.size().width / self._size[0]
+        return x * ratio, y * ratio
+
+    def _grab_full(self) -> cv2.typing.MatLike:
+        raise NotImplementedError
+
+    def _grab_region(self, region: ElementArea) -> cv2.typing.MatLike:
+        raise NotImplementedError
+
+
+class PyAutoGUICapture(ScreenCapture):
+    """
+    Captures the live screen through 'pyautogui'.
+    Screenshot pixels may differ from screen points (e.g. on Retina displays), so regions are rescaled accordingly.
+    A region grabbed at a lower density than the full screenshot, i.e. in screen points, would have to be upscaled,
+    blurring the texts and icons; once that happens, regions are cropped from full screenshots instead.
+    Screenshots are converted to BGR directly into pooled buffers.
+    """
+
+    def __init__(self, buffers: Optional[FrameBufferPool] = None) -> None:
+        super().__init__(buffers)
+        self._crop_regions = False
+
+    def screen_point(self, x: float, y: float) -> tuple[float, float]:
+        left, top, width, _ = self._screen_box()
+        ratio = width / self._size[0]
+        return left + x * ratio, top + y * ratio
+
+    def _screen_box(self) -> tuple[int, int, int, int]:
+        """
+        Captured part of the screen as left, top, width and height in screen points.
+        """
+        import pyautogui
+
+        width, height = pyautogui.size()
+        return 0, 0, width, height
+
+    def _grab_full(self) -> cv2.typing.MatLike:
+        import pyautogui
+
+        return self._to_bgr(pyautogui.screenshot())
+
+    def _grab_region(self, region: ElementArea) -> cv2.typing.MatLike:
+        import pyautogui
+
+        if self._crop_regions:
+            return self._crop_full(region)
+        left, top = self.screen_point(region.x, region.y)
+        right, bottom = self.screen_point(region.x + region.w, region.y + region.h)
+        screenshot = pyautogui.screenshot(
+            region=(
+                round(left),
+                round(top),
+                max(round(right - left), 1),
+                max(round(bottom - top), 1),
+            )
+        )
+        # a pixel of rounding aside, the region has as many pixels as in the full screenshot
+        if screenshot.width < region.w - 1 or screenshot.height < region.h - 1:
+            screenshot.close()
+            self._crop_regions = True
+            return self._crop_full(region)
+        return self._to_bgr(screenshot, (region.w, region.h))
+
+    def _crop_full(self, region: ElementArea) -> cv2.typing.MatLike:
+        full = self._grab_full()
+        img = self.buffers.acquire((region.h, region.w, 3))
+        img[...] = full[region.y : region.y + region.h, region.x : region.x + region.w]
+        self.buffers.release(full)
+        return img
+
+    def _to_bgr(
+        self, screenshot, size: Optional[tuple[int, int]] = None
+    ) -> cv2.typing.MatLike:
+        """
+        Converts an RGB or RGBA PIL screenshot to a pooled BGR buffer, resized to 'size' if it differs.
+        """
+        channels = 4 if screenshot.mode == "RGBA" else 3
+        img = self.buffers.acquire((screenshot.height, screenshot.width, channels))
+        _read_pixels(screenshot, img)
+        screenshot.close()
+        if size is not None and (img.shape[1], img.shape[0]) != size:
+            resized = self.buffers.acquire((size[1], size[0], channels))
+            cv2.resize(img, size, dst=resized)
+            self.buffers.release(img)
+            img = resized
+        if channels == 3:
+            cv2.cvtColor(img, cv2.COLOR_RGB2BGR, dst=img)  # in place
+            return img
+        bgr = self.buffers.acquire((img.shape[0], img.shape[1], 3))
+        cv2.cvtColor(img, cv2.COLOR_RGBA2BGR, dst=bgr)
+        self.buffers.release(img)
+        return bgr
+
+
+class WindowCapture(PyAutoGUICapture):
+    """
+    Captures only the area of a single 'pywinctl' window, so every meeting window gets its own frames.
+    The area is grabbed from the screen, so a window covered by another one gives the pixels of the window on top.
+    """
+
+    def __init__(self, window) -> None:
+        super().__init__()
+        self._window = window
+
+    def _screen_box(self) -> tuple[int, int, int, int]:
+        left, top, width, height = self._window.box
+        return left, top, width, height
+
+    def _grab_full(self) -> cv2.typing.MatLike:
+        import pyautogui
+
+        return self._to_bgr(pyautogui.screenshot(region=self._screen_box()))
+
+
+class StreamCapture(ScreenCapture):
+    """
+    Serves the frame set with 'feed' instead of capturing the screen, e.g. frames decoded from a recording.
+    Regions are views of the fed frame, which therefore must not be modified while they are used.
+    """
+
+    live = False
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._current: Optional[cv2.typing.MatLike] = None
+
+    def feed(self, frame: cv2.typing.MatLike) -> None:
+        self._current = frame
+
+    def _grab_full(self) -> cv2.typing.MatLike:
+        return self._current
+
+    def _grab_region(self, region: ElementArea) -> cv2.typing.MatLike:
+        frame = self._current
+        if frame.shape[1] != self._size[0] or frame.shape[0] != self._size[1]:
+            raise ValueError("All frames must have the same size")
+        return frame[region.y : region.y + region.h, region.x : region.x + region.w]
+
+
+class OverridesCapture(StreamCapture):
+    """
+    Serves frames from memory in a loop instead of capturing the screen, which makes headless testing possible.
+    """
+
+    def __init__(self, frames: Sequence[cv2.typing.MatLike]) -> None:
+        super().__init__()
+        if not len(frames):
+            raise ValueError("At least one frame is required")
+        self._frames = frames
+        self._index = 0
+
+    @classmethod
+    def from_directory(cls, dir_path: str) -> "OverridesCapture":
+        frames = []
+        for file in sorted(os.listdir(dir_path)):
+            if file.endswith(".png"):
+                frames.append(cv2.imread(p.join(dir_path, file)))
+        return cls(frames)
+
+    def grab(self, region: Optional[ElementArea] = None) -> cv2.typing.MatLike:
+        if self._index >= len(self._frames):
+            self._index = 0
+            print("All screenshot overrides used, starting over")
+        self.feed(self._frames[self._index])
+        self._index += 1
+        return super().grab(region)
+
+    def grab_again(self, region: Optional[ElementArea] = None) -> cv2.typing.MatLike:
+        # the served frame isn't advanced, so every frame is analyzed once
+        return super().grab(region)
+
+
+def _read_pixels(image, buffer: np.ndarray) -> None:
+    """
+    Copies the pixels of a PIL 'image' into the contiguous 'buffer', a band of rows at a time.
+    'np.asarray' would first copy the whole image into a temporary bytes object, twice its size at peak.
+    """
+    rows = buffer.reshape(image.height, -1)
+    band = max(_READ_BAND_BYTES // rows.shape[1], 1)
+    for top in range(0, image.height, band):
+        bottom = min(top + band, image.height)
+        data = image.crop((0, top, image.width, bottom)).tobytes()
+        pixels = np.frombuffer(data, np.uint8).reshape(bottom - top, -1)
+        np.copyto(rows[top:bottom], pixels)
+
+
+# bytes of the screenshot rows copied at once by '_read_pixels'
+_READ_BAND_BYTES = 1 << 20
@@ -0,0 +1,103 @@
+import sys
+from multiprocessing import resource_tracker, shared_memory
+from typing import Hashable, NamedTuple
+
+import numpy as np
+
+
+class SharedArrayInfo(NamedTuple):
+    key: Hashable
+    shape: tuple[int, ...]
+    dtype: str
+    offset: int
+
+
+class SharedArraysManifest(NamedTuple):
+    """
+    Name of the shared memory block and the layout of the arrays in it, enough for another process to attach.
+    """
+
+    name: str
+    arrays: tuple[SharedArrayInfo, ...]
+
+
+class SharedArrays:
+    """
+    Named NumPy arrays packed into a single shared memory block, e.g. the template pyramids built once by
+    a supervisor and read by all of its sessions. Attached arrays are read-only views, nothing is copied.
+
+    The creating process owns the block and unlinks it; attached ones only close it.
+    """
+
+    def __init__(
+        self,
+        memory: shared_memory.SharedMemory,
+        manifest: SharedArraysManifest,
+        owner: bool,
+    ) -> None:
+        self._memory = memory
+        self.manifest = manifest
+        self._owner = owner
+        self.arrays: dict[Hashable, np.ndarray] = {}
+        for info in manifest.arrays:
+            array = np.ndarray(
+                info.shape, np.dtype(info.dtype), memory.buf, info.offset
+            )
+            array.flags.writeable = False
+            self.arrays[info.key] = array
+
+    @classmethod
+    def create(cls, arrays: dict[Hashable, np.ndarray]) -> "SharedArrays":
+        infos = []
+        size = 0
+        for key, array in arrays.items():
+            # every array starts aligned for any dtype
+            size = -(-size // _ALIGNMENT) * _ALIGNMENT
+            infos.append(SharedArrayInfo(key, array.shape, array.dtype.str, size))
+            size += array.nbytes
+        memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for info, array in zip(infos, arrays.values()):
+            np.ndarray(
+                info.shape, np.dtype(info.dtype), memory.buf, info.offset
+            )[...] = array
+        return cls(memory, SharedArraysManifest(memory.name, tuple(infos)), True)
+
+    @classmethod
+    def attach(cls, manifest: SharedArraysManifest) -> "SharedArrays":
+        return cls(attach_shared_memory(manifest.name), manifest, False)
+
+    def close(self) -> None:
+        """
+        Detaches the block, and unlinks it if this process created it.
+        The arrays, and any views of them handed out, must not be used afterwards.
+        """
+        self.arrays.clear()
+        try:
+            self._memory.close()
+        except BufferError:
+            # views of the arrays are still alive, the mapping is released with them
+            pass
+        if self._owner:
+            self._memory.unlink()
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Attaches the shared memory block 'name' created by another process, without registering it with the
+    resource tracker, which would otherwise report the block as leaked, or unlink it, when this process exits.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = _skip_registration
+    try:
+        return shared_memory.SharedMemory(name)
+    finally:
+        resource_tracker.register = register
+
+
+def _skip_registration(name: str, rtype: str) -> None:
+    pass
+
+
+_ALIGNMENT = 64
@@ -0,0 +1,90 @@
+import threading
+from typing import Optional
+
+_mixer_lock = threading.Lock()
+
+
+class BackgroundSound:
+    """
+    Sound decoded by 'pygame' in a background thread, so the app doesn't wait for it on startup.
+    'play' called before the sound is decoded starts it once it is, unless 'stop' is called first.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self._sound = None
+        self._error: Optional[Exception] = None
+        self._pending_play = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._load, name="sound_loader", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def loaded(self) -> bool:
+        return self._sound is not None
+
+    def wait_loaded(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits for the sound to be decoded. Raises the decoding error, if any.
+        """
+        self._thread.join(timeout)
+        if self._error is not None:
+            raise self._error
+        return self.loaded
+
+    def play(self) -> None:
+        with self._lock:
+            if self._sound is None:
+                self._pending_play = True
+            else:
+                self._sound.play()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._pending_play = False
+            if self._sound is not None:
+                self._sound.stop()
+
+    def _load(self) -> None:
+        try:
+            import pygame.mixer
+
+            with _mixer_lock:
+                if not pygame.mixer.get_init():
+                    pygame.mixer.init()
+            sound = pygame.mixer.Sound(self.file_path)
+        except Exception as e:
+            self._error = e
+            print(f"Sound {self.file_path} can't be loaded: {e}")
+            return
+        with self._lock:
+            self._sound = sound
+            if self._pending_play:
+                self._pending_play = False
+                sound.play()
+
+
+class SilentSound:
+    """
+    Stands in for 'BackgroundSound' where nobody listens, e.g. in the sessions of a fleet; nothing is decoded.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+
+    def play(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+def mixer_busy() -> bool:
+    """
+    Whether any sound is playing; False before the mixer is initialized by the first loaded sound.
+    """
+    import pygame.mixer
+
+    return bool(pygame.mixer.get_init()) and pygame.mixer.get_busy()
@@ -0,0 +1,54 @@
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from tracing import Tracer
+
+STAGES = ("calibration", "ocr")
+
+
+class StageLimits:
+    """
+    Caps how many sessions run a CPU-heavy stage at the same time. The semaphores may be shared between
+    processes, e.g. 'multiprocessing' ones given to every session of a fleet; stages without one aren't limited.
+    The time spent waiting for a stage is traced as a '<stage>_wait' span.
+    """
+
+    def __init__(
+        self, calibration: Optional[Any] = None, ocr: Optional[Any] = None
+    ) -> None:
+        self._semaphores = {"calibration": calibration, "ocr": ocr}
+
+    @classmethod
+    def create(
+        cls, limits: dict[str, int], context: Any = None
+    ) -> "StageLimits":
+        """
+        Limits with a semaphore of 'limits[stage]' slots for every stage, made by the 'multiprocessing' 'context'.
+        """
+        if context is None:
+            import multiprocessing
+
+            context = multiprocessing.get_context()
+        return cls(
+            **{
+                stage: context.BoundedSemaphore(limits[stage])
+                for stage in STAGES
+                if limits.get(stage)
+            }
+        )
+
+    @contextmanager
+    def stage(self, name: str, tracer: Tracer) -> Iterator[None]:
+        semaphore = self._semaphores[name]
+        if semaphore is None:
+            yield
+            return
+        with tracer.span(f"{name}_wait"):
+            semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+NO_LIMITS = StageLimits()
@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from os import path as p
+
+import numpy as np
+
+from config import load_config
+from constants import PROJECT_DIR_ABS_PATH
+from fake_obs_server import FakeOBSServer
+
+# imports and decodes everything up front, like the app did before the fast start
+_EAGER_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import cv2, numpy, pytesseract, pyautogui, pywinctl, obsws_python, pygame.mixer
+imported = time.perf_counter()
+from config import load_config
+config = load_config()
+pygame.mixer.init()
+pygame.mixer.Sound(config["settings"]["loading_sound_path"])
+pygame.mixer.Sound(config["settings"]["warning_sound_path"])
+decoded = time.perf_counter()
+print(json.dumps({
+    "imports_ms": (imported - start) * 1000,
+    "sounds_ms": (decoded - imported) * 1000,
+    "total_ms": (decoded - start) * 1000,
+}))
+"""
+
+# the meeting window check is skipped, so the benchmark runs without a meeting
+_FAST_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+from config import load_config
+config = dict(load_config())
+config["obs"] = {**config["obs"], "port": int(sys.argv[1])}
+application = app.App(config)
+created = time.perf_counter()
+application._start_recording()
+recording = time.perf_counter()
+application._warm_up.result()
+analysis_ready = time.perf_counter()
+application._loading_sound.wait_loaded()
+application._warning_sound.wait_loaded()
+sounds_ready = time.perf_counter()
+application.close()
+print(json.dumps({
+    "import_app_ms": (imported - start) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "time_to_record_ms": (recording - start) * 1000,
+    "analysis_ready_ms": (analysis_ready - start) * 1000,
+    "sounds_ready_ms": (sounds_ready - start) * 1000,
+}))
+"""
+
+
+def run_script(script: str, *args: str) -> dict[str, float]:
+    """
+    Runs 'script' in a fresh interpreter, so no module is imported yet, and returns its JSON output.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", script, *args],
+        cwd=PROJECT_DIR_ABS_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def median(runs: list[dict[str, float]]) -> dict[str, float]:
+    return {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Measures how long the app takes from its start to the start of the recording, "
+        "against a fake OBS, compared to importing and decoding everything up front."
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    os.chdir(PROJECT_DIR_ABS_PATH)  # config.json is read from the working directory
+
+    server = FakeOBSServer(password=load_config()["obs"]["password"])
+    port = server.start()
+    try:
+        eager = [run_script(_EAGER_SCRIPT) for _ in range(args.runs)]
+        fast = []
+        for _ in range(args.runs):
+            fast.append(run_script(_FAST_SCRIPT, str(port)))
+            server.recording = False
+    finally:
+        server.stop()
+
+    print(json.dumps({"eager": median(eager), "fast": median(fast)}, indent=4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import sys
+from os import path as p
+from typing import Any, Optional
+
+import numpy as np
+
+from benchmark import Sample, run_tick, summarize
+from constants import PROJECT_DIR_ABS_PATH
+from ocr_service import OCRService
+from screen_capture import StreamCapture
+from synthetic_frames import (
+    RESOLUTIONS,
+    FrameGenerator,
+    SyntheticFrame,
+    format_duration,
+    parse_duration,
+    random_spec,
+)
+from teams_controller import TeamsController
+from template_bank import TemplateBank
+from tracing import Tracer
+
+SCALES = (0.5, 0.75, 1.0, 1.25, 1.5)
+CHART_WIDTH = 40
+
+
+def check_elements(ctrl: TeamsController, frame: SyntheticFrame) -> Optional[str]:
+    """
+    Compares the elements found on calibration with the ground truth. Their centers may be off
+    by a fifth of their size, the scale steps of the search don't hit every UI scale exactly.
+    """
+    for name, (x, y, w, h) in frame.elements.items():
+        found = getattr(ctrl, f"_{name}")
+        if found is None:
+            return f"{name} not found"
+        tolerance = max(min(w, h) / 5, 2)
+        dx = found.x + found.w / 2 - (x + w / 2)
+        dy = found.y + found.h / 2 - (y + h / 2)
+        if abs(dx) > tolerance or abs(dy) > tolerance:
+            return f"{name} found {dx:+.0f}, {dy:+.0f} px off"
+    return None
+
+
+def run_config(
+    generator: FrameGenerator,
+    rng: np.random.Generator,
+    width: int,
+    height: int,
+    scale: float,
+    frames: int,
+    ticks: int,
+    template_bank: TemplateBank,
+    ocr_service: OCRService,
+) -> tuple[list[Sample], list[Sample], list[str]]:
+    """
+    Calibrates a new controller on every frame, then runs 'ticks' ticks with the clock advancing by a second.
+    """
+    calibration: list[Sample] = []
+    steady: list[Sample] = []
+    failures: list[str] = []
+    for i in range(frames):
+        spec = random_spec(rng, width, height, scale)
+        frame = generator.render(spec)
+        capture = StreamCapture()
+        tracer = Tracer()
+        ctrl = TeamsController(
+            capture=capture,
+            template_bank=template_bank,
+            ocr_service=ocr_service,
+            tracer=tracer,
+        )
+        for tick in range(ticks + 1):
+            if tick:
+                seconds = parse_duration(spec.meeting_duration) + tick
+                frame = generator.render(
+                    spec._replace(meeting_duration=format_duration(seconds))
+                )
+            capture.feed(frame.image)
+            sample = run_tick(ctrl, tracer, frame.label())
+            if tick == 0 and sample.failure is None:
+                sample.failure = check_elements(ctrl, frame)
+            (steady if tick else calibration).append(sample)
+            if sample.failure:
+                failures.append(f"frame {i} (tick {tick}): {sample.failure}")
+                break
+    return calibration, steady, failures
+
+
+def chart(rows: list[dict[str, Any]]) -> str:
+    """
+    Text chart of the median calibration time of every resolution and scale, with the accuracy.
+    """
+    longest = max((row["calibration_p50_ms"] for row in rows), default=0) or 1
+    lines = [
+        f"{'resolution':>10} {'MPx':>5} {'scale':>5} "
+        f"{'calib ms':>9} {'tick ms':>8} {'acc':>5}"
+    ]
+    for row in rows:
+        bar = "#" * round(row["calibration_p50_ms"] / longest * CHART_WIDTH)
+        lines.append(
+            f"{row['resolution']:>10} {row['megapixels']:>5.1f} {row['scale']:>5g} "
+            f"{row['calibration_p50_ms']:>9.0f} {row['steady_p50_ms']:>8.1f} "
+            f"{row['accuracy']:>5.2f} {bar}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Sweeps synthetic meeting frames of several resolutions and UI scales "
+        "through TeamsController, measuring latency and accuracy against the screen size."
+    )
+    parser.add_argument(
+        "--resolutions", nargs="*", default=list(RESOLUTIONS), choices=list(RESOLUTIONS)
+    )
+    parser.add_argument("--scales", nargs="*", type=float, default=list(SCALES))
+    parser.add_argument(
+        "--frames", type=int, default=3, help="frames per resolution and scale"
+    )
+    parser.add_argument(
+        "--ticks", type=int, default=3, help="ticks after the calibration of a frame"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="JSON file for the full results")
+    args = parser.parse_args()
+    output_path = p.abspath(args.output) if args.output else None
+    os.chdir(PROJECT_DIR_ABS_PATH)  # config.json is read from the working directory
+
+    rng = np.random.default_rng(args.seed)
+    generator = FrameGenerator()
+    template_bank = TemplateBank()
+    ocr_service = OCRService()
+    rows = []
+    results: dict[str, Any] = {}
+    for resolution in args.resolutions:
+        width, height = RESOLUTIONS[resolution]
+        for scale in args.scales:
+            calibration, steady, failures = run_config(
+                generator,
+                rng,
+                width,
+                height,
+                scale,
+                args.frames,
+                args.ticks,
+                template_bank,
+                ocr_service,
+            )
+            checked = len(calibration) + len(steady)
+            result = {
+                "accuracy": 1 - len(failures) / checked if checked else 0.0,
+                "failures": failures,
+                "calibration": summarize(calibration),
+                "steady": summarize(steady),
+            }
+            results[f"{resolution}@{scale:g}"] = result
+            rows.append(
+                {
+                    "resolution": resolution,
+                    "megapixels": width * height / 1e6,
+                    "scale": scale,
+                    "calibration_p50_ms": result["calibration"]["total_ms"].get(
+                        "p50", 0.0
+                    ),
+                    "steady_p50_ms": result["steady"]["total_ms"].get("p50", 0.0),
+                    "accuracy": result["accuracy"],
+                }
+            )
+            # progress, the chart of all rows is printed at the end
+            print(chart(rows[-1:]).splitlines()[-1], file=sys.stderr)
+    ocr_service.close()
+
+    print(chart(rows))
+    if output_path:
+        with open(output_path, "w") as json_file:
+            json.dump(results, json_file, indent=4)
+        print(f"Results saved to {output_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
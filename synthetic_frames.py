@@ -0,0 +1,427 @@
+import argparse
+import json
+import os
+import sys
+from os import path as p
+from typing import Any, NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+from constants import (
+    TEAMS_LEAVE_BUTTON_ABS_PATH,
+    TEAMS_PEOPLE_ICON_ABS_PATH,
+    TEAMS_SHIELD_ICON_ABS_PATH,
+    TEST_LABELS_FILE_NAME,
+)
+
+RESOLUTIONS = {
+    "768p": (1366, 768),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "1800p": (2880, 1800),
+    "4K": (3840, 2160),
+    "5K": (5120, 2880),
+}
+
+# dark theme colors, BGR
+BACKGROUND_COLOR = (31, 31, 31)
+BAR_COLOR = (41, 41, 41)
+MENU_BAR_COLOR = (52, 46, 44)
+TEXT_COLOR = (225, 225, 225)
+BADGE_COLOR = (45, 90, 205)
+TILE_COLOR = (222, 208, 230)
+
+# layout in pixels of the templates, which were cut from frames with 2 pixels per screen point;
+# the frame of a UI scale is laid out with these sizes multiplied by it
+MENU_BAR_HEIGHT = 50
+TITLE_BAR_HEIGHT = 56
+TOP_BAR_HEIGHT = 120
+MARGIN = 40
+CLOCK_GAP = 42
+CLOCK_HEIGHT = 20
+NUMBER_GAP = 8
+NUMBER_HEIGHT = 17
+BADGE_RADIUS = 13
+BADGE_OFFSET = 6
+ITEM_WIDTH = 112
+LABEL_HEIGHT = 14
+LEAVE_BUTTON_PADDING = 16
+LEAVE_BUTTON_DROPDOWN = 66
+
+# toolbar items from the right edge, the leave button comes last
+TOOLBAR_ITEMS = (
+    "Share",
+    "Mic",
+    "Camera",
+    "More",
+    "Apps",
+    "Rooms",
+    "View",
+    "React",
+    "Raise",
+    "People",
+    "Chat",
+)
+# items hidden first when the toolbar doesn't fit the window, like Teams moves them to 'More'
+HIDDEN_ITEMS_ORDER = (
+    "Apps",
+    "Rooms",
+    "View",
+    "React",
+    "Share",
+    "Camera",
+    "Chat",
+    "Raise",
+)
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+class FrameSpec(NamedTuple):
+    """
+    Parameters of a synthetic meeting frame. 'participants_number' is None when hands are raised,
+    'raised_hands' of them; 'noise' is the standard deviation of the gaussian noise added to the pixels
+    and 'jpeg_quality', if set, compresses the frame like a recording would.
+    """
+
+    width: int
+    height: int
+    scale: float
+    meeting_duration: str
+    participants_number: Optional[int]
+    raised_hands: int = 0
+    noise: float = 0.0
+    jpeg_quality: Optional[int] = None
+    seed: int = 0
+
+
+class SyntheticFrame(NamedTuple):
+    image: cv2.typing.MatLike
+    spec: FrameSpec
+    # (x, y, w, h) of the elements matched with templates
+    elements: dict[str, tuple[int, int, int, int]]
+
+    def label(self) -> dict[str, Any]:
+        """
+        Ground truth in the format of 'labels.json', extended with the element areas.
+        """
+        return {
+            "meeting_duration": self.spec.meeting_duration,
+            "participants_number": self.spec.participants_number,
+            "raised_hands": self.spec.raised_hands,
+            "resolution": [self.spec.width, self.spec.height],
+            "scale": self.spec.scale,
+            "elements": {name: list(area) for name, area in self.elements.items()},
+        }
+
+
+class FrameGenerator:
+    """
+    Renders maximized meeting windows of the dark theme with the real template PNGs pasted in the top bar.
+    Resized templates are cached per scale.
+    """
+
+    def __init__(self) -> None:
+        self._templates = {
+            "leave_button": cv2.imread(TEAMS_LEAVE_BUTTON_ABS_PATH),
+            "people_icon": cv2.imread(TEAMS_PEOPLE_ICON_ABS_PATH),
+            "shield_icon": cv2.imread(TEAMS_SHIELD_ICON_ABS_PATH),
+        }
+        self._scaled: dict[tuple[str, float], cv2.typing.MatLike] = {}
+
+    def render(self, spec: FrameSpec) -> SyntheticFrame:
+        s = spec.scale
+        img = np.empty((spec.height, spec.width, 3), dtype=np.uint8)
+        img[...] = BACKGROUND_COLOR
+        menu_bottom = _px(MENU_BAR_HEIGHT, s)
+        img[:menu_bottom] = MENU_BAR_COLOR
+        _put_text(
+            img,
+            "Microsoft Teams   Edit   View   Window   Help",
+            (_px(MARGIN, s), menu_bottom - _px(17, s)),
+            _px(LABEL_HEIGHT, s),
+            TEXT_COLOR,
+        )
+        bar_top = menu_bottom + _px(TITLE_BAR_HEIGHT, s)
+        bar_bottom = bar_top + _px(TOP_BAR_HEIGHT, s)
+        img[bar_top:bar_bottom] = BAR_COLOR
+        _put_text(
+            img,
+            "Meeting with Test Participants",
+            (spec.width // 2 - _px(170, s), bar_top - _px(20, s)),
+            _px(LABEL_HEIGHT, s),
+            (150, 150, 150),
+        )
+        center_y = bar_top + _px(TOP_BAR_HEIGHT / 2, s)
+        elements = {}
+
+        shield = self._template("shield_icon", s)
+        elements["shield_icon"] = self._paste(
+            img, shield, _px(MARGIN, s), center_y - shield.shape[0] // 2
+        )
+        clock_x = elements["shield_icon"][0] + shield.shape[1] + _px(CLOCK_GAP, s)
+        clock_height = _px(CLOCK_HEIGHT, s)
+        clock_right = _put_text(
+            img,
+            spec.meeting_duration,
+            (clock_x, center_y + clock_height // 2),
+            clock_height,
+            TEXT_COLOR,
+        )
+
+        # leave button with its dropdown, at the right edge
+        leave = self._template("leave_button", s)
+        button_w = leave.shape[1] + _px(
+            2 * LEAVE_BUTTON_PADDING + LEAVE_BUTTON_DROPDOWN, s
+        )
+        button_h = leave.shape[0] + _px(2 * LEAVE_BUTTON_PADDING, s)
+        button_x = spec.width - _px(MARGIN, s) - button_w
+        button_y = center_y - button_h // 2
+        button_color = tuple(int(c) for c in leave[0, 0])
+        cv2.rectangle(
+            img,
+            (button_x, button_y),
+            (button_x + button_w, button_y + button_h),
+            button_color,
+            cv2.FILLED,
+        )
+        elements["leave_button"] = self._paste(
+            img,
+            leave,
+            button_x + _px(LEAVE_BUTTON_PADDING, s),
+            center_y - leave.shape[0] // 2,
+        )
+
+        items = list(TOOLBAR_ITEMS)
+        item_w = _px(ITEM_WIDTH, s)
+        for hidden in HIDDEN_ITEMS_ORDER:
+            if button_x - len(items) * item_w > clock_right + _px(MARGIN, s):
+                break
+            items.remove(hidden)
+        icon_y = bar_top + _px(43, s)
+        label_y = bar_top + _px(100, s)
+        label_height = _px(LABEL_HEIGHT, s)
+        for i, item in enumerate(items):
+            item_x = button_x - _px(MARGIN, s) - (i + 1) * item_w
+            icon_center = (item_x + item_w // 2, icon_y)
+            label_x = icon_center[0] - _text_width(item, label_height) // 2
+            _put_text(img, item, (label_x, label_y), label_height, TEXT_COLOR)
+            if item != "People":
+                _draw_icon(img, item, icon_center, s)
+                continue
+            people = self._template("people_icon", s)
+            elements["people_icon"] = self._paste(
+                img,
+                people,
+                icon_center[0] - people.shape[1] // 2,
+                icon_y - people.shape[0] // 2,
+            )
+            x, y, w, _ = elements["people_icon"]
+            if spec.raised_hands:
+                # the badge covers the upper right corner of the icon and hides the participants number
+                radius = _px(BADGE_RADIUS, s)
+                badge = (x + w + _px(BADGE_OFFSET, s), y + radius)
+                cv2.circle(img, badge, radius, BADGE_COLOR, cv2.FILLED, cv2.LINE_AA)
+                text = str(spec.raised_hands)
+                height = _px(NUMBER_HEIGHT - 2, s)
+                origin = (
+                    badge[0] - _text_width(text, height, 2) // 2,
+                    badge[1] + height // 2,
+                )
+                _put_text(img, text, origin, height, (255, 255, 255), 2)
+            elif spec.participants_number is not None and spec.participants_number > 1:
+                # a single participant has no number
+                height = _px(NUMBER_HEIGHT, s)
+                _put_text(
+                    img,
+                    str(spec.participants_number),
+                    (x + w + _px(NUMBER_GAP, s), y + _px(14, s) + height),
+                    height,
+                    (255, 255, 255),
+                    2,
+                )
+
+        _draw_tiles(img, bar_bottom, s)
+        return SyntheticFrame(_degrade(img, spec), spec, elements)
+
+    def _template(self, name: str, scale: float) -> cv2.typing.MatLike:
+        key = (name, scale)
+        if key not in self._scaled:
+            template = self._templates[name]
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+            self._scaled[key] = cv2.resize(
+                template, None, fx=scale, fy=scale, interpolation=interpolation
+            )
+        return self._scaled[key]
+
+    @staticmethod
+    def _paste(
+        img: cv2.typing.MatLike, template: cv2.typing.MatLike, x: int, y: int
+    ) -> tuple[int, int, int, int]:
+        h, w = template.shape[:2]
+        img[y : y + h, x : x + w] = template
+        return x, y, w, h
+
+
+def random_spec(
+    rng: np.random.Generator,
+    width: int,
+    height: int,
+    scale: float,
+    *,
+    raised_hand_ratio: float = 0.2,
+    max_noise: float = 6.0,
+    jpeg_ratio: float = 0.3,
+) -> FrameSpec:
+    """
+    Random meeting state on a screen of the given size: clock, participants, raised hands and degradation.
+    """
+    seconds = int(rng.integers(0, 3 * 3600))
+    raised_hands = int(rng.integers(1, 4)) if rng.random() < raised_hand_ratio else 0
+    participants = (
+        None if raised_hands else int(rng.choice([1, 2, 5, 12, 37, 150, 299]))
+    )
+    return FrameSpec(
+        width=width,
+        height=height,
+        scale=scale,
+        meeting_duration=format_duration(seconds),
+        participants_number=participants,
+        raised_hands=raised_hands,
+        noise=float(rng.uniform(0, max_noise)),
+        jpeg_quality=int(rng.integers(60, 95)) if rng.random() < jpeg_ratio else None,
+        seed=int(rng.integers(0, 2**31)),
+    )
+
+
+def format_duration(seconds: int) -> str:
+    """
+    Meeting clock as Teams shows it, with hours only after the first hour.
+    """
+    hours, rest = divmod(seconds, 3600)
+    mins, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours:02d}:{mins:02d}:{secs:02d}"
+    return f"{mins:02d}:{secs:02d}"
+
+
+def parse_duration(text: str) -> int:
+    seconds = 0
+    for part in text.split(":"):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def _px(value: float, scale: float) -> int:
+    return max(int(round(value * scale)), 1)
+
+
+def _text_width(text: str, height: int, thickness: int = 1) -> int:
+    font_scale = cv2.getFontScaleFromHeight(FONT, height, thickness)
+    (width, _), _ = cv2.getTextSize(text, FONT, font_scale, thickness)
+    return width
+
+
+def _put_text(
+    img: cv2.typing.MatLike,
+    text: str,
+    origin: tuple[int, int],
+    height: int,
+    color: tuple[int, int, int],
+    thickness: int = 1,
+) -> int:
+    """
+    Draws 'text' with its baseline at 'origin' and digits 'height' pixels tall. Returns its right edge.
+    """
+    font_scale = cv2.getFontScaleFromHeight(FONT, height, thickness)
+    cv2.putText(img, text, origin, FONT, font_scale, color, thickness, cv2.LINE_AA)
+    (width, _), _ = cv2.getTextSize(text, FONT, font_scale, thickness)
+    return origin[0] + width
+
+
+def _draw_icon(
+    img: cv2.typing.MatLike, item: str, center: tuple[int, int], scale: float
+) -> None:
+    """
+    Outline of a toolbar icon, different enough from the templates not to be matched.
+    """
+    r = _px(17, scale)
+    x, y = center
+    if item in ("Chat", "React", "More"):
+        cv2.circle(img, center, r, TEXT_COLOR, 2, cv2.LINE_AA)
+    elif item in ("Camera", "View", "Apps"):
+        cv2.rectangle(img, (x - r, y - r // 2), (x + r, y + r // 2), TEXT_COLOR, 2)
+    else:
+        cv2.line(img, (x - r, y + r), (x, y - r), TEXT_COLOR, 2, cv2.LINE_AA)
+        cv2.line(img, (x, y - r), (x + r, y + r), TEXT_COLOR, 2, cv2.LINE_AA)
+
+
+def _draw_tiles(img: cv2.typing.MatLike, top: int, scale: float) -> None:
+    """
+    Participant tiles with initials under the top bar.
+    """
+    height, width = img.shape[:2]
+    radius = _px(120, scale)
+    center = (width // 2, top + (height - top) // 2)
+    if center[1] - radius <= top:
+        return
+    cv2.circle(img, center, radius, TILE_COLOR, cv2.FILLED, cv2.LINE_AA)
+    text_height = _px(70, scale)
+    origin = (
+        center[0] - _text_width("TP", text_height, 3) // 2,
+        center[1] + text_height // 2,
+    )
+    _put_text(img, "TP", origin, text_height, (80, 30, 80), 3)
+
+
+def _degrade(img: cv2.typing.MatLike, spec: FrameSpec) -> cv2.typing.MatLike:
+    if spec.noise > 0:
+        cv2.setRNGSeed(spec.seed)
+        noise = np.empty(img.shape, dtype=np.int16)
+        cv2.randn(noise, 0, spec.noise)
+        img = cv2.add(img, noise, dtype=cv2.CV_8U)
+    if spec.jpeg_quality is not None:
+        _, data = cv2.imencode(
+            ".jpg", img, (cv2.IMWRITE_JPEG_QUALITY, spec.jpeg_quality)
+        )
+        img = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    return img
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Renders synthetic meeting frames with ground truth into a directory "
+        "that 'benchmark.py' can replay."
+    )
+    parser.add_argument("dir", help="output directory")
+    parser.add_argument(
+        "--resolutions", nargs="*", default=list(RESOLUTIONS), choices=list(RESOLUTIONS)
+    )
+    parser.add_argument("--scales", nargs="*", type=float, default=[0.75, 1.0, 1.25])
+    parser.add_argument(
+        "--count", type=int, default=2, help="frames per resolution and scale"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    rng = np.random.default_rng(args.seed)
+    generator = FrameGenerator()
+    labels = {}
+    for resolution in args.resolutions:
+        width, height = RESOLUTIONS[resolution]
+        for scale in args.scales:
+            for i in range(args.count):
+                frame = generator.render(random_spec(rng, width, height, scale))
+                file = f"{resolution}-{scale:g}-{i}.png"
+                cv2.imwrite(p.join(args.dir, file), frame.image)
+                labels[file] = frame.label()
+    with open(p.join(args.dir, TEST_LABELS_FILE_NAME), "w") as json_file:
+        json.dump({"sequence": False, "frames": labels}, json_file, indent=4)
+    print(f"{len(labels)} frames saved to {args.dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
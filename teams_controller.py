@@ -1,50 +1,127 @@
-import pywinctl
-import pyautogui
 import re
-import pytesseract as tes
-import numpy as np
+import threading
 from datetime import timedelta, datetime
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 import cv2
-from models import ElementArea, MatchedElementArea, MatchedTextElementArea
+from calibration_cache import CalibrationCache, file_hash
+from config import load_config
+from derived_frame import DerivedFrame
+from detection_profile import DetectionProfile
+from digit_ocr import GlyphRecognizer
+from flight_recorder import Annotation, FlightRecorder, draw_annotations
+from exceptions import (
+    ElementNotFoundException,
+    ParticipantsNumberNotVisibleException,
+    WindowNotReadyException,
+)
+from meeting_windows import ensure_maximized, find_meeting_windows
+from models import (
+    ElementArea,
+    ElementAreas,
+    MatchedElementArea,
+    MatchedTextElementArea,
+)
+from ocr_service import OCRService
+from offset_tracker import OffsetTracker
+from roi_cache import RoiCache, fingerprint
+from screen_capture import (
+    OverridesCapture,
+    PyAutoGUICapture,
+    ScreenCapture,
+    WindowCapture,
+)
+from stage_limits import NO_LIMITS, StageLimits
+from template_bank import ScaleLock, TemplateBank, TemplateQuery, match_templates
+from tracing import NULL_TRACER, Tracer, traced
 import os
 from os import path as p
-import json
 from shutil import rmtree
 from constants import (
     TEAMS_LEAVE_BUTTON_ABS_PATH,
     TEAMS_PEOPLE_ICON_ABS_PATH,
     TEAMS_SHIELD_ICON_ABS_PATH,
     TEAMS_DEBUG_IMAGES_DIR_ABS_PATH,
+    MEETING_DURATION_GLYPHS_ABS_PATH,
+    PARTICIPANTS_NUMBER_GLYPHS_ABS_PATH,
 )
 
-
-class ElementNotFoundException(Exception):
-    pass
-
-
-class WindowNotReadyException(Exception):
-    pass
-
-
-class ParticipantsNumberNotVisibleException(Exception):
-    pass
+if TYPE_CHECKING:
+    import pywinctl
 
 
 class TeamsController:
 
-    def __init__(self, screenshot_overrides: tuple[cv2.typing.MatLike] = ()) -> None:
-        self._screenshot_overrides: tuple[cv2.typing.MatLike] = screenshot_overrides
-        self._screenshot_overrides_index = 0
+    def __init__(
+        self,
+        screenshot_overrides: tuple[cv2.typing.MatLike] = (),
+        template_bank: Optional[TemplateBank] = None,
+        capture: Optional[ScreenCapture] = None,
+        text_cache_size: int = 64,
+        ocr_service: Optional[OCRService] = None,
+        tracer: Optional[Tracer] = None,
+        calibration_cache: Optional[CalibrationCache] = None,
+        window: Optional["pywinctl.Window"] = None,
+        config: Optional[dict] = None,
+        coarse_to_fine: bool = True,
+        top_bar_prior: bool = True,
+        flight_recorder: Optional[FlightRecorder] = None,
+        track_offsets: bool = True,
+        stage_limits: Optional[StageLimits] = None,
+    ) -> None:
+        if capture is None:
+            if len(screenshot_overrides):
+                capture = OverridesCapture(screenshot_overrides)
+            elif window is not None:
+                capture = WindowCapture(window)
+            else:
+                capture = PyAutoGUICapture()
+        self._capture = capture
+        if tracer:
+            self._capture.buffers.tracer = tracer
+        # analyzed screenshots are handed to the recorder instead of back to the buffer pool
+        self._flight_recorder = flight_recorder
+        if flight_recorder:
+            flight_recorder.buffers = self._capture.buffers
+        # the screenshot is replaced by the analysis while the debug image may be drawn from another thread
+        self._screenshot_lock = threading.RLock()
         self._screenshot: Optional[cv2.typing.MatLike] = None
-        self._leave_button_templ = cv2.imread(TEAMS_LEAVE_BUTTON_ABS_PATH)
-        self._shield_icon_templ = cv2.imread(TEAMS_SHIELD_ICON_ABS_PATH)
-        self._people_icon_templ = cv2.imread(TEAMS_PEOPLE_ICON_ABS_PATH)
+        self._screenshot_time = datetime.now()
+        # top-left corner of the captured region in full frame coordinates
+        self._screenshot_origin: tuple[int, int] = (0, 0)
+        self._frame: Optional[DerivedFrame] = None
+        self._template_bank = template_bank if template_bank else TemplateBank()
+        self._scale_lock = ScaleLock()
+        # calibration searches the full frame on a downsampled copy first, starting with the top bar
+        self._coarse_to_fine = coarse_to_fine
+        self._top_bar_prior = top_bar_prior
+        # offsets follow the elements when they move, instead of failing until a recalibration
+        self._tracking = track_offsets
+        self._tracker = OffsetTracker()
+        self._offsets_tracked = False  # moved offsets, not confirmed by matching the elements yet
+        self._text_cache: RoiCache[list[MatchedTextElementArea]] = RoiCache(
+            text_cache_size
+        )
+        self._ocr_service = ocr_service if ocr_service else OCRService()
+        self._tracer = tracer if tracer else NULL_TRACER
+        # sessions sharing the host take turns in the full sweeps and tesseract calls
+        self._stage_limits = stage_limits if stage_limits else NO_LIMITS
+        self._calibration_cache = calibration_cache
+        self._calibration_restore_tried = False
+        self._calibration_restored = False
+        self._calibration_saved = False
+        self._meeting_duration_glyphs = _load_glyphs(
+            MEETING_DURATION_GLYPHS_ABS_PATH, MEETING_DURATION_PATTERN
+        )
+        self._participants_number_glyphs = _load_glyphs(
+            PARTICIPANTS_NUMBER_GLYPHS_ABS_PATH, PARTICIPANTS_NUMBER_PATTERN
+        )
         self._leave_button_offset: Optional[ElementArea] = None
         self._shield_icon_offset: Optional[ElementArea] = None
         self._people_icon_offset: Optional[ElementArea] = None
         self._meeting_duration_text_offset: Optional[ElementArea] = None
         self._participants_number_text_offset: Optional[ElementArea] = None
+        # capture region of the last analysis, read by 'capture_frame' from the capture thread
+        self._published_region: Optional[ElementArea] = None
         self._leave_button: Optional[MatchedElementArea] = None
         self._shield_icon: Optional[MatchedElementArea] = None
         self._people_icon: Optional[MatchedElementArea] = None
@@ -53,16 +130,20 @@ class TeamsController:
         self._meeting_duration: timedelta
         self._participants_number: int
 
-        with open("config.json", "r") as json_file:
-            config = json.load(json_file)
+        config = config if config else load_config()
         self._teams_excluded_names = config["teams"]["excluded_names"]
+        self._detection = DetectionProfile.from_settings(config["detection"])
 
         self._teams_windows = []
 
-        windows = pywinctl.getAllWindows()
-        for window in windows:
-            if self._is_meeting_window(window.title):
-                self._teams_windows.append(window)
+        # replayed screenshots don't need a live meeting window
+        if not self._capture.live:
+            return
+
+        if window is not None:
+            self._teams_windows.append(window)
+        else:
+            self._teams_windows = find_meeting_windows(self._teams_excluded_names)
 
         if not self._teams_windows:
             raise WindowNotReadyException("There are no meeting windows opened")
@@ -79,6 +160,17 @@ class TeamsController:
             self.extract_data()
         return self._participants_number
 
+    @property
+    def meeting_duration_text(self) -> Optional[MatchedTextElementArea]:
+        """
+        Meeting duration text read last, with its box in full frame coordinates.
+        """
+        return self._meeting_duration_text
+
+    @property
+    def participants_number_text(self) -> Optional[MatchedTextElementArea]:
+        return self._participants_number_text
+
     @property
     def offsets_loaded(self) -> bool:
         return (
@@ -90,27 +182,62 @@ class TeamsController:
         )
 
     def click_leave_button(self, duration: float = 0.5):
-        if not len(self._screenshot_overrides):
+        if self._capture.live:
             self.ensure_meeting_window_is_ready()
 
         self._take_screenshot()
 
-        matches = self._find_elements_areas(
-            self._leave_button_templ,
-            area=self._leave_button_offset,
+        found = self._find_elements_areas(
+            {
+                TEAMS_LEAVE_BUTTON_ABS_PATH: (
+                    self._leave_button_offset,
+                    self._detection.match_threshold,
+                )
+            }
         )
-        if not len(matches):
+        if not len(found[TEAMS_LEAVE_BUTTON_ABS_PATH]):
             raise ElementNotFoundException("Leave button not found")
 
-        ratio = pyautogui.size().width / self._screenshot.shape[1]
-        pyautogui.click(
-            self._leave_button.x * ratio,
-            self._leave_button.y * ratio,
-            duration=duration,
+        import pyautogui
+
+        x, y = self._capture.screen_point(self._leave_button.x, self._leave_button.y)
+        pyautogui.click(x, y, duration=duration)
+
+    @traced("extract_data")
+    def extract_data(
+        self,
+        read_duration: bool = True,
+        frame: Optional[tuple[cv2.typing.MatLike, tuple[int, int]]] = None,
+    ):
+        """
+        Analyzes 'frame', as returned by 'capture_frame', or a new screenshot if it's None.
+        """
+        read_duration = read_duration or not self._meeting_duration_text
+        # frames captured before the offsets were moved can't confirm them
+        verifying = self._offsets_tracked and (
+            frame is None or self._covers_capture_region(*frame)
+        )
+        try:
+            self._extract_elements(read_duration, frame)
+        except ParticipantsNumberNotVisibleException:
+            # the meeting duration is read before the raised hand is noticed
+            if read_duration:
+                self._parse_meeting_duration()
+            raise
+        except ElementNotFoundException:
+            if verifying:
+                self._lose_tracking()
+            raise
+        finally:
+            self._published_region = self._capture_region()
+        if read_duration:
+            self._parse_meeting_duration()
+
+        self._participants_number = int(
+            "".join(c for c in self._participants_number_text.text if c.isdigit())
         )
 
-    def extract_data(self):
-        self._extract_elements()
+    def _parse_meeting_duration(self):
         duration_split = tuple(map(int, self._meeting_duration_text.text.split(":")))
         if len(duration_split) == 2:
             mins, secs = duration_split
@@ -120,50 +247,49 @@ class TeamsController:
             meeting_duration = timedelta(hours=hours, minutes=mins, seconds=secs)
         self._meeting_duration = meeting_duration
 
-        self._participants_number = int(
-            "".join(c for c in self._participants_number_text.text if c.isdigit())
-        )
-
     def clear_offsets(self):
         self._leave_button_offset = None
         self._shield_icon_offset = None
         self._people_icon_offset = None
         self._meeting_duration_text_offset = None
         self._participants_number_text_offset = None
+        self._scale_lock.release()
+        self._calibration_saved = False
+        self._tracker.clear()
+        self._offsets_tracked = False
+        self._published_region = None
 
     def clear_debug_images(self):
-        rmtree(TEAMS_DEBUG_IMAGES_DIR_ABS_PATH, ignore_errors=True)
-
-    def show_debug_image(self, headless: bool = False):
-        if self._screenshot is None:
-            print("No screenshot to show")
+        """
+        Removes the debug images, or only the oldest ones over the disk quota of the flight recorder.
+        """
+        if self._flight_recorder:
+            self._flight_recorder.enforce_quota()
             return
-        debug_image = self._screenshot.copy()
+        rmtree(TEAMS_DEBUG_IMAGES_DIR_ABS_PATH, ignore_errors=True)
 
-        def draw_rect(
-            match: Optional[ElementArea], color: tuple[int, int, int] = (0, 255, 0)
-        ):
-            if not match:
+    def show_debug_image(self, headless: bool = False, reason: str = ""):
+        """
+        Shows the last screenshot with the elements found. With 'headless', it's saved instead;
+        by the flight recorder together with the previous frames, if there is one.
+        """
+        with self._screenshot_lock:
+            if self._screenshot is None:
+                print("No screenshot to show")
                 return
-            cv2.rectangle(
-                debug_image,
-                (match.x, match.y),
-                (match.x + match.w, match.y + match.h),
-                color,
-            )
-
-        draw_rect(self._leave_button)
-        draw_rect(self._people_icon)
-        draw_rect(self._shield_icon)
-        draw_rect(self._meeting_duration_text)
-        draw_rect(self._participants_number_text)
-
-        cyan = (255, 255, 0)  # BGR
-        draw_rect(self._leave_button_offset, cyan)
-        draw_rect(self._people_icon_offset, cyan)
-        draw_rect(self._shield_icon_offset, cyan)
-        draw_rect(self._meeting_duration_text_offset, cyan)
-        draw_rect(self._participants_number_text_offset, cyan)
+            if headless and self._flight_recorder:
+                self._flight_recorder.incident(
+                    self._screenshot,
+                    self._screenshot_origin,
+                    self._debug_annotations(),
+                    reason,
+                )
+                return
+            # copied while the screenshot can't be released, its buffer may be reused right after
+            debug_image = self._capture.buffers.acquire(self._screenshot.shape)
+            debug_image[...] = self._screenshot
+            annotations = self._debug_annotations()
+        draw_annotations(debug_image, annotations)
 
         if not hasattr(cv2, "imshow") or not hasattr(cv2, "waitKey"):
             print("cv2.imshow and cv2.waitKey not available, saving image instead")
@@ -176,66 +302,112 @@ class TeamsController:
             file = f"{timestamp}.jpg"
             os.makedirs(TEAMS_DEBUG_IMAGES_DIR_ABS_PATH, exist_ok=True)
             cv2.imwrite(p.join(TEAMS_DEBUG_IMAGES_DIR_ABS_PATH, file), debug_image)
+        self._capture.buffers.release(debug_image)
+
+    def _debug_annotations(self) -> tuple[Annotation, ...]:
+        origin_x, origin_y = self._screenshot_origin
+        green = (0, 255, 0)
+        cyan = (255, 255, 0)  # BGR
+        areas = (
+            (self._leave_button, green),
+            (self._people_icon, green),
+            (self._shield_icon, green),
+            (self._meeting_duration_text, green),
+            (self._participants_number_text, green),
+            (self._leave_button_offset, cyan),
+            (self._people_icon_offset, cyan),
+            (self._shield_icon_offset, cyan),
+            (self._meeting_duration_text_offset, cyan),
+            (self._participants_number_text_offset, cyan),
+        )
+        return tuple(
+            Annotation(area.x - origin_x, area.y - origin_y, area.w, area.h, color)
+            for area, color in areas
+            if area
+        )
 
     def ensure_meeting_window_is_ready(self):
-        for window in self._teams_windows:
-            if window.isMaximized:
-                return
-        raise WindowNotReadyException("Teams window is not on full screen")
+        ensure_maximized(self._teams_windows)
 
     def close_meeting_window(self):
         for window in self._teams_windows:
             window.close(True)
 
-    def _is_meeting_window(self, title: str) -> bool:
-        if not title.endswith(" | Microsoft Teams"):
-            return False
-        for name in self._teams_excluded_names:
-            if title.startswith(name + " | "):
-                return False
-        return True
-
-    def _extract_elements(self):
-        if not self._screenshot_overrides:
+    def _extract_elements(
+        self,
+        read_duration: bool = True,
+        frame: Optional[tuple[cv2.typing.MatLike, tuple[int, int]]] = None,
+        again: bool = False,
+    ):
+        if self._capture.live:
             self.ensure_meeting_window_is_ready()
 
-        self._take_screenshot()
+        if frame is None:
+            self._take_screenshot(again)
+        else:
+            if frame[1] != (0, 0) and self._capture_region() is None:
+                raise ElementNotFoundException(
+                    "Frame captured before offsets were cleared can't be used for calibration"
+                )
+            if self._offsets_tracked and not self._covers_capture_region(*frame):
+                raise ElementNotFoundException(
+                    "Frame captured before offsets were moved can't be used"
+                )
+            self._set_screenshot(*frame)
+        if self._calibration_cache and not self._calibration_restore_tried:
+            self._restore_calibration()
 
-        matches = self._find_elements_areas(
-            self._leave_button_templ,
-            area=self._leave_button_offset,
-        )
+        # all elements needed on this tick are matched in a single pass over the frame
+        found = self._find_elements_areas(self._element_searches())
+        # only the tick restoring the calibration validates it, later misses are moves of the elements
+        restoring, self._calibration_restored = self._calibration_restored, False
+        if not len(found[TEAMS_LEAVE_BUTTON_ABS_PATH]) and restoring:
+            # the saved calibration doesn't fit the screen, the screenshot is still a full frame
+            self._tracer.count("calibration_cache_invalid")
+            self.clear_offsets()
+            found = self._find_elements_areas(self._element_searches())
+        matches = found[TEAMS_LEAVE_BUTTON_ABS_PATH]
         if not len(matches):
+            if self._track_offsets():
+                if frame is not None:
+                    raise ElementNotFoundException(
+                        "Leave button moved, it's looked for on the next frame"
+                    )
+                try:
+                    # the elements are matched at their new offsets on the frame grabbed again
+                    return self._extract_elements(read_duration, again=True)
+                except ElementNotFoundException:
+                    self._lose_tracking()
+                    raise
             raise ElementNotFoundException("Leave button not found")
         # upper most element
         self._leave_button = min(matches, key=lambda match: match.y)
+        if not self._scale_lock.locked:
+            self._scale_lock.lock(self._leave_button.scale)
         if not self._leave_button_offset:
             self._leave_button_offset = self._leave_button.multiplied_by(1.5)
 
-        # offset is known, so it's unnecessary
-        if not self._meeting_duration_text_offset:
-            matches = self._find_elements_areas(
-                self._shield_icon_templ,
-                area=self._shield_icon_offset,
-            )
+        # offsets moved by the tracker are derived again from the icons found in them
+        tracked = self._offsets_tracked
+        if not self._meeting_duration_text_offset or tracked:
+            matches = found[TEAMS_SHIELD_ICON_ABS_PATH]
             if not len(matches):
                 raise ElementNotFoundException("Shield icon not found")
             self._shield_icon = min(matches, key=lambda match: match.y)
-            if not self._shield_icon_offset:
+            if not self._shield_icon_offset or tracked:
                 self._shield_icon_offset = self._shield_icon.multiplied_by(1.5)
 
-        if not self._participants_number_text_offset:
-            matches = self._find_elements_areas(
-                self._people_icon_templ, area=self._people_icon_offset, threshold=0.7
-            )
+        if not self._participants_number_text_offset or tracked:
+            matches = found[TEAMS_PEOPLE_ICON_ABS_PATH]
             if not len(matches):
                 raise ElementNotFoundException("People icon not found")
             self._people_icon = min(matches, key=lambda match: match.y)
-            if not self._people_icon_offset:
+            if not self._people_icon_offset or tracked:
                 self._people_icon_offset = self._people_icon.multiplied_by(1.5)
+        self._offsets_tracked = False
 
         # text elements
-        if not self._meeting_duration_text_offset:
+        if not self._meeting_duration_text_offset or tracked:
             self._meeting_duration_text_offset = ElementArea(
                 x=self._shield_icon.x
                 + self._shield_icon.w
@@ -244,45 +416,50 @@ class TeamsController:
                 w=150 * self._shield_icon.scale,
                 h=self._shield_icon.h * self._shield_icon.scale,
             )
-        matches = self._find_text(area=self._meeting_duration_text_offset)
-        l = len(matches)
-        if not l:
-            raise ElementNotFoundException("Meeting duration text not found")
-        duration_regex = re.compile(r"(\d{2}:)?\d{2}:\d{2}")
-        regex_match = None
-        for i in range(l):
-            if duration_regex.match(matches[i].text):
-                regex_match = matches[i]
-                break
-        if not regex_match:
-            raise ElementNotFoundException("Meeting duration has invalid format")
-        self._meeting_duration_text = regex_match
-
-        if is_there_red(
-            self._screenshot[
-                self._people_icon_offset.y : self._people_icon_offset.y
-                + self._people_icon_offset.h,
-                self._people_icon_offset.x : self._people_icon_offset.x
-                + self._people_icon_offset.w,
-            ]
-        ):
+
+        with self._tracer.span("red_check"):
+            red = _is_there_red_hsv(self._frame.hsv(self._people_icon_offset))
+        if not red and (not self._participants_number_text_offset or tracked):
+            self._participants_number_text_offset = ElementArea(
+                x=self._people_icon.x + self._people_icon.w + 3 * self._people_icon.scale,
+                y=self._people_icon.y,
+                w=50 * self._people_icon.scale,
+                h=self._people_icon.h * self._people_icon.scale,
+            )
+
+        # all text regions of the tick are recognized at once
+        text_fields = []
+        if read_duration:
+            text_fields.append(
+                (self._meeting_duration_text_offset, self._meeting_duration_glyphs)
+            )
+        if not red:
+            text_fields.append(
+                (self._participants_number_text_offset, self._participants_number_glyphs)
+            )
+        texts_matches = self._find_texts(text_fields)
+
+        if read_duration:
+            matches = texts_matches.pop(0)
+            l = len(matches)
+            if not l:
+                raise ElementNotFoundException("Meeting duration text not found")
+            duration_regex = re.compile(MEETING_DURATION_PATTERN)
+            regex_match = None
+            for i in range(l):
+                if duration_regex.match(matches[i].text):
+                    regex_match = matches[i]
+                    break
+            if not regex_match:
+                raise ElementNotFoundException("Meeting duration has invalid format")
+            self._meeting_duration_text = regex_match
+
+        if red:
             raise ParticipantsNumberNotVisibleException(
                 "Hand is raised by a participant"
             )
         else:
-            if not self._participants_number_text_offset:
-                self._participants_number_text_offset = ElementArea(
-                    x=self._people_icon.x
-                    + self._people_icon.w
-                    + 3 * self._people_icon.scale,
-                    y=self._people_icon.y,
-                    w=50 * self._people_icon.scale,
-                    h=self._people_icon.h * self._people_icon.scale,
-                )
-            matches = self._find_text(
-                area=self._participants_number_text_offset,
-                config=r"--oem 3 --psm 6 digits",
-            )
+            matches = texts_matches.pop(0)
             l = len(matches)
             if not l:
                 raise ElementNotFoundException("Participants number text not found")
@@ -295,102 +472,536 @@ class TeamsController:
             if not regex_match:
                 regex_match = matches[0]
                 if not regex_match.text.strip():
-                    regex_match.text = "1"  # no number means 1 participant
+                    regex_match = regex_match.replaced(text="1")  # no number means 1 participant
                 else:
                     raise ElementNotFoundException(
                         "Participants number has invalid format"
                     )
             self._participants_number_text = regex_match
 
-    def _take_screenshot(self):
-        if len(self._screenshot_overrides):
-            if self._screenshot_overrides_index >= len(self._screenshot_overrides):
-                self._screenshot_overrides_index = 0
-                print("All screenshot overrides used, starting over")
-            screenshot = self._screenshot_overrides[self._screenshot_overrides_index]
-            self._screenshot_overrides_index += 1
+        if self._calibration_cache and not self._calibration_saved:
+            self._save_calibration()
+        if self._tracking:
+            self._update_tracking_reference()
+
+    def _update_tracking_reference(self):
+        """
+        Keeps the band around the offsets as the tracker reference once they're found or moved. The reference
+        isn't refreshed on other ticks, the offsets and the elements in it stay where they were found together.
+        """
+        band = self._tracking_band()
+        if band is None or band == self._tracker.area:
+            return
+        if _covers(self._screenshot, self._screenshot_origin, band):
+            gray = self._frame.gray(band)
+        else:
+            # the band is higher than the capture region, it's grabbed once after the offsets moved
+            gray = self._grab_gray(band)
+        self._tracker.update(gray, band, self._window_box())
+
+    def _track_offsets(self) -> bool:
+        """
+        Moves the offsets after the elements once the leave button isn't in its offset, e.g. when the window moved.
+        Returns False if the elements didn't move, the leave button is only hidden then,
+        or if they can't be followed, in which case the offsets are cleared and the next tick calibrates.
+        """
+        if (
+            not self._tracking
+            or self._offsets_tracked
+            or not self._leave_button_offset
+            or not self._tracker.ready
+        ):
+            return False
+        with self._tracer.span("track_offsets"):
+            shifts = self._estimate_shifts()
+        if shifts is None:
+            self._lose_tracking()
+            return False
+        if all(shift == (0, 0) for shift in shifts.values()):
+            return False
+        try:
+            for group, (dx, dy) in shifts.items():
+                for name in _TRACKED_OFFSETS[group]:
+                    area = getattr(self, f"_{name}")
+                    if area:
+                        moved = area.replaced(x=area.x + dx, y=area.y + dy)
+                        setattr(self, f"_{name}", moved)
+        except ValueError:
+            # moved out of the screen
+            self._lose_tracking()
+            return False
+        self._tracer.count("offsets_tracked")
+        self._offsets_tracked = True
+        self._calibration_saved = False
+        return True
+
+    def _estimate_shifts(self) -> Optional[dict[str, tuple[int, int]]]:
+        """
+        Shifts of the tracked groups of offsets, predicted from the window geometry and refined by the tracker.
+        """
+        if self._capture.size is None:
+            return None
+        groups = {}
+        for group, names in _TRACKED_OFFSETS.items():
+            offsets = [getattr(self, f"_{name}") for name in names]
+            offsets = [offset for offset in offsets if offset]
+            if offsets:
+                groups[group] = ElementAreas.of(offsets).union()
+        priors, dy = self._window_shifts(groups)
+        try:
+            area = self._tracker.area.replaced(y=self._tracker.area.y + dy)
+        except ValueError:
+            return None
+        if area.clipped_to(*self._capture.size) != area:
+            return None
+
+        if _covers(self._screenshot, self._screenshot_origin, area):
+            gray = self._frame.gray(area)
         else:
-            screenshot = pyautogui.screenshot()  # RGB PIL image
-            screenshot = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-        self._screenshot = screenshot
+            gray = self._grab_gray(area)
+        shifts = self._tracker.track(gray, groups, priors)
+        if shifts is None:
+            return None
+        return {group: (sx, sy + dy) for group, (sx, sy) in shifts.items()}
+
+    def _window_shifts(
+        self, groups: dict[str, ElementArea]
+    ) -> tuple[dict[str, int], int]:
+        """
+        Horizontal moves of 'groups' and the vertical move of the top bar since the tracker reference was taken,
+        in frame pixels, predicted from the meeting window box. Groups closer to the left edge of the window
+        follow it, the others follow the right edge, as the toolbar does when the window is resized.
+        """
+        box = self._window_box()
+        reference = self._tracker.window_box
+        if box is None or reference is None:
+            return {}, 0
+        # window boxes are in screen points
+        origin_x, _ = self._capture.screen_point(0, 0)
+        unit_x, _ = self._capture.screen_point(1, 0)
+        points_per_pixel = unit_x - origin_x
+        left = box[0] - reference[0]
+        right = left + box[2] - reference[2]
+        top = box[1] - reference[1]
+        window_x = reference[0] - origin_x
+        # frames of a window capture move with the window
+        if isinstance(self._capture, WindowCapture):
+            left, right, top, window_x = 0, right - left, 0, 0
+        middle = (window_x + reference[2] / 2) / points_per_pixel
+        priors = {
+            group: round(
+                (left if area.x + area.w / 2 < middle else right) / points_per_pixel
+            )
+            for group, area in groups.items()
+        }
+        return priors, round(top / points_per_pixel)
+
+    def _tracking_band(self) -> Optional[ElementArea]:
+        """
+        Capture region extended by its height up and down, so vertical moves of the top bar can be followed too.
+        """
+        region = self._capture_region()
+        if region is None:
+            return None
+        return region.multiplied_by((1, 3)).clipped_to(*self._capture.size)
 
+    def _grab_gray(self, area: ElementArea) -> cv2.typing.MatLike:
+        # the band is taken from the frame being analyzed
+        screenshot = self._capture.grab_again(area)
+        gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
+        self._capture.release(screenshot)
+        return gray
+
+    def _covers_capture_region(
+        self, screenshot: cv2.typing.MatLike, origin: tuple[int, int]
+    ) -> bool:
+        region = self._capture_region()
+        return region is not None and _covers(screenshot, origin, region)
+
+    def _window_box(self) -> Optional[tuple[int, int, int, int]]:
+        if not self._capture.live:
+            return None
+        for window in self._teams_windows:
+            if window.isMaximized:
+                return tuple(window.box)
+        return None
+
+    def _lose_tracking(self):
+        self._tracer.count("tracking_lost")
+        self.clear_offsets()
+
+    def _calibration_key(self) -> dict:
+        key = {
+            "resolution": list(self._capture.size),
+            "dpi_scale": None,
+            "window": None,
+            "templates": {
+                p.basename(path): file_hash(path)
+                for path in (
+                    TEAMS_LEAVE_BUTTON_ABS_PATH,
+                    TEAMS_SHIELD_ICON_ABS_PATH,
+                    TEAMS_PEOPLE_ICON_ABS_PATH,
+                )
+            },
+        }
+        if self._capture.live:
+            # screen points per screenshot pixel
+            left, _ = self._capture.screen_point(0, 0)
+            right, _ = self._capture.screen_point(self._capture.size[0], 0)
+            key["dpi_scale"] = round((right - left) / self._capture.size[0], 3)
+            window_box = self._window_box()
+            key["window"] = list(window_box) if window_box else None
+        return key
+
+    def _restore_calibration(self):
+        self._calibration_restore_tried = True
+        calibration = self._calibration_cache.load(self._calibration_key())
+        if not calibration:
+            self._tracer.count("calibration_cache_miss")
+            return
+        self._tracer.count("calibration_cache_hit")
+        for name in _CALIBRATED_OFFSETS:
+            area = calibration[name]
+            setattr(self, f"_{name}", ElementArea(**area) if area else None)
+        for name in _CALIBRATED_ELEMENTS:
+            area = calibration[name]
+            setattr(self, f"_{name}", MatchedElementArea(**area) if area else None)
+        self._scale_lock.lock(calibration["scale"])
+        self._calibration_restored = True
+        # restored offsets are saved again only after a recalibration
+        self._calibration_saved = True
+
+    def _save_calibration(self):
+        names = _CALIBRATED_OFFSETS + _CALIBRATED_ELEMENTS
+        if not all(getattr(self, f"_{name}") for name in names):
+            return
+        calibration = {
+            name: getattr(self, f"_{name}").as_dict() for name in names
+        }
+        calibration["scale"] = self._scale_lock.scale
+        self._calibration_cache.save(self._calibration_key(), calibration)
+        self._calibration_saved = True
+
+    def capture_frame(self) -> tuple[cv2.typing.MatLike, tuple[int, int]]:
+        """
+        Captures a screenshot without analyzing it and returns it with its origin in full frame coordinates.
+        It may be called while another thread analyzes a frame: the region is the one of the last finished
+        analysis, never offsets half updated by the current one.
+        """
+        return self._grab(self._published_region)
+
+    def _grab(
+        self, region: Optional[ElementArea], again: bool = False
+    ) -> tuple[cv2.typing.MatLike, tuple[int, int]]:
+        with self._tracer.span("capture"):
+            if again:
+                screenshot = self._capture.grab_again(region)
+            else:
+                screenshot = self._capture.grab(region)
+        return screenshot, ((region.x, region.y) if region else (0, 0))
+
+    def release_frame(self, screenshot: cv2.typing.MatLike):
+        """
+        Gives back the buffer of a frame returned by 'capture_frame' that won't be analyzed.
+        """
+        self._capture.release(screenshot)
+
+    def _take_screenshot(self, again: bool = False):
+        # the buffers of the previous screenshot are reused for the new one
+        self._release_screenshot()
+        # offsets moved during this analysis are followed right away
+        self._set_screenshot(*self._grab(self._capture_region(), again))
+
+    def _set_screenshot(self, screenshot: cv2.typing.MatLike, origin: tuple[int, int]):
+        with self._screenshot_lock:
+            if screenshot is not self._screenshot:
+                self._release_screenshot()
+            self._screenshot = screenshot
+            self._screenshot_origin = origin
+            self._screenshot_time = datetime.now()
+            self._frame = DerivedFrame(
+                screenshot, origin, self._tracer, self._capture.buffers
+            )
+
+    def _release_screenshot(self):
+        with self._screenshot_lock:
+            if self._frame is not None:
+                self._frame.release()
+                self._frame = None
+            if self._screenshot is not None:
+                if self._flight_recorder:
+                    self._flight_recorder.record(
+                        self._screenshot,
+                        self._screenshot_origin,
+                        self._debug_annotations(),
+                        self._screenshot_time,
+                    )
+                else:
+                    self._capture.release(self._screenshot)
+                self._screenshot = None
+
+    def _capture_region(self) -> Optional[ElementArea]:
+        """
+        Union of the offsets used on every tick, or None if a full frame is needed for calibration.
+        Moved offsets also need the shield icon one, the icons are matched again to confirm them.
+        """
+        offsets = (
+            self._leave_button_offset,
+            self._people_icon_offset,
+            self._meeting_duration_text_offset,
+            self._participants_number_text_offset,
+        )
+        if not all(offsets) or self._capture.size is None:
+            return None
+        if self._offsets_tracked and self._shield_icon_offset:
+            offsets += (self._shield_icon_offset,)
+        return ElementAreas.of(offsets).union().clipped_to(*self._capture.size)
+
+    def _element_searches(self) -> dict[str, tuple[Optional[ElementArea], float]]:
+        """
+        Templates to search on this tick with the areas to search them in and their thresholds.
+        """
+        threshold = self._detection.match_threshold
+        searches = {TEAMS_LEAVE_BUTTON_ABS_PATH: (self._leave_button_offset, threshold)}
+        # offsets of the texts are known, so the icons are unnecessary, unless the offsets were moved
+        tracked = self._offsets_tracked
+        if not self._meeting_duration_text_offset or tracked:
+            searches[TEAMS_SHIELD_ICON_ABS_PATH] = (self._shield_icon_offset, threshold)
+        if not self._participants_number_text_offset or tracked:
+            searches[TEAMS_PEOPLE_ICON_ABS_PATH] = (
+                self._people_icon_offset,
+                self._detection.people_icon_match_threshold,
+            )
+        return searches
+
+    @traced("find_elements")
     def _find_elements_areas(
         self,
-        template_img: cv2.typing.MatLike,
-        *,
-        area: Optional[ElementArea] = None,
-        threshold: float = 0.8,
-        scale_min: float = 0.5,
-        scale_max: float = 1.5,
-        scale_steps: int = 20,
-    ) -> list[MatchedElementArea]:
-
-        img = cv2.cvtColor(self._screenshot, cv2.COLOR_BGR2GRAY)
-        if area:
-            img = img[area.y : area.y + area.h, area.x : area.x + area.w]
-
-        templ_img = cv2.cvtColor(template_img, cv2.COLOR_BGR2GRAY)
-        matches: list[MatchedElementArea] = []
-        for scale in np.linspace(scale_min, scale_max, scale_steps)[::-1]:
-            resized_template_img = cv2.resize(templ_img, None, fx=scale, fy=scale)
-            w, h = resized_template_img.shape[::-1]
-            if (
-                resized_template_img.shape[0] > img.shape[0]
-                or resized_template_img.shape[1] > img.shape[1]
-            ):
-                break
-            res = cv2.matchTemplate(img, resized_template_img, cv2.TM_CCOEFF_NORMED)
-            loc = np.where(res >= threshold)
-            if loc[0].size > 0:
-                _, _, _, max_loc = cv2.minMaxLoc(res)
-                matches.append(
-                    MatchedElementArea(
-                        x=max_loc[0] + (area.x if area else 0),
-                        y=max_loc[1] + (area.y if area else 0),
-                        w=w,
-                        h=h,
-                        scale=scale,
+        searches: dict[str, tuple[Optional[ElementArea], float]],
+    ) -> dict[str, list[MatchedElementArea]]:
+        """
+        Matches the templates of 'searches', keyed by their paths, against the grayscale frame in one pass,
+        at the scales of the detection profile.
+        During a full sweep the first search anchors the scales the others are matched at.
+        Searches without an area look in the top bar of the screenshot first, where the controls are,
+        and those the downsampled full screenshot misses are matched at full resolution.
+        """
+
+        def queries(
+            templates_paths: list[str],
+            locked: bool,
+            prior: Optional[ElementArea] = None,
+            coarse: bool = True,
+        ) -> list[TemplateQuery]:
+            scales = self._detection.scales
+            result = []
+            for template_path in templates_paths:
+                area, threshold = searches[template_path]
+                coarse_to_fine = coarse and self._coarse_to_fine and not area
+                area = area or prior
+                if locked:
+                    templates = self._template_bank.nearby(
+                        template_path,
+                        self._scale_lock.scale,
+                        *scales,
+                        radius=self._scale_lock.radius,
                     )
+                else:
+                    templates = self._template_bank.pyramid(template_path, *scales)
+                origin_x, origin_y = self._frame.origin
+                offset = (
+                    (max(area.x, origin_x), max(area.y, origin_y))
+                    if area
+                    else (origin_x, origin_y)
                 )
-        return matches
+                result.append(
+                    TemplateQuery(
+                        self._frame.gray(area),
+                        templates,
+                        offset,
+                        threshold,
+                        coarse_to_fine,
+                    )
+                )
+            return result
+
+        found: dict[str, list[MatchedElementArea]] = {}
+        pending = list(searches)
+        if self._scale_lock.locked:
+            with self._tracer.span("template_match"):
+                matches = match_templates(queries(pending, True))
+            for template_path, template_matches in zip(pending, matches):
+                if len(template_matches):
+                    found[template_path] = template_matches
+            pending = [path for path in pending if path not in found]
+            if not pending:
+                return found
+            # confidence dropped at the locked scale, the UI scale might have changed
+            self._scale_lock.release()
+            self._tracer.count("scale_lock_lost")
 
-    def _find_text(
+        self._tracer.count("calibration_sweep")
+        with self._stage_limits.stage("calibration", self._tracer):
+            if self._top_bar_prior and not all(searches[path][0] for path in pending):
+                with self._tracer.span("template_match"):
+                    matches = match_templates(
+                        queries(pending, False, self._top_bar_area()), anchored=True
+                    )
+                for template_path, template_matches in zip(pending, matches):
+                    if len(template_matches):
+                        found[template_path] = template_matches
+                pending = [path for path in pending if path not in found]
+                if not pending:
+                    return found
+                self._tracer.count("top_bar_miss")
+
+            with self._tracer.span("template_match"):
+                matches = match_templates(queries(pending, False), anchored=True)
+            found.update(zip(pending, matches))
+            # the downsampled copy can lose an element the full resolution still matches
+            missed = [
+                path
+                for path in pending
+                if not len(found[path]) and self._coarse_to_fine and not searches[path][0]
+            ]
+            if missed:
+                self._tracer.count("coarse_miss")
+                with self._tracer.span("template_match"):
+                    matches = match_templates(
+                        queries(missed, False, coarse=False), anchored=True
+                    )
+                found.update(zip(missed, matches))
+            return found
+
+    def _top_bar_area(self) -> ElementArea:
+        """
+        Top part of the screenshot, where the top bar of a maximized meeting window is.
+        """
+        height, width = self._screenshot.shape[:2]
+        origin_x, origin_y = self._screenshot_origin
+        return ElementArea(
+            x=origin_x, y=origin_y, w=width, h=height * TOP_BAR_HEIGHT_RATIO
+        )
+
+    @traced("find_text")
+    def _find_texts(
         self,
-        *,
-        area: Optional[ElementArea] = None,
-        config: str = r"--oem 3 --psm 6",
-    ) -> list[MatchedTextElementArea]:
-
-        img = self._screenshot
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        if area:
-            img = img[area.y : area.y + area.h, area.x : area.x + area.w]
-
-        _, img = cv2.threshold(img, 150, 255, cv2.THRESH_BINARY)
-        img = cv2.bitwise_not(img)
-        data = tes.image_to_data(img, output_type=tes.Output.DICT, config=config)
-        matches: list[MatchedTextElementArea] = []
-        for i in range(len(data["text"])):
-            x, y, w, h = (
-                data["left"][i],
-                data["top"][i],
-                data["width"][i],
-                data["height"][i],
-            )
-            matches.append(
-                MatchedTextElementArea(
-                    x=x + (area.x if area else 0),
-                    y=y + (area.y if area else 0),
-                    w=w,
-                    h=h,
-                    text=data["text"][i],
-                )
-            )
-        return matches
+        fields: list[tuple[ElementArea, Optional[GlyphRecognizer]]],
+    ) -> list[list[MatchedTextElementArea]]:
+        """
+        Returns the text matches of every (area, glyphs) field.
+        Fields not served by the cache or the glyph recognizer are passed to tesseract in a single mosaic image.
+        """
+        config = self._detection.tesseract_config
+        texts_matches: list[Optional[list[MatchedTextElementArea]]] = []
+        pending = []
+        for area, glyphs in fields:
+            img = self._frame.binary(area, self._detection.binarize_threshold)
+            with self._tracer.span("ocr"):
+                key, matches = self._recognize_text_cheaply(img, area, config, glyphs)
+            if matches is None:
+                pending.append((len(texts_matches), img, area, glyphs, key))
+            texts_matches.append(matches)
+
+        if pending:
+            with self._stage_limits.stage("ocr", self._tracer):
+                with self._tracer.span("ocr"):
+                    self._tracer.count("ocr_call")
+                    batch = self._ocr_service.recognize_mosaic(
+                        [(img, area) for _, img, area, _, _ in pending], config
+                    )
+                    for (i, img, area, glyphs, key), matches in zip(pending, batch):
+                        if glyphs:
+                            # words read by tesseract teach the glyph recognizer
+                            for match in matches:
+                                x = match.x - area.x
+                                y = match.y - area.y
+                                glyphs.learn(
+                                    img[y : y + match.h, x : x + match.w], match.text
+                                )
+                        self._text_cache.put(key, matches)
+                        texts_matches[i] = matches
+        return texts_matches
+
+    def _recognize_text_cheaply(
+        self,
+        img: cv2.typing.MatLike,
+        area: ElementArea,
+        config: str,
+        glyphs: Optional[GlyphRecognizer],
+    ) -> tuple[tuple, Optional[list[MatchedTextElementArea]]]:
+        """
+        Tries to read the binarized region from the cache or with the glyph recognizer.
+        Returns its cache key and the matches, or None if tesseract is needed.
+        """
+        # the text only changes when the pixels do, so tesseract is skipped for already seen regions
+        key = (fingerprint(img), config, (area.x, area.y))
+        cached = self._text_cache.get(key)
+        if cached is not None:
+            self._tracer.count("text_cache_hit")
+            return key, list(cached)
+
+        if glyphs:
+            glyph_match = glyphs.recognize(img)
+            if glyph_match:
+                self._tracer.count("glyph_read")
+                matches = [
+                    MatchedTextElementArea(
+                        x=glyph_match.x + area.x,
+                        y=glyph_match.y + area.y,
+                        w=glyph_match.w,
+                        h=glyph_match.h,
+                        text=glyph_match.text,
+                    )
+                ]
+                self._text_cache.put(key, matches)
+                return key, matches
+
+        return key, None
+
+
+# texts the glyph recognizers learn and read, anything else is left to tesseract
+MEETING_DURATION_PATTERN = r"(\d{2}:)?\d{2}:\d{2}"
+PARTICIPANTS_NUMBER_PATTERN = r"\d+"
+
+# part of the screenshot height searched first for the controls of the top bar
+TOP_BAR_HEIGHT_RATIO = 0.2
+
+_CALIBRATED_OFFSETS = (
+    "leave_button_offset",
+    "shield_icon_offset",
+    "people_icon_offset",
+    "meeting_duration_text_offset",
+    "participants_number_text_offset",
+)
+_CALIBRATED_ELEMENTS = ("shield_icon", "people_icon")
+# offsets moved together by the tracker, the texts with the icons next to them
+_TRACKED_OFFSETS = {
+    "leave_button": ("leave_button_offset",),
+    "shield_icon": ("shield_icon_offset", "meeting_duration_text_offset"),
+    "people_icon": ("people_icon_offset", "participants_number_text_offset"),
+}
+
+
+def _covers(
+    screenshot: cv2.typing.MatLike, origin: tuple[int, int], area: ElementArea
+) -> bool:
+    height, width = screenshot.shape[:2]
+    x, y = area.x - origin[0], area.y - origin[1]
+    return x >= 0 and y >= 0 and x + area.w <= width and y + area.h <= height
+
+
+def _load_glyphs(path: str, pattern: str) -> GlyphRecognizer:
+    if p.exists(path):
+        return GlyphRecognizer.load(path, pattern=pattern)
+    return GlyphRecognizer(pattern=pattern)
 
 
 def is_there_red(img: cv2.typing.MatLike) -> bool:
-    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    return _is_there_red_hsv(cv2.cvtColor(img, cv2.COLOR_BGR2HSV))
+
+
+def _is_there_red_hsv(hsv: cv2.typing.MatLike) -> bool:
     red_mask_left = cv2.inRange(hsv, (0, 100, 100), (10, 255, 255))
     red_mask_right = cv2.inRange(hsv, (160, 100, 100), (179, 255, 255))
 
@@ -398,9 +1009,7 @@ def is_there_red(img: cv2.typing.MatLike) -> bool:
     # red = cv2.bitwise_and(img, img, mask=red_mask)
     # cv2.imshow('red', red)
     # cv2.waitKey(0)
-    if np.sum(red_mask) > 0:
-        return True
-    return False
+    return cv2.countNonZero(red_mask) > 0
 
 
 if __name__ == "__main__":
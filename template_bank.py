@@ -0,0 +1,288 @@
+import cv2
+import numpy as np
+from typing import NamedTuple, Optional
+
+from models import MatchedElementArea
+
+
+class ScaledTemplate(NamedTuple):
+    """
+    Grayscale template resized to 'scale', ready to be passed to 'cv2.matchTemplate'.
+    """
+
+    scale: float
+    img: cv2.typing.MatLike
+
+
+class TemplateBank:
+    """
+    Loads template images once and caches their grayscale, resized variants for every scale grid requested.
+    Pyramids are ordered from the largest scale to the smallest one, the same order the matching loop uses.
+
+    The bank is read-only after a pyramid is built, so one instance can be shared between controllers.
+    """
+
+    def __init__(self) -> None:
+        self._gray_templates: dict[str, cv2.typing.MatLike] = {}
+        self._pyramids: dict[
+            tuple[str, float, float, int], tuple[ScaledTemplate, ...]
+        ] = {}
+
+    def gray(self, template_path: str) -> cv2.typing.MatLike:
+        gray = self._gray_templates.get(template_path)
+        if gray is None:
+            img = cv2.imread(template_path)
+            if img is None:
+                raise FileNotFoundError(f"Template {template_path} can't be read")
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            self._gray_templates[template_path] = gray
+        return gray
+
+    def pyramid(
+        self,
+        template_path: str,
+        scale_min: float,
+        scale_max: float,
+        scale_steps: int,
+    ) -> tuple[ScaledTemplate, ...]:
+        key = (template_path, scale_min, scale_max, scale_steps)
+        pyramid = self._pyramids.get(key)
+        if pyramid is None:
+            gray = self.gray(template_path)
+            pyramid = tuple(
+                ScaledTemplate(
+                    scale=float(scale),
+                    img=cv2.resize(gray, None, fx=scale, fy=scale),
+                )
+                for scale in np.linspace(scale_min, scale_max, scale_steps)[::-1]
+            )
+            self._pyramids[key] = pyramid
+        return pyramid
+
+    def preload(
+        self,
+        templates_paths: tuple[str, ...],
+        scale_min: float = 0.5,
+        scale_max: float = 1.5,
+        scale_steps: int = 20,
+    ) -> None:
+        """
+        Builds the pyramids up front, so threads sharing the bank only read from it.
+        """
+        for template_path in templates_paths:
+            self.pyramid(template_path, scale_min, scale_max, scale_steps)
+
+    def arrays(self) -> dict[tuple, np.ndarray]:
+        """
+        Grayscale templates and the pyramids built so far, keyed so that 'from_arrays' can rebuild the bank,
+        e.g. from 'SharedArrays' shared by several processes.
+        """
+        arrays: dict[tuple, np.ndarray] = {
+            ("gray", template_path): gray
+            for template_path, gray in self._gray_templates.items()
+        }
+        for key, pyramid in self._pyramids.items():
+            for templ in pyramid:
+                arrays[("pyramid", *key, templ.scale)] = templ.img
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[tuple, np.ndarray]) -> "TemplateBank":
+        bank = cls()
+        pyramids: dict[tuple[str, float, float, int], list[ScaledTemplate]] = {}
+        for key, img in arrays.items():
+            if key[0] == "gray":
+                bank._gray_templates[key[1]] = img
+            else:
+                pyramids.setdefault(key[1:5], []).append(ScaledTemplate(key[5], img))
+        for key, templates in pyramids.items():
+            bank._pyramids[key] = tuple(
+                sorted(templates, key=lambda templ: templ.scale, reverse=True)
+            )
+        return bank
+
+    def nearby(
+        self,
+        template_path: str,
+        scale: float,
+        scale_min: float,
+        scale_max: float,
+        scale_steps: int,
+        *,
+        radius: int = 1,
+    ) -> tuple[ScaledTemplate, ...]:
+        """
+        Returns the templates of the pyramid whose scale is at most 'radius' grid steps away from 'scale'.
+        """
+        pyramid = self.pyramid(template_path, scale_min, scale_max, scale_steps)
+        step = (scale_max - scale_min) / max(scale_steps - 1, 1)
+        tolerance = step * radius + step / 2
+        return tuple(
+            templ for templ in pyramid if abs(templ.scale - scale) <= tolerance
+        )
+
+
+class ScaleLock:
+    """
+    Remembers the UI scale of the first selected match, so later searches can skip the full scale sweep.
+    The lock is released when nothing matches at the scales around the locked one.
+    """
+
+    def __init__(self, radius: int = 1) -> None:
+        self.radius = radius
+        self.scale: Optional[float] = None
+
+    @property
+    def locked(self) -> bool:
+        return self.scale is not None
+
+    def lock(self, scale: float) -> None:
+        self.scale = scale
+
+    def release(self) -> None:
+        self.scale = None
+
+
+class TemplateQuery(NamedTuple):
+    """
+    Search of a template pyramid in a grayscale image cropped at 'offset' of the full frame.
+    If 'coarse_to_fine', candidates are found on a downsampled image and refined at full resolution,
+    which makes searching large images much cheaper.
+    """
+
+    img: cv2.typing.MatLike
+    templates: tuple[ScaledTemplate, ...]
+    offset: tuple[int, int]
+    threshold: float
+    coarse_to_fine: bool = False
+
+
+# smallest side of a downsampled template that still matches reliably
+COARSE_MIN_TEMPLATE_SIZE = 12
+COARSE_MAX_FACTOR = 4
+# downsampled images match with lower scores, so their candidates are accepted below the threshold
+COARSE_THRESHOLD_MARGIN = 0.15
+COARSE_CANDIDATES = 3
+
+
+def coarse_factor(template_img: cv2.typing.MatLike) -> int:
+    """
+    Downsampling factor of the coarse search for 'template_img', 1 if it's too small to be downsampled.
+    """
+    return max(1, min(COARSE_MAX_FACTOR, min(template_img.shape) // COARSE_MIN_TEMPLATE_SIZE))
+
+
+def match_templates(
+    queries: list[TemplateQuery], *, anchored: bool = False, radius: int = 1
+) -> list[list[MatchedElementArea]]:
+    """
+    Matches all queries in a single sweep over the scales, from the largest one, and returns the matches of each.
+
+    A query is finished once its score falls below the threshold again after matching, i.e. after its peak,
+    so the smaller scales are skipped. Only the best location is taken at every scale.
+
+    Elements of the same UI share its scale, so if 'anchored', the first query is matched on its own and
+    the others only at the scales at most 'radius' grid steps away from its matches.
+    """
+    if anchored and len(queries) > 1:
+        anchor_matches = match_templates(queries[:1])[0]
+        scales = sorted(
+            {scale for query in queries for scale, _ in query.templates}, reverse=True
+        )
+        near = set()
+        for match in anchor_matches:
+            i = scales.index(match.scale)
+            near.update(scales[max(i - radius, 0) : i + radius + 1])
+        others = [
+            query._replace(
+                templates=tuple(templ for templ in query.templates if templ.scale in near)
+            )
+            for query in queries[1:]
+        ]
+        return [anchor_matches] + match_templates(others)
+
+    results: list[list[MatchedElementArea]] = [[] for _ in queries]
+    coarse_images: list[dict[int, cv2.typing.MatLike]] = [{} for _ in queries]
+    by_scale: dict[float, list[tuple[int, cv2.typing.MatLike]]] = {}
+    for i, query in enumerate(queries):
+        for scale, template_img in query.templates:
+            by_scale.setdefault(scale, []).append((i, template_img))
+
+    finished = [False] * len(queries)
+    for scale in sorted(by_scale, reverse=True):
+        for i, template_img in by_scale[scale]:
+            if finished[i]:
+                continue
+            query = queries[i]
+            h, w = template_img.shape
+            if h > query.img.shape[0] or w > query.img.shape[1]:
+                continue
+            max_val, max_loc = _best_match(query, template_img, coarse_images[i])
+            if max_val >= query.threshold:
+                results[i].append(
+                    MatchedElementArea(
+                        x=max_loc[0] + query.offset[0],
+                        y=max_loc[1] + query.offset[1],
+                        w=w,
+                        h=h,
+                        scale=scale,
+                        to_int_func=None,
+                    )
+                )
+            elif results[i]:
+                finished[i] = True
+        if all(finished):
+            break
+    return results
+
+
+def _best_match(
+    query: TemplateQuery,
+    template_img: cv2.typing.MatLike,
+    coarse_images: dict[int, cv2.typing.MatLike],
+) -> tuple[float, tuple[int, int]]:
+    """
+    Score and location of the best match of 'template_img' in the query image.
+    """
+    factor = coarse_factor(template_img) if query.coarse_to_fine else 1
+    if factor == 1:
+        res = cv2.matchTemplate(query.img, template_img, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        return max_val, max_loc
+
+    coarse_img = coarse_images.get(factor)
+    if coarse_img is None:
+        coarse_img = cv2.resize(
+            query.img, None, fx=1 / factor, fy=1 / factor, interpolation=cv2.INTER_AREA
+        )
+        coarse_images[factor] = coarse_img
+    h, w = template_img.shape
+    coarse_template = cv2.resize(
+        template_img, (w // factor, h // factor), interpolation=cv2.INTER_AREA
+    )
+    ch, cw = coarse_template.shape
+    if ch > coarse_img.shape[0] or cw > coarse_img.shape[1]:
+        return -1.0, (0, 0)
+    res = cv2.matchTemplate(coarse_img, coarse_template, cv2.TM_CCOEFF_NORMED)
+
+    # the best coarse location isn't always the best one at full resolution, so a few are refined
+    best_val, best_loc = -1.0, (0, 0)
+    margin = factor + 1
+    for _ in range(COARSE_CANDIDATES):
+        _, coarse_val, _, (cx, cy) = cv2.minMaxLoc(res)
+        if coarse_val < query.threshold - COARSE_THRESHOLD_MARGIN:
+            break
+        x = max(cx * factor - margin, 0)
+        y = max(cy * factor - margin, 0)
+        window = query.img[y : y + h + 2 * margin, x : x + w + 2 * margin]
+        if window.shape[0] >= h and window.shape[1] >= w:
+            refined = cv2.matchTemplate(window, template_img, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(refined)
+            if max_val > best_val:
+                best_val, best_loc = max_val, (max_loc[0] + x, max_loc[1] + y)
+        # the next candidate must not overlap this one
+        res[
+            max(cy - ch // 2, 0) : cy + ch // 2 + 1,
+            max(cx - cw // 2, 0) : cx + cw // 2 + 1,
+        ] = -1.0
+    return best_val, best_loc
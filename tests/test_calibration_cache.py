@@ -0,0 +1,73 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import teams_controller
+from calibration_cache import CalibrationCache
+from config import load_config
+from constants import PROJECT_DIR_ABS_PATH, TEST_IMAGES_DIR_ABS_PATH
+from screen_capture import StreamCapture
+from teams_controller import TeamsController
+from tracing import Tracer
+
+FRAME = cv2.imread(os.path.join(TEST_IMAGES_DIR_ABS_PATH, "participants-2.png"))
+
+
+def moved(frame: np.ndarray, dy: int) -> np.ndarray:
+    return cv2.warpAffine(
+        frame,
+        np.float32([[1, 0, 0], [0, 1, dy]]),
+        (frame.shape[1], frame.shape[0]),
+        borderMode=cv2.BORDER_REPLICATE,
+    )
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    monkeypatch.chdir(PROJECT_DIR_ABS_PATH)
+    monkeypatch.setattr(
+        teams_controller, "TEAMS_DEBUG_IMAGES_DIR_ABS_PATH", str(tmp_path / "debug")
+    )
+    return CalibrationCache(str(tmp_path / "calibration.json"))
+
+
+def replay(cache: CalibrationCache, frames: list[np.ndarray]) -> Tracer:
+    tracer = Tracer()
+    capture = StreamCapture()
+    ctrl = TeamsController(
+        capture=capture, calibration_cache=cache, tracer=tracer, config=load_config()
+    )
+    for frame in frames:
+        capture.feed(frame)
+        ctrl.extract_data()
+        assert (ctrl.meeting_duration.seconds, ctrl.participants_number) == (61, 2)
+    return tracer
+
+
+def test_warm_start_skips_the_calibration(cache):
+    replay(cache, [FRAME])
+
+    tracer = replay(cache, [FRAME, FRAME])
+
+    assert tracer.counters["calibration_cache_hit"] == 1
+    assert tracer.counters["calibration_sweep"] == 0
+
+
+def test_elements_moved_after_a_warm_start_are_tracked(cache):
+    replay(cache, [FRAME])
+
+    tracer = replay(cache, [FRAME, moved(FRAME, 100), moved(FRAME, 100)])
+
+    assert tracer.counters["calibration_cache_invalid"] == 0
+    assert tracer.counters["offsets_tracked"] == 1
+
+
+def test_calibration_not_fitting_the_screen_is_redone(cache):
+    replay(cache, [FRAME])
+
+    tracer = replay(cache, [moved(FRAME, 100)])
+
+    assert tracer.counters["calibration_cache_invalid"] == 1
+    assert tracer.counters["calibration_sweep"] > 0
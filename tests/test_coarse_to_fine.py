@@ -0,0 +1,77 @@
+import os
+
+import cv2
+import pytest
+
+import teams_controller
+import template_bank
+from config import load_config
+from constants import (
+    PROJECT_DIR_ABS_PATH,
+    TEAMS_LEAVE_BUTTON_ABS_PATH,
+    TEAMS_PEOPLE_ICON_ABS_PATH,
+    TEAMS_SHIELD_ICON_ABS_PATH,
+    TEST_IMAGES_DIR_ABS_PATH,
+)
+from synthetic_frames import FrameGenerator, FrameSpec
+from teams_controller import TeamsController
+from template_bank import TemplateBank, TemplateQuery, match_templates
+from tracing import Tracer
+
+TEMPLATES = {
+    "leave_button": TEAMS_LEAVE_BUTTON_ABS_PATH,
+    "shield_icon": TEAMS_SHIELD_ICON_ABS_PATH,
+    "people_icon": TEAMS_PEOPLE_ICON_ABS_PATH,
+}
+
+
+@pytest.mark.parametrize(
+    "width, height, scale", [(1920, 1080, 1.0), (2880, 1800, 1.5)]
+)
+def test_coarse_to_fine_finds_the_full_resolution_matches(width, height, scale):
+    frame = FrameGenerator().render(FrameSpec(width, height, scale, "12:34", 5))
+    gray = cv2.cvtColor(frame.image, cv2.COLOR_BGR2GRAY)
+    bank = TemplateBank()
+
+    results = {}
+    for coarse_to_fine in (False, True):
+        queries = [
+            TemplateQuery(
+                gray,
+                bank.nearby(path, scale, 0.5, 1.5, 11, radius=2),
+                (0, 0),
+                0.8,
+                coarse_to_fine,
+            )
+            for path in TEMPLATES.values()
+        ]
+        results[coarse_to_fine] = match_templates(queries)
+
+    assert results[True] == results[False]
+    for name, matches in zip(TEMPLATES, results[True]):
+        best = min(matches, key=lambda match: abs(match.scale - scale))
+        assert (best.x, best.y) == frame.elements[name][:2]
+
+
+def test_calibration_falls_back_to_full_resolution_when_the_coarse_pass_misses(
+    monkeypatch, tmp_path
+):
+    monkeypatch.chdir(PROJECT_DIR_ABS_PATH)
+    monkeypatch.setattr(teams_controller, "TEAMS_DEBUG_IMAGES_DIR_ABS_PATH", str(tmp_path))
+    # no downsampled candidate is good enough
+    monkeypatch.setattr(template_bank, "COARSE_THRESHOLD_MARGIN", -1.0)
+    frame = cv2.imread(os.path.join(TEST_IMAGES_DIR_ABS_PATH, "participants-2.png"))
+    # the top bar is enough and keeps the full resolution search short
+    frame = frame[: frame.shape[0] // 3]
+    tracer = Tracer()
+    ctrl = TeamsController(
+        screenshot_overrides=(frame,),
+        tracer=tracer,
+        config=load_config(),
+        top_bar_prior=False,
+    )
+
+    ctrl.extract_data()
+
+    assert ctrl.participants_number == 2
+    assert tracer.counters["coarse_miss"] == 1
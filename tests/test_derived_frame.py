@@ -0,0 +1,102 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import teams_controller
+from config import load_config
+from constants import (
+    PROJECT_DIR_ABS_PATH,
+    TEAMS_LEAVE_BUTTON_ABS_PATH,
+    TEAMS_PEOPLE_ICON_ABS_PATH,
+    TEAMS_SHIELD_ICON_ABS_PATH,
+    TEST_IMAGES_DIR_ABS_PATH,
+)
+from derived_frame import DerivedFrame
+from models import ElementArea
+from teams_controller import TeamsController
+from template_bank import TemplateBank, TemplateQuery, match_templates
+from tracing import Tracer
+
+FRAME = cv2.imread(os.path.join(TEST_IMAGES_DIR_ABS_PATH, "participants-2.png"))
+TOP_BAR = ElementArea(x=0, y=0, w=FRAME.shape[1], h=FRAME.shape[0] // 5)
+
+
+def test_derived_images_are_computed_once_per_frame():
+    tracer = Tracer()
+    frame = DerivedFrame(FRAME, tracer=tracer)
+    area = ElementArea(x=100, y=40, w=300, h=60)
+
+    assert frame.gray(area).shape == (60, 300)
+    assert np.shares_memory(frame.gray(area), frame.gray())
+    assert frame.binary(area) is frame.binary(area)
+    assert frame.binary(area, 100) is not frame.binary(area)
+    assert frame.hsv(area) is frame.hsv(area)
+    assert len(tracer.spans["grayscale"]) == 1
+
+    # the next frame derives its own images, a black one is blank for the OCR
+    other = DerivedFrame(np.zeros_like(FRAME), tracer=tracer)
+    assert (other.binary(area) == 255).all()
+    assert len(tracer.spans["grayscale"]) == 2
+
+
+def test_areas_are_cropped_in_full_frame_coordinates():
+    origin = (100, 40)
+    frame = DerivedFrame(FRAME[40:400, 100:1000], origin)
+    area = ElementArea(x=150, y=60, w=50, h=30)
+
+    assert np.array_equal(frame.gray(area), DerivedFrame(FRAME).gray(area))
+
+
+def test_every_tick_converts_its_screenshot_once(monkeypatch, tmp_path):
+    monkeypatch.chdir(PROJECT_DIR_ABS_PATH)
+    monkeypatch.setattr(teams_controller, "TEAMS_DEBUG_IMAGES_DIR_ABS_PATH", str(tmp_path))
+    tracer = Tracer()
+    ctrl = TeamsController(
+        screenshot_overrides=(FRAME,), tracer=tracer, config=load_config()
+    )
+
+    for ticks in range(1, 4):
+        ctrl.extract_data()
+        assert len(tracer.spans["grayscale"]) == ticks
+
+
+def match_one_by_one(query: TemplateQuery) -> list[tuple[int, int, float]]:
+    """
+    Reference matching of a single query with 'cv2.matchTemplate', stopping after its peak.
+    """
+    matches = []
+    for scale, template_img in query.templates:
+        h, w = template_img.shape
+        if h > query.img.shape[0] or w > query.img.shape[1]:
+            continue
+        res = cv2.matchTemplate(query.img, template_img, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, (x, y) = cv2.minMaxLoc(res)
+        if max_val >= query.threshold:
+            matches.append((x + query.offset[0], y + query.offset[1], scale))
+        elif matches:
+            break
+    return matches
+
+
+@pytest.mark.parametrize("offset", [(0, 0), (1500, 0)])
+def test_one_pass_matches_like_matching_every_template_alone(offset):
+    bank = TemplateBank()
+    x, y = offset
+    img = DerivedFrame(FRAME).gray(TOP_BAR)[:, x:]
+    queries = [
+        TemplateQuery(img, bank.pyramid(path, 0.5, 1.5, 11), offset, 0.8)
+        for path in (
+            TEAMS_LEAVE_BUTTON_ABS_PATH,
+            TEAMS_SHIELD_ICON_ABS_PATH,
+            TEAMS_PEOPLE_ICON_ABS_PATH,
+        )
+    ]
+
+    results = match_templates(queries)
+
+    assert [
+        [(match.x, match.y, match.scale) for match in matches] for matches in results
+    ] == [match_one_by_one(query) for query in queries]
+    assert any(results)
@@ -0,0 +1,87 @@
+import json
+import os
+import shutil
+
+import pytest
+from pydantic import ValidationError
+
+from constants import CONFIG_ABS_PATH
+from detection_profile import DetectionProfile
+from detection_tuner import CaseResult, Evaluation, choose, pareto_front, write_profile
+
+
+def evaluation(failures: int, latency: float, cases: int = 4) -> Evaluation:
+    """
+    Evaluation of 'cases' cases with 'failures' failed, calibrating in 'latency' seconds and ticking instantly.
+    """
+    result = Evaluation(DetectionProfile())
+    for i in range(cases):
+        failure = "misread" if i < failures else None
+        result.results[f"case-{i}"] = CaseResult(latency, (0.0,), failure)
+    return result
+
+
+def test_pareto_front_goes_from_the_fastest_to_the_most_accurate():
+    fast = evaluation(failures=2, latency=0.1)
+    slower_worse = evaluation(failures=3, latency=0.2)
+    middle = evaluation(failures=1, latency=0.3)
+    same_accuracy_slower = evaluation(failures=1, latency=0.4)
+    accurate = evaluation(failures=0, latency=0.5)
+
+    front = pareto_front(
+        [accurate, same_accuracy_slower, slower_worse, middle, fast]
+    )
+
+    assert front == [fast, middle, accurate]
+
+
+def test_choose_takes_the_fastest_reaching_the_accuracy():
+    front = [
+        evaluation(failures=2, latency=0.1),
+        evaluation(failures=1, latency=0.3),
+        evaluation(failures=0, latency=0.5),
+    ]
+
+    assert choose(front) is front[2]
+    assert choose(front, min_accuracy=0.75) is front[1]
+    assert choose(front, min_accuracy=0.0) is front[0]
+    assert choose([]) is None
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = str(tmp_path / "config.json")
+    shutil.copy(CONFIG_ABS_PATH, path)
+    return path
+
+
+def test_write_profile_replaces_the_detection_section(config_path):
+    profile = DetectionProfile(match_threshold=0.9, scale_steps=10, tesseract_psm=4)
+
+    write_profile(config_path, profile)
+
+    with open(config_path) as json_file:
+        config = json.load(json_file)
+    assert config["detection"] == profile._asdict()
+    with open(CONFIG_ABS_PATH) as json_file:
+        assert config["obs"] == json.load(json_file)["obs"]
+
+
+@pytest.mark.parametrize(
+    "profile",
+    [
+        DetectionProfile(scale_min=1.5, scale_max=0.5),
+        DetectionProfile(binarize_threshold=300),
+        DetectionProfile(match_threshold=0.0),
+    ],
+)
+def test_write_profile_rejects_an_invalid_profile(config_path, profile):
+    with open(config_path) as json_file:
+        before = json_file.read()
+
+    with pytest.raises(ValidationError):
+        write_profile(config_path, profile)
+
+    with open(config_path) as json_file:
+        assert json_file.read() == before
+    assert os.listdir(os.path.dirname(config_path)) == ["config.json"]
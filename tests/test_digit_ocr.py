@@ -0,0 +1,86 @@
+import cv2
+import numpy as np
+import pytest
+
+from benchmark import check_sample, load_frame_set
+from config import load_config
+from constants import PROJECT_DIR_ABS_PATH, TEST_IMAGES_DIR_ABS_PATH
+from digit_ocr import GlyphRecognizer
+from exceptions import ElementNotFoundException, ParticipantsNumberNotVisibleException
+from models import MatchedTextElementArea
+from ocr_service import OCRService
+from teams_controller import MEETING_DURATION_PATTERN, TeamsController
+
+_, FRAMES = load_frame_set(TEST_IMAGES_DIR_ABS_PATH)
+
+
+class BlankOCRService(OCRService):
+    """
+    Tesseract reading nothing, so the texts are read by the seeded glyphs or not at all.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(use_tesserocr=False)
+        self.calls = 0
+
+    def recognize(self, requests, config):
+        self.calls += 1
+        # only the page level entry, as tesseract returns for a blank image
+        return [
+            [
+                MatchedTextElementArea(
+                    x=area.x if area else 0,
+                    y=area.y if area else 0,
+                    w=img.shape[1],
+                    h=img.shape[0],
+                    text="",
+                )
+            ]
+            for img, area in requests
+        ]
+
+
+def text_image(text: str) -> np.ndarray:
+    img = np.full((40, 40 + 24 * len(text)), 255, np.uint8)
+    cv2.putText(img, text, (8, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+    return img
+
+
+@pytest.mark.parametrize(
+    "file, label", [frame for frame in FRAMES if frame[1] is not None]
+)
+def test_seeded_glyphs_read_the_labelled_frames(file, label, monkeypatch):
+    monkeypatch.chdir(PROJECT_DIR_ABS_PATH)
+    ocr_service = BlankOCRService()
+    ctrl = TeamsController(
+        screenshot_overrides=(cv2.imread(file),),
+        ocr_service=ocr_service,
+        config=load_config(),
+    )
+    error = None
+    try:
+        ctrl.extract_data()
+    except (ElementNotFoundException, ParticipantsNumberNotVisibleException) as e:
+        error = e
+
+    assert check_sample(ctrl, label, error) is None
+
+
+def test_texts_not_matching_the_pattern_are_not_learned():
+    glyphs = GlyphRecognizer(pattern=MEETING_DURATION_PATTERN)
+
+    assert not glyphs.learn(text_image("1234"), "1234")
+    assert glyphs.learn(text_image("12:34"), "12:34")
+    assert glyphs.recognize(text_image("12:34")).text == "12:34"
+    assert glyphs.recognize(text_image("1234")) is None
+
+
+def test_saved_glyphs_keep_their_samples(tmp_path):
+    glyphs = GlyphRecognizer()
+    glyphs.learn(text_image("05:09"), "05:09")
+    path = str(tmp_path / "glyphs.npz")
+    glyphs.save(path)
+
+    loaded = GlyphRecognizer.load(path, pattern=MEETING_DURATION_PATTERN)
+    assert loaded.known_chars == "059:"
+    assert loaded.recognize(text_image("09:50")).text == "09:50"
@@ -0,0 +1,118 @@
+import multiprocessing
+
+import numpy as np
+
+import fleet
+from calibration_cache import SharedCalibrationCache
+from constants import (
+    TEAMS_LEAVE_BUTTON_ABS_PATH,
+    TEAMS_PEOPLE_ICON_ABS_PATH,
+    TEAMS_SHIELD_ICON_ABS_PATH,
+)
+from detection_profile import DetectionProfile
+from shared_arrays import SharedArrays
+from stage_limits import StageLimits
+from template_bank import TemplateBank
+
+TEMPLATES = (
+    TEAMS_LEAVE_BUTTON_ABS_PATH,
+    TEAMS_SHIELD_ICON_ABS_PATH,
+    TEAMS_PEOPLE_ICON_ABS_PATH,
+)
+
+
+def template_sum(template_bank: TemplateBank) -> int:
+    return sum(
+        int(templ.img.sum())
+        for path in TEMPLATES
+        for templ in template_bank.pyramid(path, *DetectionProfile().scales)
+    )
+
+
+class TemplateReadingApp:
+    """
+    Stands in for 'App' in the session process: every update reads all the shared templates,
+    like a calibration does, and the meeting ends after 'UPDATES' of them.
+    """
+
+    UPDATES = 3
+
+    def __init__(self, config, *, tracer, template_bank, **kwargs) -> None:
+        self._tracer = tracer
+        self._template_bank = template_bank
+        self._updates = 0
+
+    def update(self) -> bool:
+        with self._tracer.span("update"):
+            self._tracer.count("template_sum", template_sum(self._template_bank))
+            self._updates += 1
+        return self._updates < self.UPDATES
+
+    def wait(self) -> None:
+        pass
+
+    def stop_recording(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def run_session_with_fake_app(*args) -> None:
+    import app
+
+    app.App = TemplateReadingApp
+    fleet.run_session(*args)
+
+
+def test_run_session_reads_shared_templates(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    template_bank = TemplateBank()
+    template_bank.preload(TEMPLATES, *DetectionProfile().scales)
+    templates = SharedArrays.create(template_bank.arrays())
+    calibration_cache = SharedCalibrationCache.create(
+        str(tmp_path / "calibration_cache.json"), 4096, context=context
+    )
+    # the process drops its arguments once started, the semaphores must outlive the session
+    stage_limits = StageLimits.create({"calibration": 1, "ocr": 1}, context)
+    reports, session_reports = context.Pipe(duplex=False)
+    process = context.Process(
+        target=run_session_with_fake_app,
+        args=(
+            fleet.Job("job"),
+            None,
+            {},
+            templates.manifest,
+            calibration_cache,
+            stage_limits,
+            session_reports,
+            3600.0,
+        ),
+    )
+    try:
+        process.start()
+        session_reports.close()
+        process.join(60)
+        assert process.exitcode == 0
+        report = reports.recv()
+    finally:
+        reports.close()
+        templates.close()
+        calibration_cache.close()
+        calibration_cache.unlink()
+
+    assert len(report.ticks) == TemplateReadingApp.UPDATES
+    assert report.counters["template_sum"] == TemplateReadingApp.UPDATES * template_sum(
+        template_bank
+    )
+
+
+def test_attached_arrays_are_read_only_views():
+    arrays = SharedArrays.create({"a": np.arange(6, dtype=np.uint8).reshape(2, 3)})
+    attached = SharedArrays.attach(arrays.manifest)
+    try:
+        assert attached.arrays["a"].tolist() == [[0, 1, 2], [3, 4, 5]]
+        assert not attached.arrays["a"].flags.writeable
+    finally:
+        attached.close()
+        arrays.close()
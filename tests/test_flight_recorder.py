@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from flight_recorder import FlightRecorder
+
+
+def write_file(dir_path, name: str, size: int, mtime: float) -> None:
+    path = dir_path / name
+    path.write_bytes(bytes(size))
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    recorder = FlightRecorder(str(tmp_path), max_disk_usage=250)
+    yield recorder
+    recorder.close()
+
+
+def test_quota_deletes_the_oldest_files_first(recorder, tmp_path):
+    for i, name in enumerate(("c.jpg", "a.jpg", "d.jpg", "b.jpg")):
+        write_file(tmp_path, name, 100, 1000 + i)
+
+    assert recorder.enforce_quota() == 2
+    assert sorted(os.listdir(tmp_path)) == ["b.jpg", "d.jpg"]
+
+
+def test_directory_under_the_quota_is_left_alone(recorder, tmp_path):
+    write_file(tmp_path, "a.jpg", 100, 1000)
+    write_file(tmp_path, "b.jpg", 150, 1001)
+    os.mkdir(tmp_path / "incident")
+
+    assert recorder.enforce_quota() == 0
+    assert sorted(os.listdir(tmp_path)) == ["a.jpg", "b.jpg", "incident"]
+
+
+def test_quota_of_a_missing_directory(tmp_path):
+    recorder = FlightRecorder(str(tmp_path / "missing"), max_disk_usage=0)
+    try:
+        assert recorder.enforce_quota() == 0
+    finally:
+        recorder.close()
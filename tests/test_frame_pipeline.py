@@ -0,0 +1,67 @@
+import os
+import threading
+
+import cv2
+import pytest
+
+import teams_controller
+from config import load_config
+from constants import PROJECT_DIR_ABS_PATH, TEST_IMAGES_DIR_ABS_PATH
+from frame_pipeline import FramePipeline
+from teams_controller import TeamsController
+
+FRAME_PATH = os.path.join(TEST_IMAGES_DIR_ABS_PATH, "participants-2.png")
+
+
+@pytest.fixture
+def ctrl(monkeypatch, tmp_path):
+    monkeypatch.chdir(PROJECT_DIR_ABS_PATH)
+    monkeypatch.setattr(teams_controller, "TEAMS_DEBUG_IMAGES_DIR_ABS_PATH", str(tmp_path))
+    return TeamsController(
+        screenshot_overrides=(cv2.imread(FRAME_PATH),), config=load_config()
+    )
+
+
+def test_capture_frame_uses_the_region_of_the_last_analysis(ctrl):
+    full_frame, origin = ctrl.capture_frame()
+    assert origin == (0, 0)
+    ctrl.release_frame(full_frame)
+
+    ctrl.extract_data()
+    region, origin = ctrl.capture_frame()
+    assert origin != (0, 0)
+    assert region.shape[0] < full_frame.shape[0]
+    ctrl.release_frame(region)
+
+    ctrl.clear_offsets()
+    frame, origin = ctrl.capture_frame()
+    assert origin == (0, 0)
+    assert frame.shape == full_frame.shape
+
+
+def test_debug_images_are_saved_while_frames_are_analyzed(ctrl, tmp_path):
+    ctrl.extract_data()
+    pipeline = FramePipeline(ctrl, capture_interval=0.001)
+    errors = []
+
+    def show_debug_images():
+        try:
+            for _ in range(20):
+                ctrl.show_debug_image(headless=True)
+        except Exception as e:
+            errors.append(e)
+
+    pipeline.start()
+    try:
+        assert pipeline.next_sample(timeout=5) is not None
+        thread = threading.Thread(target=show_debug_images)
+        thread.start()
+        thread.join()
+        samples = [pipeline.next_sample(timeout=5) for _ in range(3)]
+    finally:
+        pipeline.stop()
+
+    assert not errors
+    assert all(sample and sample.participants_number == 2 for sample in samples)
+    images = [cv2.imread(str(path)) for path in tmp_path.iterdir()]
+    assert images and all(image is not None for image in images)
@@ -0,0 +1,22 @@
+import pickle
+
+from models import ElementArea, ElementAreas, MatchedTextElementArea
+
+
+def test_union_of_a_batch_matches_pairwise_unions():
+    areas = [
+        ElementArea(x=10, y=5, w=20, h=10),
+        ElementArea(x=2, y=30, w=4, h=4),
+        ElementArea(x=40, y=0, w=1, h=50),
+    ]
+    expected = areas[0].union(areas[1]).union(areas[2])
+
+    assert ElementAreas.of(areas).union() == expected
+    assert ElementAreas.of([]).union() is None
+
+
+def test_repr_separates_fields_with_commas():
+    area = MatchedTextElementArea(x=1, y=2, w=3, h=4, text="12:34")
+
+    assert repr(area) == "MatchedTextElementArea(x=1, y=2, w=3, h=4, text='12:34')"
+    assert pickle.loads(pickle.dumps(area)) == area
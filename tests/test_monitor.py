@@ -0,0 +1,95 @@
+import copy
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import monitor
+import teams_controller
+from config import load_config
+from constants import PROJECT_DIR_ABS_PATH, TEST_IMAGES_DIR_ABS_PATH
+from fake_obs_server import FakeOBSServer
+from screen_capture import WindowCapture
+
+PASSWORD = "secret"
+MEETING_FRAME = cv2.imread(os.path.join(TEST_IMAGES_DIR_ABS_PATH, "participants-2.png"))
+
+
+class FakeWindow:
+    """
+    Maximized meeting window showing 'frame', captured through the patched 'WindowCapture'.
+    """
+
+    def __init__(self, title: str, frame: np.ndarray) -> None:
+        self.title = title
+        self.frame = frame
+        self.box = (0, 0, frame.shape[1], frame.shape[0])
+        self.isMaximized = True
+
+    def close(self, force: bool = False) -> None:
+        pass
+
+
+@pytest.fixture
+def servers():
+    servers = [FakeOBSServer(password=PASSWORD) for _ in range(2)]
+    for server in servers:
+        server.start()
+    yield servers
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def windows(monkeypatch, tmp_path, servers):
+    monkeypatch.chdir(PROJECT_DIR_ABS_PATH)
+    # the loaded config is cached, the test edits its own copy
+    config = copy.deepcopy(load_config())
+    config["obs"].update(password=PASSWORD, connect_timeout=5.0)
+    config["monitors"]["obs_ports"] = [server.port for server in servers]
+    # a meeting of two participants ends as soon as it's read
+    config["settings"].update(min_time="00:00:00", min_participants=5)
+    config["flight_recorder"]["enabled"] = False
+    monkeypatch.setattr(monitor, "load_config", lambda: config)
+    monkeypatch.setattr(
+        monitor, "CALIBRATION_CACHE_ABS_PATH", str(tmp_path / "calibration.json")
+    )
+    monkeypatch.setattr(
+        teams_controller, "TEAMS_DEBUG_IMAGES_DIR_ABS_PATH", str(tmp_path / "debug")
+    )
+
+    monkeypatch.setattr(
+        WindowCapture, "_grab_full", lambda self: self._window.frame.copy()
+    )
+    monkeypatch.setattr(
+        WindowCapture,
+        "_grab_region",
+        lambda self, region: self._window.frame[
+            region.y : region.y + region.h, region.x : region.x + region.w
+        ].copy(),
+    )
+    windows = [
+        FakeWindow("Meeting | Microsoft Teams", MEETING_FRAME),
+        FakeWindow("Lecture | Microsoft Teams", np.zeros_like(MEETING_FRAME)),
+    ]
+    monkeypatch.setattr(monitor, "find_meeting_windows", lambda excluded: windows)
+    return windows
+
+
+def test_every_window_is_analyzed_and_recorded_on_its_own(windows, servers):
+    manager = monitor.MonitorManager()
+    try:
+        meeting, lecture = manager.monitors
+        assert [meeting.name, lecture.name] == [window.title for window in windows]
+
+        assert not meeting.app.update()
+        assert lecture.app.update()
+    finally:
+        for monitor_ in manager.monitors:
+            monitor_.close()
+
+    meeting_server, lecture_server = servers
+    assert meeting_server.requests["StartRecord"] == 1
+    assert not meeting_server.recording
+    assert lecture_server.recording
@@ -0,0 +1,105 @@
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+import ocr_service
+import teams_controller
+from benchmark import check_sample, load_frame_set
+from config import load_config
+from constants import PROJECT_DIR_ABS_PATH, TEST_IMAGES_DIR_ABS_PATH
+from exceptions import ElementNotFoundException, ParticipantsNumberNotVisibleException
+from models import ElementArea, MatchedTextElementArea
+from ocr_service import OCRService
+from teams_controller import TeamsController
+from tracing import Tracer
+
+_, FRAMES = load_frame_set(TEST_IMAGES_DIR_ABS_PATH)
+
+
+def tesseract_ready() -> bool:
+    """
+    Whether the engine 'OCRService' picks can read English: tesserocr if installed, the executable otherwise.
+    """
+    try:
+        import tesserocr
+    except ImportError:
+        return shutil.which("tesseract") is not None
+    return "eng" in tesserocr.get_languages()[1]
+
+
+@pytest.mark.skipif(not tesseract_ready(), reason="tesseract or its English data missing")
+@pytest.mark.parametrize(
+    "file, label", [frame for frame in FRAMES if frame[1] is not None]
+)
+def test_mosaic_reads_the_labelled_frames(file, label, monkeypatch, tmp_path):
+    monkeypatch.chdir(PROJECT_DIR_ABS_PATH)
+    # without seeded glyphs every text is read by tesseract
+    for name in ("MEETING_DURATION_GLYPHS_ABS_PATH", "PARTICIPANTS_NUMBER_GLYPHS_ABS_PATH"):
+        monkeypatch.setattr(teams_controller, name, str(tmp_path / f"{name}.npz"))
+    tracer = Tracer()
+    ctrl = TeamsController(
+        screenshot_overrides=(cv2.imread(file),), tracer=tracer, config=load_config()
+    )
+    error = None
+    try:
+        ctrl.extract_data()
+    except (ElementNotFoundException, ParticipantsNumberNotVisibleException) as e:
+        error = e
+
+    assert check_sample(ctrl, label, error) is None
+    assert tracer.counters["glyph_read"] == 0
+    # both texts in a single tesseract pass
+    assert tracer.counters["ocr_call"] == 1
+
+
+class BlobEngine(ocr_service.OCREngine):
+    """
+    Reads every dark blob of an image as a word, plus a word spanning the whole image.
+    """
+
+    def __init__(self, config: str) -> None:
+        self.images = []
+
+    def recognize(self, requests):
+        results = []
+        for img, _ in requests:
+            self.images.append(img)
+            dark = (img < 128).astype(np.uint8)
+            n, _, stats, _ = cv2.connectedComponentsWithStats(dark)
+            matches = [
+                MatchedTextElementArea(x=x, y=y, w=w, h=h, text=f"{w}x{h}")
+                for x, y, w, h, _ in stats[1:n]
+            ]
+            height, width = img.shape
+            matches.append(
+                MatchedTextElementArea(x=0, y=0, w=width, h=height, text="all")
+            )
+            results.append(matches)
+        return results
+
+
+def test_mosaic_is_recognized_once_and_split_back(monkeypatch):
+    monkeypatch.setattr(ocr_service, "TesserocrEngine", BlobEngine)
+    service = OCRService(use_tesserocr=True)
+    requests = []
+    for x, y, w, h, area in (
+        (5, 4, 20, 10, ElementArea(x=300, y=40, w=120, h=30)),
+        (60, 0, 8, 12, ElementArea(x=900, y=44, w=80, h=24)),
+        (0, 10, 12, 6, None),
+    ):
+        img = np.full((area.h, area.w) if area else (16, 40), 255, np.uint8)
+        img[y : y + h, x : x + w] = 0
+        requests.append((img, area))
+
+    results = service.recognize_mosaic(requests, "digits")
+
+    assert len(service.engine("digits").images) == 1
+    # the word spanning all images belongs to none of them
+    boxes = [[(m.x, m.y, m.w, m.h, m.text) for m in matches] for matches in results]
+    assert boxes == [
+        [(300, 40, 120, 30, ""), (305, 44, 20, 10, "20x10")],
+        [(900, 44, 80, 24, ""), (960, 44, 8, 12, "8x12")],
+        [(0, 0, 40, 16, ""), (0, 10, 12, 6, "12x6")],
+    ]
@@ -0,0 +1,94 @@
+import socket
+
+import pytest
+
+from fake_obs_server import FakeOBSServer
+from obs_connection import OBSConnection, OBSConnectionError
+from tracing import Tracer
+
+PASSWORD = "secret"
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("localhost", 0))
+        return probe.getsockname()[1]
+
+
+def connection(port: int, tracer: Tracer, **kwargs) -> OBSConnection:
+    kwargs.setdefault("connect_timeout", 5.0)
+    return OBSConnection("localhost", port, PASSWORD, tracer=tracer, **kwargs)
+
+
+def test_waits_for_obs_to_listen_and_load():
+    server = FakeOBSServer(password=PASSWORD, startup_delay=0.3, not_ready_requests=2)
+    server.start()
+    tracer = Tracer()
+    obs_connection = connection(server.port, tracer)
+    try:
+        assert obs_connection.call(lambda client: client.get_version()).obs_version
+    finally:
+        obs_connection.close()
+        server.stop()
+
+    assert tracer.counters["obs_connect_retry"] > 0
+    assert tracer.counters["obs_ready_retry"] == 2
+
+
+def test_launches_obs_once_while_waiting():
+    server = FakeOBSServer(password=PASSWORD, port=free_port(), startup_delay=0.3)
+    launches = []
+
+    def launch():
+        launches.append(None)
+        server.start()
+
+    obs_connection = connection(server.port, Tracer(), launch=launch)
+    try:
+        obs_connection.call(lambda client: client.get_stats())
+    finally:
+        obs_connection.close()
+        server.stop()
+
+    assert len(launches) == 1
+
+
+def test_reconnects_once_to_a_restarted_obs():
+    server = FakeOBSServer(password=PASSWORD)
+    server.start()
+    tracer = Tracer()
+    obs_connection = connection(server.port, tracer)
+    try:
+        obs_connection.call(lambda client: client.get_stats())
+        server.stop()
+        restarted = FakeOBSServer(password=PASSWORD, port=server.port)
+        restarted.start()
+        obs_connection.call(lambda client: client.start_record())
+    finally:
+        obs_connection.close()
+        server.stop()
+        restarted.stop()
+
+    assert tracer.counters["obs_reconnect"] == 1
+    assert restarted.recording
+
+
+def test_obs_closing_while_loading_is_a_connection_error():
+    server = FakeOBSServer(password=PASSWORD, not_ready_requests=100)
+    server.start()
+    # OBS quits during the first wait for it to load
+    obs_connection = connection(server.port, Tracer(), sleep=lambda _: server.stop())
+    try:
+        with pytest.raises(OBSConnectionError):
+            obs_connection.client
+    finally:
+        server.stop()
+
+    assert not obs_connection.connected
+
+
+def test_missing_obs_is_a_connection_error():
+    obs_connection = connection(free_port(), Tracer(), connect_timeout=0.2)
+
+    with pytest.raises(OBSConnectionError):
+        obs_connection.call(lambda client: client.get_stats())
@@ -0,0 +1,87 @@
+import platform
+
+import pytest
+
+import obs_controller
+from fake_obs_server import FakeOBSServer
+from obs_controller import OBSController
+
+PASSWORD = "secret"
+
+
+@pytest.fixture
+def server():
+    server = FakeOBSServer(password=PASSWORD)
+    server.start()
+    yield server
+    server.stop()
+
+
+def obs_config(port: int) -> dict:
+    return {
+        "obs": {
+            "path": "obs",
+            "host": "localhost",
+            "port": port,
+            "password": PASSWORD,
+            "connect_timeout": 5.0,
+        }
+    }
+
+
+def test_records_the_teams_window_on_macos(server, monkeypatch):
+    monkeypatch.setattr(platform, "system", lambda: "Darwin")
+    controller = OBSController(config=obs_config(server.port), launch=False)
+    try:
+        controller.start_recording()
+    finally:
+        controller.close()
+
+    source = server.inputs[controller.source_name]
+    assert source["kind"] == "screen_capture"
+    assert source["settings"]["window"] == "1"
+    assert server.recording
+
+
+def test_records_the_x_screen_on_linux(server, monkeypatch):
+    monkeypatch.setattr(platform, "system", lambda: "Linux")
+    controller = OBSController(config=obs_config(server.port), launch=False)
+    try:
+        controller.start_recording()
+        controller.stop_recording()
+    finally:
+        controller.close()
+
+    assert server.inputs[controller.source_name]["kind"] == "xshm_input"
+    assert server.requests["GetInputPropertiesListPropertyItems"] == 0
+    assert not server.recording
+
+
+def test_launches_an_instance_on_the_port_on_linux(monkeypatch):
+    monkeypatch.setattr(platform, "system", lambda: "Linux")
+    launched = []
+    monkeypatch.setattr(
+        obs_controller.subprocess, "Popen", lambda args, **kwargs: launched.append(args)
+    )
+    controller = OBSController(config=obs_config(4460))
+    controller._launch_obs()
+
+    command = launched[0]
+    assert command[0] == "obs"
+    assert command[command.index("--websocket_port") + 1] == "4460"
+    assert command[command.index("--websocket_password") + 1] == PASSWORD
+
+
+def test_launches_a_new_instance_on_macos(monkeypatch):
+    monkeypatch.setattr(platform, "system", lambda: "Darwin")
+    launched = []
+    monkeypatch.setattr(
+        obs_controller.subprocess, "Popen", lambda args, **kwargs: launched.append(args)
+    )
+    controller = OBSController(config=obs_config(4461))
+    controller._launch_obs()
+
+    command = launched[0]
+    assert command[:4] == ["open", "-n", "obs", "--args"]
+    assert "--multi" in command
+    assert command[command.index("--websocket_port") + 1] == "4461"
@@ -0,0 +1,122 @@
+import cv2
+import numpy as np
+import pytest
+
+import ocr_service
+from models import ElementArea
+from ocr_service import OCRService
+
+CONFIG = "--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789:"
+
+
+def tesserocr_ready() -> bool:
+    try:
+        import tesserocr
+    except ImportError:
+        return False
+    return "eng" in tesserocr.get_languages()[1]
+
+
+def text_image(text: str) -> np.ndarray:
+    img = np.full((40, 160), 255, np.uint8)
+    cv2.putText(img, text, (8, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+    return img
+
+
+class CountingEngine(ocr_service.OCREngine):
+    created = 0
+
+    def __init__(self, config: str) -> None:
+        CountingEngine.created += 1
+        self.calls = 0
+
+    def recognize(self, requests):
+        self.calls += 1
+        return [[] for _ in requests]
+
+
+def test_repeated_calls_reuse_one_engine(monkeypatch):
+    monkeypatch.setattr(ocr_service, "TesserocrEngine", CountingEngine)
+    CountingEngine.created = 0
+    service = OCRService(use_tesserocr=True)
+    for _ in range(3):
+        service.recognize([(text_image("12:34"), None)], CONFIG)
+
+    assert CountingEngine.created == 1
+    assert service.engine(CONFIG).calls == 3
+
+
+def test_engines_are_kept_per_config(monkeypatch):
+    monkeypatch.setattr(ocr_service, "TesserocrEngine", CountingEngine)
+    service = OCRService(use_tesserocr=True)
+
+    assert service.engine(CONFIG) is service.engine(CONFIG)
+    assert service.engine(CONFIG) is not service.engine("--psm 7")
+
+
+def test_tesserocr_is_the_default_engine_when_installed():
+    pytest.importorskip("tesserocr")
+    assert OCRService()._use_tesserocr
+
+
+@pytest.mark.skipif(not tesserocr_ready(), reason="tesserocr or its English data missing")
+def test_tesserocr_api_is_loaded_once(monkeypatch):
+    import tesserocr
+
+    created = []
+    api_cls = tesserocr.PyTessBaseAPI
+
+    def counting_api(*args, **kwargs):
+        created.append(args)
+        return api_cls(*args, **kwargs)
+
+    monkeypatch.setattr(tesserocr, "PyTessBaseAPI", counting_api)
+    service = OCRService()
+    try:
+        texts = [
+            [match.text for match in service.recognize([(text_image(t), None)], CONFIG)[0]]
+            for t in ("12:34", "05:09", "12:34")
+        ]
+    finally:
+        service.close()
+
+    assert len(created) == 1
+    assert texts == [["", "12:34"], ["", "05:09"], ["", "12:34"]]
+
+
+def test_cli_batch_is_one_process_split_by_page(monkeypatch):
+    calls = []
+
+    def image_to_data(list_path, output_type, config):
+        with open(list_path) as list_file:
+            pages = list_file.read().split()
+        calls.append(pages)
+        # a page level entry and one word on every page, as in the tsv output of the executable
+        keys = ("page_num", "left", "top", "width", "height", "text")
+        data = {key: [] for key in keys}
+        for page_num in range(1, len(pages) + 1):
+            for left, text in ((0, ""), (page_num, str(page_num))):
+                data["page_num"].append(page_num)
+                data["left"].append(left)
+                data["top"].append(2)
+                data["width"].append(10)
+                data["height"].append(5)
+                data["text"].append(text)
+        return data
+
+    monkeypatch.setattr(ocr_service.tes, "image_to_data", image_to_data)
+    areas = [
+        ElementArea(x=100, y=50, w=160, h=40),
+        None,
+        ElementArea(x=7, y=9, w=160, h=40),
+    ]
+    engine = ocr_service.TesseractCLIEngine(CONFIG)
+
+    results = engine.recognize([(text_image("1"), area) for area in areas])
+
+    assert len(calls) == 1 and len(calls[0]) == 3
+    assert [[(m.x, m.y, m.text) for m in matches] for matches in results] == [
+        [(100, 52, ""), (101, 52, "1")],
+        [(0, 2, ""), (2, 2, "2")],
+        [(7, 11, ""), (10, 11, "3")],
+    ]
@@ -0,0 +1,75 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from constants import PROJECT_DIR_ABS_PATH, TEST_IMAGES_DIR_ABS_PATH
+import offline_analysis
+from offline_analysis import Chunk, ChunkAnalyzer, VideoSource
+from teams_controller import TeamsController
+
+FRAME = cv2.imread(os.path.join(TEST_IMAGES_DIR_ABS_PATH, "participants-2.png"))
+
+
+def write_frames(dir_path, frames) -> str:
+    for i, frame in enumerate(frames):
+        cv2.imwrite(os.path.join(dir_path, f"{i:03}.png"), frame)
+    return str(dir_path)
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.chdir(PROJECT_DIR_ABS_PATH)
+    analyzer = ChunkAnalyzer()
+    yield analyzer
+    analyzer.close()
+
+
+def test_frames_of_another_size_are_calibrated_again(analyzer, tmp_path):
+    larger = cv2.copyMakeBorder(FRAME, 0, 40, 0, 40, cv2.BORDER_CONSTANT)
+    path = write_frames(tmp_path, (FRAME, larger, FRAME))
+
+    samples = analyzer.analyze(Chunk(path, 1.0, 0, None, 1))
+
+    assert [sample.participants for sample in samples] == [2, 2, 2]
+
+
+def test_misread_meeting_duration_gives_an_empty_sample(
+    analyzer, tmp_path, monkeypatch
+):
+    path = write_frames(tmp_path, (FRAME, FRAME, FRAME))
+    parse = TeamsController._parse_meeting_duration
+    calls = []
+
+    def misread_second(self):
+        calls.append(None)
+        if len(calls) == 2:
+            raise ValueError("invalid literal for int() with base 10: ''")
+        parse(self)
+
+    monkeypatch.setattr(TeamsController, "_parse_meeting_duration", misread_second)
+
+    samples = analyzer.analyze(Chunk(path, 1.0, 0, None, 1))
+
+    assert [sample.participants for sample in samples] == [2, None, 2]
+    assert samples[1].meeting_duration is None
+
+
+@pytest.mark.parametrize("seekable", [True, False])
+@pytest.mark.parametrize("start", [0, 7, 13])
+def test_video_chunks_start_on_their_first_frame(
+    tmp_path, monkeypatch, start, seekable
+):
+    if not seekable:
+        monkeypatch.setattr(offline_analysis, "_seek", lambda capture, index: False)
+    path = str(tmp_path / "meeting.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    for i in range(30):
+        writer.write(np.full((48, 64, 3), i * 8, np.uint8))
+    writer.release()
+
+    frames = list(VideoSource(path).frames(start, start + 6, 3))
+
+    assert [index for index, _ in frames] == [start, start + 3]
+    assert [round(frame.mean() / 8) for _, frame in frames] == [start, start + 3]
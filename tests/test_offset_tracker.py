@@ -0,0 +1,118 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import teams_controller
+from config import load_config
+from constants import PROJECT_DIR_ABS_PATH, TEST_IMAGES_DIR_ABS_PATH
+from models import ElementArea
+from offset_tracker import OffsetTracker
+from screen_capture import OverridesCapture
+from synthetic_frames import FrameGenerator, FrameSpec
+from teams_controller import TeamsController
+from tracing import Tracer
+
+GENERATOR = FrameGenerator()
+
+
+def render(width: int) -> tuple[np.ndarray, dict[str, ElementArea]]:
+    frame = GENERATOR.render(FrameSpec(width, 1080, 1.0, "12:34", 5))
+    gray = cv2.cvtColor(frame.image, cv2.COLOR_BGR2GRAY)
+    areas = {
+        name: ElementArea(x=x, y=y, w=w, h=h)
+        for name, (x, y, w, h) in frame.elements.items()
+    }
+    return gray, areas
+
+
+def band_area(areas: dict[str, ElementArea], width: int) -> ElementArea:
+    top = min(area.y for area in areas.values()) - 60
+    bottom = max(area.y + area.h for area in areas.values()) + 60
+    return ElementArea(x=0, y=top, w=width, h=bottom - top)
+
+
+def shift(image: np.ndarray, dx: int, dy: int) -> np.ndarray:
+    return cv2.warpAffine(
+        image,
+        np.float32([[1, 0, dx], [0, 1, dy]]),
+        (image.shape[1], image.shape[0]),
+        borderMode=cv2.BORDER_REPLICATE,
+    )
+
+
+def crop(gray: np.ndarray, area: ElementArea) -> np.ndarray:
+    return gray[area.y : area.y + area.h, area.x : area.x + area.w]
+
+
+@pytest.mark.parametrize("dx, dy", [(0, 0), (12, 0), (-7, 5), (25, -9)])
+def test_recovers_a_known_shift(dx, dy):
+    gray, areas = render(1920)
+    band = band_area(areas, 1920)
+    tracker = OffsetTracker()
+    tracker.update(crop(gray, band), band)
+
+    moved = shift(gray, dx, dy)
+    groups = {name: areas[name] for name in ("leave_button", "shield_icon")}
+
+    assert tracker.track(crop(moved, band), groups) == {
+        "leave_button": (dx, dy),
+        "shield_icon": (dx, dy),
+    }
+
+
+def test_follows_the_right_edge_of_a_resized_window_with_a_prior():
+    gray, areas = render(1920)
+    band = band_area(areas, 1920)
+    tracker = OffsetTracker()
+    tracker.update(crop(gray, band), band)
+
+    # the window got narrower: the leave button moves with the right edge, the clock stays
+    narrower, _ = render(1720)
+    narrower = cv2.copyMakeBorder(narrower, 0, 0, 0, 200, cv2.BORDER_REPLICATE)
+    groups = {name: areas[name] for name in ("leave_button", "shield_icon")}
+
+    shifts = tracker.track(crop(narrower, band), groups, {"leave_button": -200})
+
+    assert shifts == {"leave_button": (-200, 0), "shield_icon": (0, 0)}
+
+
+def test_a_different_frame_isnt_tracked():
+    gray, areas = render(1920)
+    band = band_area(areas, 1920)
+    tracker = OffsetTracker()
+    tracker.update(crop(gray, band), band)
+    noise = np.random.default_rng(0).integers(0, 256, gray.shape, np.uint8)
+
+    groups = {"shield_icon": areas["shield_icon"]}
+
+    assert tracker.track(crop(noise, band), groups) is None
+
+
+class CountingCapture(OverridesCapture):
+    def __init__(self, frames: list[np.ndarray]) -> None:
+        super().__init__(frames)
+        self.served: list[np.ndarray] = []
+
+    def feed(self, frame: np.ndarray) -> None:
+        self.served.append(frame)
+        super().feed(frame)
+
+
+def test_every_replayed_frame_is_analyzed_once(monkeypatch, tmp_path):
+    monkeypatch.chdir(PROJECT_DIR_ABS_PATH)
+    monkeypatch.setattr(teams_controller, "TEAMS_DEBUG_IMAGES_DIR_ABS_PATH", str(tmp_path))
+    frame = cv2.imread(os.path.join(TEST_IMAGES_DIR_ABS_PATH, "participants-2.png"))
+    frames = [frame, frame.copy(), shift(frame, 0, 100), shift(frame, 0, 100)]
+    capture = CountingCapture(frames)
+    tracer = Tracer()
+    ctrl = TeamsController(capture=capture, tracer=tracer, config=load_config())
+
+    for _ in frames:
+        ctrl.extract_data()
+        assert ctrl.participants_number == 2
+
+    # the tracking bands and the retry at the moved offsets look at the frame being analyzed
+    assert list(map(id, capture.served)) == list(map(id, frames))
+    assert tracer.counters["offsets_tracked"] == 1
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from participant_stats import ParticipantStats
+
+
+def unfiltered(capacity: int) -> ParticipantStats:
+    # no sample is far enough to be held back
+    return ParticipantStats(capacity, halflife=60.0, outlier_ratio=1e9)
+
+
+@pytest.mark.parametrize("capacity", [1, 4, 7, 32])
+def test_window_median_and_peak_match_brute_force(capacity):
+    rng = np.random.default_rng(capacity)
+    stats = unfiltered(capacity)
+    added = []
+    # values above the initial histogram size make it grow
+    for i, value in enumerate(rng.integers(0, 150, 5 * capacity + 3).tolist()):
+        assert stats.add(5.0 * i, value)
+        added.append(value)
+        window = added[-capacity:]
+
+        times, values = stats.samples()
+        assert values.tolist() == window
+        assert times.tolist() == [5.0 * j for j in range(len(added))][-capacity:]
+        assert len(stats) == len(window)
+        assert stats.latest == value
+        assert stats.median == sorted(window)[(len(window) - 1) // 2]
+        assert stats.peak == max(window)
+
+
+def test_ewma_halves_the_weight_of_old_samples_every_halflife():
+    stats = ParticipantStats(8, halflife=10.0, outlier_ratio=1e9)
+    stats.add(0.0, 40)
+    stats.add(10.0, 20)
+    assert stats.ewma == pytest.approx(30.0)
+
+    stats.add(40.0, 20)
+    assert stats.ewma == pytest.approx(20 + 10 / 8)
+
+
+def test_outlier_is_held_back_until_confirmed():
+    stats = ParticipantStats(16, halflife=60.0, confirmations=3)
+    for i in range(5):
+        stats.add(float(i), 40)
+
+    assert not stats.add(5.0, 4)
+    assert stats.add(6.0, 40)
+    assert [stats.add(7.0 + i, 10) for i in range(3)] == [False, False, True]
+
+    assert stats.rejected == 3
+    assert stats.samples()[1].tolist()[-4:] == [40, 10, 10, 10]
@@ -0,0 +1,48 @@
+import numpy as np
+
+from roi_cache import RoiCache, fingerprint
+
+
+def region(value: int) -> np.ndarray:
+    return np.full((20, 60), value, np.uint8)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache: RoiCache[str] = RoiCache(max_size=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+
+    cache.put("c", "3")
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_hits_and_misses_are_counted():
+    cache: RoiCache[list[str]] = RoiCache()
+    assert cache.get("a") is None
+    cache.put("a", ["12:34"])
+
+    for _ in range(3):
+        assert cache.get("a") == ["12:34"]
+
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_changed_pixels_miss_and_clear_drops_every_entry():
+    cache: RoiCache[str] = RoiCache()
+    img = region(0)
+    cache.put(fingerprint(img), "12:34")
+    assert cache.get(fingerprint(img.copy())) == "12:34"
+
+    img[5, 5] = 255
+    assert cache.get(fingerprint(img)) is None
+    # same pixels in another shape are another region
+    assert fingerprint(region(0).reshape(60, 20)) != fingerprint(region(0))
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.get(fingerprint(region(0))) is None
@@ -0,0 +1,156 @@
+from datetime import timedelta
+
+import pytest
+
+from disconnect_policy import DisconnectPolicy
+from scheduler import PollScheduler
+
+MIN_TIME = timedelta(minutes=30)
+MAX_TIME = timedelta(hours=3)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.slept: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def scheduler(clock):
+    return PollScheduler(
+        interval=5.0,
+        fast_interval=1.0,
+        boundary_margin=timedelta(minutes=2),
+        clock_verify_interval=60.0,
+        clock_drift_tolerance=3.0,
+        clock=clock,
+        sleep=clock.sleep,
+    )
+
+
+def policy(**overrides) -> DisconnectPolicy:
+    settings = dict(
+        min_time=MIN_TIME,
+        max_time=MAX_TIME,
+        min_participants=5,
+        min_participants_ratio=0.15,
+        participants_window=120,
+        participants_halflife=timedelta(minutes=5),
+        outlier_ratio=0.5,
+        outlier_confirmations=3,
+    )
+    return DisconnectPolicy(**{**settings, **overrides})
+
+
+def test_clock_is_read_until_synced_and_then_every_verify_interval(scheduler, clock):
+    assert scheduler.should_read_clock()
+    assert scheduler.meeting_duration is None
+
+    scheduler.sync_clock(timedelta(minutes=10))
+    assert not scheduler.should_read_clock()
+
+    clock.now += 59
+    assert not scheduler.should_read_clock()
+    assert scheduler.meeting_duration == timedelta(minutes=10, seconds=59)
+    clock.now += 1
+    assert scheduler.should_read_clock()
+
+    scheduler.reset_clock()
+    assert scheduler.should_read_clock()
+
+
+def test_sync_clock_reports_drift_over_the_tolerance(scheduler, clock):
+    assert not scheduler.sync_clock(timedelta(minutes=10))
+
+    clock.now += 60
+    assert not scheduler.sync_clock(timedelta(minutes=11, seconds=3))
+    clock.now += 60
+    assert scheduler.sync_clock(timedelta(minutes=12, seconds=7))
+    assert scheduler.meeting_duration == timedelta(minutes=12, seconds=7)
+
+
+@pytest.mark.parametrize(
+    "duration, falling, interval",
+    [
+        (None, False, 5.0),
+        (timedelta(minutes=10), False, 5.0),
+        (timedelta(minutes=28), False, 1.0),
+        (timedelta(minutes=32), False, 1.0),
+        (timedelta(minutes=33), False, 5.0),
+        (timedelta(hours=2, minutes=58), False, 1.0),
+        (timedelta(minutes=10), True, 1.0),
+    ],
+)
+def test_polls_faster_near_the_boundaries_and_while_falling(
+    scheduler, clock, duration, falling, interval
+):
+    assert scheduler.schedule(duration, MIN_TIME, MAX_TIME, falling) == interval
+
+    scheduler.wait()
+    assert clock.slept == [interval]
+
+
+def test_retry_waits_the_fast_interval_and_late_polls_dont_sleep(scheduler, clock):
+    assert scheduler.schedule_retry() == 1.0
+    clock.now += 0.25
+    scheduler.wait()
+    assert clock.slept == [0.75]
+
+    scheduler.schedule(timedelta(minutes=10), MIN_TIME, MAX_TIME)
+    clock.now += 10
+    scheduler.wait()
+    assert clock.slept == [0.75]
+
+
+def test_meeting_isnt_left_before_min_time_and_is_left_after_max_time():
+    disconnect_policy = policy()
+
+    assert not disconnect_policy.should_disconnect(MIN_TIME - timedelta(seconds=1), 1)
+    assert disconnect_policy.should_disconnect(MAX_TIME + timedelta(seconds=1), 40)
+
+
+def test_meeting_is_left_when_the_participants_fall_under_the_ratio():
+    disconnect_policy = policy(min_participants=0)
+    duration = MIN_TIME
+    for _ in range(10):
+        assert not disconnect_policy.should_disconnect(duration, 100)
+        duration += timedelta(seconds=5)
+
+    # 10 of 100 is under the 0.15 ratio, but a single low sample is held back as a misread
+    decisions = []
+    for _ in range(3):
+        decisions.append(disconnect_policy.should_disconnect(duration, 10))
+        assert disconnect_policy.participants_falling or decisions[-1]
+        duration += timedelta(seconds=5)
+
+    assert decisions == [False, False, True]
+    assert disconnect_policy.participants.rejected == 2
+
+
+def test_a_single_misread_doesnt_end_the_meeting():
+    disconnect_policy = policy()
+    duration = MIN_TIME
+    for participants in (40, 40, 40, 4, 40, 40):
+        assert not disconnect_policy.should_disconnect(duration, participants)
+        duration += timedelta(seconds=5)
+
+    assert disconnect_policy.participants.latest == 40
+
+
+def test_meeting_is_left_under_min_participants():
+    disconnect_policy = policy()
+
+    assert not disconnect_policy.should_disconnect(MIN_TIME, 6)
+    assert disconnect_policy.should_disconnect(MIN_TIME + timedelta(seconds=5), 5 - 1)
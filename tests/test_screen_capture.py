@@ -0,0 +1,75 @@
+import sys
+from collections import namedtuple
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import screen_capture
+from models import ElementArea
+from screen_capture import PyAutoGUICapture, _read_pixels
+
+Size = namedtuple("Size", "width height")
+
+
+@pytest.mark.parametrize("mode, channels", [("RGB", 3), ("RGBA", 4)])
+def test_read_pixels_copies_the_image_in_bands(monkeypatch, mode, channels):
+    # a few rows per band, so the last band is partial
+    monkeypatch.setattr(screen_capture, "_READ_BAND_BYTES", 7 * 64 * channels)
+    pixels = np.random.default_rng(0).integers(0, 256, (50, 64, channels), np.uint8)
+    image = Image.fromarray(pixels)
+    assert image.mode == mode
+    buffer = np.zeros_like(pixels)
+
+    _read_pixels(image, buffer)
+
+    assert np.array_equal(buffer, pixels)
+
+
+class RetinaScreen:
+    """
+    Stands in for 'pyautogui' on a display of two pixels per point. Region screenshots are taken in pixels,
+    or with 'point_regions' in points, at half the density of the full ones.
+    """
+
+    def __init__(self, pixels: np.ndarray, point_regions: bool) -> None:
+        self.pixels = pixels
+        self.point_regions = point_regions
+        self.full_grabs = 0
+        self.region_grabs = 0
+
+    def size(self) -> Size:
+        return Size(self.pixels.shape[1] // 2, self.pixels.shape[0] // 2)
+
+    def screenshot(self, region=None) -> Image.Image:
+        if region is None:
+            self.full_grabs += 1
+            return Image.fromarray(self.pixels)
+        self.region_grabs += 1
+        left, top, width, height = region
+        crop = self.pixels[top * 2 : (top + height) * 2, left * 2 : (left + width) * 2]
+        if self.point_regions:
+            crop = crop[::2, ::2]
+        return Image.fromarray(np.ascontiguousarray(crop))
+
+
+@pytest.mark.parametrize("point_regions", [False, True])
+def test_regions_keep_the_density_of_full_screenshots(monkeypatch, point_regions):
+    pixels = np.random.default_rng(0).integers(0, 256, (120, 160, 3), np.uint8)
+    screen = RetinaScreen(pixels, point_regions)
+    monkeypatch.setitem(sys.modules, "pyautogui", screen)
+    capture = PyAutoGUICapture()
+    capture.grab()
+    region = ElementArea(x=20, y=10, w=64, h=32)
+
+    for _ in range(2):
+        img = capture.grab(region)
+        expected = pixels[10:42, 20:84, ::-1]  # BGR
+        assert np.array_equal(img, expected)
+        capture.release(img)
+
+    if point_regions:
+        # the density is found out once, later regions aren't grabbed twice
+        assert (screen.region_grabs, screen.full_grabs) == (1, 3)
+    else:
+        assert (screen.region_grabs, screen.full_grabs) == (2, 1)
@@ -0,0 +1,54 @@
+import cv2
+import numpy as np
+import pytest
+
+from constants import TEAMS_LEAVE_BUTTON_ABS_PATH, TEAMS_PEOPLE_ICON_ABS_PATH
+from synthetic_frames import FrameGenerator, FrameSpec, format_duration, parse_duration
+
+TEMPLATES = {
+    "leave_button": TEAMS_LEAVE_BUTTON_ABS_PATH,
+    "people_icon": TEAMS_PEOPLE_ICON_ABS_PATH,
+}
+
+
+@pytest.fixture(scope="module")
+def generator():
+    return FrameGenerator()
+
+
+@pytest.mark.parametrize(
+    "width, height, scale", [(1920, 1080, 1.0), (2880, 1800, 1.5)]
+)
+def test_elements_are_where_the_label_says(generator, width, height, scale):
+    frame = generator.render(FrameSpec(width, height, scale, "12:34", 5))
+
+    assert frame.image.shape == (height, width, 3)
+    elements = frame.label()["elements"]
+    assert elements.keys() == {"leave_button", "people_icon", "shield_icon"}
+    for name, path in TEMPLATES.items():
+        x, y, w, h = frame.elements[name]
+        template = cv2.imread(path)
+        scores = cv2.matchTemplate(
+            frame.image,
+            cv2.resize(template, (w, h), interpolation=cv2.INTER_AREA),
+            cv2.TM_CCOEFF_NORMED,
+        )
+        _, score, _, location = cv2.minMaxLoc(scores)
+        assert location == (x, y)
+        assert score > 0.95
+
+
+def test_degradation_is_reproducible_from_the_seed(generator):
+    spec = FrameSpec(1366, 768, 1.0, "01:02:03", None, 2, noise=4.0, jpeg_quality=70)
+
+    first = generator.render(spec).image
+    assert np.array_equal(first, generator.render(spec).image)
+    assert not np.array_equal(first, generator.render(spec._replace(seed=1)).image)
+
+
+@pytest.mark.parametrize(
+    "seconds, text", [(0, "00:00"), (59 * 60 + 7, "59:07"), (3723, "01:02:03")]
+)
+def test_durations_are_shown_as_teams_does(seconds, text):
+    assert format_duration(seconds) == text
+    assert parse_duration(text) == seconds
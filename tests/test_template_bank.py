@@ -0,0 +1,55 @@
+import cv2
+import pytest
+
+from constants import TEAMS_LEAVE_BUTTON_ABS_PATH, TEAMS_PEOPLE_ICON_ABS_PATH
+from template_bank import ScaleLock, TemplateBank
+
+
+@pytest.fixture
+def imread_calls(monkeypatch):
+    calls = []
+    imread = cv2.imread
+
+    def counting_imread(path, *args):
+        calls.append(path)
+        return imread(path, *args)
+
+    monkeypatch.setattr(cv2, "imread", counting_imread)
+    return calls
+
+
+def test_pyramid_is_built_once_from_the_largest_scale(imread_calls):
+    bank = TemplateBank()
+
+    pyramid = bank.pyramid(TEAMS_LEAVE_BUTTON_ABS_PATH, 0.5, 1.5, 5)
+
+    assert bank.pyramid(TEAMS_LEAVE_BUTTON_ABS_PATH, 0.5, 1.5, 5) is pyramid
+    assert [templ.scale for templ in pyramid] == [1.5, 1.25, 1.0, 0.75, 0.5]
+    gray = bank.gray(TEAMS_LEAVE_BUTTON_ABS_PATH)
+    assert pyramid[2].img.shape == gray.shape
+    # another scale grid reuses the loaded template
+    bank.pyramid(TEAMS_LEAVE_BUTTON_ABS_PATH, 0.8, 1.2, 3)
+    assert imread_calls == [TEAMS_LEAVE_BUTTON_ABS_PATH]
+
+
+def test_nearby_templates_are_taken_from_the_pyramid():
+    bank = TemplateBank()
+    pyramid = bank.pyramid(TEAMS_PEOPLE_ICON_ABS_PATH, 0.5, 1.5, 5)
+
+    nearby = bank.nearby(TEAMS_PEOPLE_ICON_ABS_PATH, 1.0, 0.5, 1.5, 5, radius=1)
+
+    assert [templ.scale for templ in nearby] == [1.25, 1.0, 0.75]
+    assert all(templ in pyramid for templ in nearby)
+    assert nearby[1].img is pyramid[2].img
+    assert len(bank.nearby(TEAMS_PEOPLE_ICON_ABS_PATH, 1.5, 0.5, 1.5, 5, radius=0)) == 1
+
+
+def test_scale_lock_is_released_until_locked_again():
+    lock = ScaleLock(radius=2)
+    assert not lock.locked
+
+    lock.lock(1.25)
+    assert lock.locked and lock.scale == 1.25
+
+    lock.release()
+    assert not lock.locked and lock.scale is None
@@ -0,0 +1,180 @@
+import functools
+import json
+import os
+import sys
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from os import path as p
+from time import perf_counter, time
+from typing import Callable, ContextManager, Iterator, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable)
+
+
+class Tracer:
+    """
+    Collects the durations of named spans, in seconds, and named counters.
+    """
+
+    def __init__(self) -> None:
+        self.spans: defaultdict[str, list[float]] = defaultdict(list)
+        self.counters: Counter[str] = Counter()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, perf_counter() - start)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] += n
+
+    def record(self, name: str, duration: float) -> None:
+        """
+        Records a span measured outside of 'span', e.g. across threads.
+        """
+        self._record(name, duration)
+
+    def reset(self) -> None:
+        self.spans.clear()
+        self.counters.clear()
+
+    def close(self) -> None:
+        pass
+
+    def _record(self, name: str, duration: float) -> None:
+        self.spans[name].append(duration)
+
+
+class NullTracer(Tracer):
+    """
+    Tracer that records nothing, used when tracing is disabled.
+    """
+
+    def span(self, name: str) -> ContextManager[None]:
+        return nullcontext()
+
+    def count(self, name: str, n: int = 1) -> None:
+        pass
+
+    def record(self, name: str, duration: float) -> None:
+        pass
+
+
+class JsonlTracer(Tracer):
+    """
+    Writes every span as a JSON line to the trace file of the session, instead of keeping it in memory.
+    Lines are buffered and written every 'flush_every' records; counters are written on every flush.
+    """
+
+    def __init__(self, file_path: str, flush_every: int = 256) -> None:
+        super().__init__()
+        os.makedirs(p.dirname(file_path), exist_ok=True)
+        self.file_path = file_path
+        self._file = open(file_path, "a")
+        self._flush_every = flush_every
+        self._buffer: list[str] = []
+        self._lock = threading.Lock()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._buffer.append(
+                json.dumps({"ts": time(), "counters": dict(self.counters)})
+            )
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._file.flush()
+            self._buffer.clear()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+    def _record(self, name: str, duration: float) -> None:
+        line = json.dumps(
+            {
+                "ts": time(),
+                "span": name,
+                "ms": round(duration * 1000, 3),
+                "thread": threading.current_thread().name,
+            }
+        )
+        with self._lock:
+            self._buffer.append(line)
+            full = len(self._buffer) >= self._flush_every
+        if full:
+            self.flush()
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of 'thread_id' (the main thread by default) every 'interval' seconds in a background thread.
+    On 'stop' the sampled stacks are written in the collapsed format used by flame graph tools.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        interval: float = 0.005,
+        thread_id: Optional[int] = None,
+    ) -> None:
+        self.file_path = file_path
+        self._interval = interval
+        self._thread_id = (
+            thread_id if thread_id is not None else threading.main_thread().ident
+        )
+        self._stacks: Counter[str] = Counter()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling_profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        os.makedirs(p.dirname(self.file_path), exist_ok=True)
+        with open(self.file_path, "w") as file:
+            for stack, samples in self._stacks.most_common():
+                file.write(f"{stack} {samples}\n")
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{p.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if names:
+                self._stacks[";".join(reversed(names))] += 1
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """
+    Wraps a method in a span of the tracer stored in the '_tracer' attribute of its instance.
+    """
+
+    def decorator(method: F) -> F:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self._tracer.span(name):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+NULL_TRACER = NullTracer()